@@ -1,3 +1,4 @@
+import datetime as dt
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional, Callable
@@ -15,13 +16,50 @@ class RunCmdArgs(Args):
     bin: Path
     input_files: Optional[list[Path]]
     output_dir: Optional[Path]
-    config_file: Optional[Path]
+    config_files: Optional[list[Path]]
+    grid: Optional[list[str]]
     runs: Optional[int]
     metadata_file: Optional[Path]
     procs: Optional[int]
     attach_timestamp: bool
     hq: bool
     experimental_postprocess: bool
+    resume_dir: Optional[Path]
+    task_timeout: Optional[float]
+    timeout_factor: Optional[float]
+    retries: int
+    speculate_after: Optional[float]
+    adaptive: bool
+    pin: bool
+    cores_per_task: int
+    fs_queue: bool
+    join_queue_dir: Optional[Path]
+    deadline: Optional[dt.datetime]
+    progress: bool
+    compress_logs: bool
+    log_size_cap: Optional[int]
+    result_store: bool
+    result_store_dir: Optional[Path]
+    max_series: Optional[int]
+    fitness_ci_width: Optional[float]
+    hit_ratio_ci_width: Optional[float]
+    stagnation_patience: Optional[float]
+    stagnation_factor: Optional[float]
+    min_predicted_gain: Optional[float]
+
+
+@dataclass
+class RaceCmdArgs(Args):
+    bin: Path
+    config_files: list[Path]
+    input_files: list[Path]
+    output_dir: Path
+    metadata_file: Optional[Path]
+    procs: int
+    min_rounds: int
+    max_rounds: int
+    attach_timestamp: bool
+    progress: bool
 
 
 @dataclass
@@ -31,6 +69,10 @@ class AnalyzeCmdArgs(Args):
     output_dir: Optional[Path]
     procs: Optional[int]
     plot: bool
+    scan_threads: Optional[int]
+    cache: bool
+    batch_dataset: bool
+    window: Optional[int]
 
 
 @dataclass
@@ -1,8 +1,10 @@
+import datetime as dt
 import argparse
 from pathlib import Path
 from .args import Args
 from .command import (
     handle_cmd_run,
+    handle_cmd_race,
     handle_cmd_analyze,
     handle_cmd_perfcmp,
     handle_cmd_compare,
@@ -11,22 +13,98 @@ from .command import (
 from .validation import validate_cli_args
 
 
+def local_datetime_from_isoformat(value: str) -> dt.datetime:
+    """ Parses ISO 8601 time. Time with UTC offset is converted to naive local time, as all the other points in time
+    (e.g. `dt.datetime.now()`, end of Slurm allocation) are naive local times """
+    time = dt.datetime.fromisoformat(value)
+    if time.tzinfo is not None:
+        time = time.astimezone().replace(tzinfo=None)
+    return time
+
+
 def build_run_parser(subparsers: argparse._SubParsersAction) -> None:
     run_parser = subparsers.add_parser(name="run", help="Run experiment(s) & analyze the results")
     run_parser.add_argument('bin', help='Path to jssp instance solver', type=Path)
-    run_parser.add_argument('-i', '--input-files', required=True, help='Path to jssp instance data file/directory or list of those', nargs='+', type=Path)
+    run_parser.add_argument('-i', '--input-files', required=False, help='Path to jssp instance data file/directory or list of those; required unless --resume or --join-queue is specified', nargs='+', type=Path)
     run_parser.add_argument('-o', '--output-dir', help='Parent directory experiment batch output directory will be placed in; should be specified in case multiple input files / directory/ies were specified', type=Path)
-    run_parser.add_argument('-c', '--solver-config', help='Solver configuration file', type=Path, dest='config_file')
+    run_parser.add_argument('-c', '--solver-config', nargs='+', type=Path, dest='config_files',
+                            help='Solver configuration file; when more are specified every instance is run with every one of them (sweep)')
+    run_parser.add_argument('--grid', nargs='+', type=str, dest='grid', metavar='KEY=VALUES',
+                            help='Sweep over solver parameters, e.g. --grid pop_size=100,200 n_gen=500,1000; every point of the grid '
+                                 'is combined with every --solver-config & instances are run with all the resulting configurations')
     run_parser.add_argument('-n', '--n-series', help='Number of repetitions for each problem instance. Defaults to 1.', type=int, dest='runs')
     run_parser.add_argument('-m', '--metadata-file', type=Path, help='Path to file with instance metadata', dest='metadata_file')
-    run_parser.add_argument('-p', '--procs', type=int, help='Number of processes to run in parallel; works only on local configuration', default=1)
+    run_parser.add_argument('-p', '--procs', type=int, help='Number of processes to run in parallel; upper bound in case of --adaptive; works only on local configuration', default=1)
+    run_parser.add_argument('--adaptive', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='adaptive',
+                            help='Adjust number of processes run in parallel at runtime to system load & available memory; works only on local configuration')
+    run_parser.add_argument('--pin', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='pin',
+                            help='Pin every solver process to dedicated physical core(s), not shared with SMT siblings; limits number of processes run in parallel to number of such cores')
+    run_parser.add_argument('--cores-per-task', type=int, default=1, dest='cores_per_task',
+                            help='Number of physical cores dedicated to single solver process in case of --pin. Defaults to 1')
+    run_parser.add_argument('--fs-queue', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='fs_queue',
+                            help='Put the series to queue in the batch directory & process it; other workers (e.g. on other nodes) can join with --join-queue')
+    run_parser.add_argument('--join-queue', type=Path, required=False, dest='join_queue_dir',
+                            help='Batch directory created with --fs-queue; process its queue until it is empty, alongside other workers')
+    run_parser.add_argument('--progress', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='progress',
+                            help='Report progress & ETA as single status line instead of logging start & completion of every series. Live status is saved to status.json in the batch directory in any case')
+    run_parser.add_argument('--deadline', type=local_datetime_from_isoformat, required=False, dest='deadline',
+                            help='ISO 8601 time all the series must complete before, local time unless UTC offset is given; series that would not complete in time are not started, running ones are terminated & the batch can be continued with --resume. Defaults to end of Slurm allocation if known')
+    run_parser.add_argument('--compress-logs', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='compress_logs',
+                            help='Save solver output gzip-compressed as stdout.log.gz. Works only on local configuration')
+    run_parser.add_argument('--log-size-cap', type=int, required=False, dest='log_size_cap',
+                            help='Maximal size of solver output saved for single series in bytes (before compression), the rest is dropped. Works only on local configuration')
+    run_parser.add_argument('--result-store', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='result_store',
+                            help='Reuse series computed by previous batches with the same solver binary, solver config & instance instead of running them again, and store newly computed ones. Works only on local configuration')
+    run_parser.add_argument('--result-store-dir', type=Path, required=False, dest='result_store_dir',
+                            help='Directory of the result store. Defaults to ecdk-result-store in the long-term cache directory')
+    run_parser.add_argument('--max-series', type=int, required=False, dest='max_series',
+                            help='Decide number of series of every experiment at runtime: series are run in waves of --n-series, until the statistics are precise enough or this many series have been run. Works only on local configuration')
+    run_parser.add_argument('--fitness-ci-width', type=float, default=0.01, dest='fitness_ci_width',
+                            help='In case of --max-series, experiment is stopped once half-width of 95%% confidence interval of mean fitness drops to this fraction of the best known solution. Defaults to 0.01')
+    run_parser.add_argument('--hit-ratio-ci-width', type=float, required=False, dest='hit_ratio_ci_width',
+                            help='In case of --max-series, experiment is also stopped once half-width of 95%% confidence interval of ratio of series reaching the best known solution drops to this value')
+    run_parser.add_argument('--stagnation-patience', type=float, required=False, dest='stagnation_patience',
+                            help='Stop series that have not found new best solution for this many seconds. Stopped series keeps the best solution found so far as its (truncated) result & is not reported as failed. Works only on local configuration')
+    run_parser.add_argument('--stagnation-factor', type=float, required=False, dest='stagnation_factor',
+                            help='In case of --stagnation-patience, time without improvement must also exceed this multiple of the time the last improvement has been found at')
+    run_parser.add_argument('--min-predicted-gain', type=float, required=False, dest='min_predicted_gain',
+                            help='Stop series whose fitness is predicted to improve by less than this fraction in the rest of their expected duration (requires recorded history of durations). Works only on local configuration')
     run_parser.add_argument('--attach-timestamp', action=argparse.BooleanOptionalAction, type=bool,
                             help='Whether a timestamp should be attached to output file name', default=True, dest='attach_timestamp')
     run_parser.add_argument('--hq', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='hq', help='Whether HyperQueue should be used')
     run_parser.add_argument('--ex-postprocess', action=argparse.BooleanOptionalAction, type=bool, default=False, help='Experimental. Whether to run postprocessing tasks after finalizing computations', dest='experimental_postprocess')
+    run_parser.add_argument('--resume', type=Path, required=False, dest='resume_dir',
+                            help='Batch directory of interrupted run; only series that are missing or have failed are run. Works only on local configuration')
+    run_parser.add_argument('--task-timeout', type=float, required=False, dest='task_timeout',
+                            help='Wall-clock limit for single series in seconds; series exceeding it are terminated. Works only on local configuration')
+    run_parser.add_argument('--timeout-factor', type=float, required=False, dest='timeout_factor',
+                            help='Wall-clock limit for single series as multiple of its duration estimated from previous runs; ignored if --task-timeout is specified')
+    run_parser.add_argument('--retries', type=int, required=False, default=0, dest='retries',
+                            help='How many times series that failed (other than due to the time limit) is restarted. Defaults to 0')
+    run_parser.add_argument('--speculate-after', type=float, required=False, dest='speculate_after',
+                            help='Run series once again on idle core, when it runs this many times longer than estimated; first copy to finish wins')
     run_parser.set_defaults(handler=handle_cmd_run)
 
 
+def build_race_parser(subparsers: argparse._SubParsersAction) -> None:
+    race_parser = subparsers.add_parser(name="race", help="Race solver configurations on set of instances, eliminating the ones that are significantly worse")
+    race_parser.add_argument('bin', help='Path to jssp instance solver', type=Path)
+    race_parser.add_argument('-c', '--solver-configs', required=True, nargs='+', type=Path, dest='config_files',
+                             help='Solver configuration files to race (2 to 10); file stems name the configurations & must be unique')
+    race_parser.add_argument('-i', '--input-files', required=True, nargs='+', type=Path, help='Path to jssp instance data file/directory or list of those')
+    race_parser.add_argument('-o', '--output-dir', required=True, type=Path, help='Directory batch directory of every configuration will be placed in')
+    race_parser.add_argument('-m', '--metadata-file', type=Path, help='Path to file with instance metadata', dest='metadata_file')
+    race_parser.add_argument('-p', '--procs', type=int, help='Number of processes to run in parallel', default=1)
+    race_parser.add_argument('--min-rounds', type=int, default=2, dest='min_rounds',
+                             help='Number of rounds (one series of every configuration on every instance) before the first elimination. Defaults to 2')
+    race_parser.add_argument('--max-rounds', type=int, default=10, dest='max_rounds', help='Maximal number of rounds. Defaults to 10')
+    race_parser.add_argument('--attach-timestamp', action=argparse.BooleanOptionalAction, type=bool, default=True, dest='attach_timestamp',
+                             help='Whether a timestamp should be attached to output directory name')
+    race_parser.add_argument('--progress', action=argparse.BooleanOptionalAction, type=bool, default=False, dest='progress',
+                             help='Report progress of every round as single status line instead of logging start & completion of every series')
+    race_parser.set_defaults(handler=handle_cmd_race)
+
+
 def build_analyze_parser(subparsers: argparse._SubParsersAction) -> None:
     analyze_parser = subparsers.add_parser(name="analyze", help="Analyze experiment(s) result(s)")
     analyze_parser.add_argument('-i', '--input-dir', help='Directory with the result files', type=Path, required=True)
@@ -34,6 +112,14 @@ def build_analyze_parser(subparsers: argparse._SubParsersAction) -> None:
     analyze_parser.add_argument('-o', '--output-dir', type=Path, required=False, help='Ouput directory for analysis result. If not specified, no results are saved')
     analyze_parser.add_argument('-p', '--procs', type=int, required=False, help='Number of processes to run in parallel', default=1)
     analyze_parser.add_argument('--plot', type=bool, action=argparse.BooleanOptionalAction, required=False, default=True, dest='plot', help='Whether the plots should be created')
+    analyze_parser.add_argument('--cache', type=bool, action=argparse.BooleanOptionalAction, required=False, default=True, dest='cache',
+                                help='Whether event data should be cached in Parquet format in experiment directories (.ecdk_cache) & loaded from there on later runs')
+    analyze_parser.add_argument('--batch-dataset', type=bool, action=argparse.BooleanOptionalAction, required=False, default=False, dest='batch_dataset',
+                                help='Compute summary statistics by single query over data of all experiments joined together, instead of experiment by experiment')
+    analyze_parser.add_argument('--scan-threads', type=int, required=False, dest='scan_threads',
+                                help='Number of threads loading the experiment directories; by default picked based on number of cpus')
+    analyze_parser.add_argument('--window', type=int, required=False, dest='window',
+                                help='Number of experiments, which data is loaded to memory at once. Experiments are processed in windows of given size & only their summary statistics are kept; by default whole batch is loaded at once')
     analyze_parser.set_defaults(handler=handle_cmd_analyze)
 
 
@@ -76,6 +162,7 @@ def build_cli() -> argparse.ArgumentParser:
     )
 
     build_run_parser(subparsers)
+    build_race_parser(subparsers)
     build_analyze_parser(subparsers)
     build_compare_parser(subparsers)
     build_pefcmp_parser(subparsers)
@@ -1,4 +1,4 @@
-from .args import RunCmdArgs, AnalyzeCmdArgs, PerfcmpCmdArgs, CompareCmdArgs, ValidateInstanceSpecArgs
+from .args import RunCmdArgs, RaceCmdArgs, AnalyzeCmdArgs, PerfcmpCmdArgs, CompareCmdArgs, ValidateInstanceSpecArgs
 from context import Context
 
 
@@ -8,6 +8,12 @@ def handle_cmd_run(ctx: Context, args: RunCmdArgs):
     run(ctx, args)
 
 
+def handle_cmd_race(ctx: Context, args: RaceCmdArgs):
+    print(f"RaceCommand run with args: {args}")
+    from command.race import race
+    race(ctx, args)
+
+
 def handle_cmd_analyze(ctx: Context, args: AnalyzeCmdArgs):
     print(f"AnalyzeCommand run with args: {args}")
     from command.analyze import analyze
@@ -1,8 +1,11 @@
 import os
 from pathlib import Path
+from core.fs import queue_dir_for_batch
+from experiment.sweep import parse_grid_spec
 from .args import (
     Args,
     RunCmdArgs,
+    RaceCmdArgs,
     AnalyzeCmdArgs,
     PerfcmpCmdArgs,
     CompareCmdArgs,
@@ -20,7 +23,13 @@ def validate_run_cmd_args(args: RunCmdArgs):
     assert args.bin.is_file(), "Provided binary path must point to an existing file"
     assert os.access(args.bin, os.X_OK), "Provided binary file must have executable permission granted"
 
-    assert args.input_files is not None, "At least one input file / directory must be specified"
+    if args.resume_dir is not None:
+        assert args.resume_dir.is_dir(), f"Batch directory to resume {args.resume_dir} is not a directory"
+        assert args.resume_dir.joinpath('config.json').is_file(), f"{args.resume_dir} does not look like batch directory, config.json is missing"
+    elif args.join_queue_dir is not None:
+        assert queue_dir_for_batch(args.join_queue_dir).is_dir(), f"{args.join_queue_dir} does not contain task queue, was it run with --fs-queue?"
+    else:
+        assert args.input_files is not None, "At least one input file / directory must be specified"
 
     if args.input_files is not None:
         for file in args.input_files:
@@ -36,14 +45,76 @@ def validate_run_cmd_args(args: RunCmdArgs):
     if args.procs is not None:
         assert args.procs >= 1, f"Number of processes must be >= 1 but received {args.procs}"
 
-    if args.config_file is not None:
-        assert args.config_file.is_file(), "Specified config file must exist"
+    if args.config_files is not None:
+        for file in args.config_files:
+            assert file.is_file(), f"Specified config file {file} must exist"
+
+    if args.grid is not None:
+        assert args.resume_dir is None and args.join_queue_dir is None, "--grid can not be used with --resume or --join-queue"
+        parse_grid_spec(args.grid)
+
+    if args.task_timeout is not None:
+        assert args.task_timeout > 0, f"Task timeout must be > 0 but received {args.task_timeout}"
+
+    if args.timeout_factor is not None:
+        assert args.timeout_factor >= 1, f"Timeout factor must be >= 1 but received {args.timeout_factor}"
+
+    assert args.retries >= 0, f"Number of retries must be >= 0 but received {args.retries}"
+
+    assert args.cores_per_task >= 1, f"Number of cores per task must be >= 1 but received {args.cores_per_task}"
+
+    if args.speculate_after is not None:
+        assert args.speculate_after >= 1, f"Speculation threshold must be >= 1 but received {args.speculate_after}"
+
+    if args.log_size_cap is not None:
+        assert args.log_size_cap >= 0, f"Log size cap must be >= 0 but received {args.log_size_cap}"
+
+    if args.max_series is not None:
+        assert args.max_series >= (args.runs or 1), f"Maximal number of series must be >= --n-series but received {args.max_series}"
+        assert args.fitness_ci_width is None or args.fitness_ci_width > 0, f"Fitness CI width must be > 0 but received {args.fitness_ci_width}"
+        assert args.hit_ratio_ci_width is None or 0 < args.hit_ratio_ci_width < 1, \
+            f"Hit ratio CI width must be in (0, 1) but received {args.hit_ratio_ci_width}"
+
+    if args.stagnation_patience is not None:
+        assert args.stagnation_patience > 0, f"Stagnation patience must be > 0 but received {args.stagnation_patience}"
+
+    if args.stagnation_factor is not None:
+        assert args.stagnation_patience is not None, "Stagnation factor can be specified only together with --stagnation-patience"
+        assert args.stagnation_factor > 0, f"Stagnation factor must be > 0 but received {args.stagnation_factor}"
+
+    if args.min_predicted_gain is not None:
+        assert args.min_predicted_gain > 0, f"Minimal predicted gain must be > 0 but received {args.min_predicted_gain}"
+
+    if args.result_store_dir is not None:
+        assert args.result_store, "Result store directory can be specified only together with --result-store"
+        assert not args.result_store_dir.exists() or args.result_store_dir.is_dir(), f"Result store {args.result_store_dir} is not a directory"
+
+
+def validate_race_cmd_args(args: RaceCmdArgs):
+    assert args.bin.is_file(), "Provided binary path must point to an existing file"
+    assert os.access(args.bin, os.X_OK), "Provided binary file must have executable permission granted"
+
+    assert 2 <= len(args.config_files) <= 10, f"Between 2 and 10 configurations can be raced, received {len(args.config_files)}"
+    for file in args.config_files:
+        assert file.is_file(), f"Config file {file} does not exist"
+    stems = [file.stem for file in args.config_files]
+    assert len(set(stems)) == len(stems), f"Names of config files must be unique, received {stems}"
+
+    for file in args.input_files:
+        assert file.is_file() or file.is_dir(), f'{file} is neither a file nor a directory'
+
+    assert args.procs >= 1, f"Number of processes must be >= 1 but received {args.procs}"
+    assert 1 <= args.min_rounds <= args.max_rounds, f"Expected 1 <= --min-rounds <= --max-rounds, received {args.min_rounds}, {args.max_rounds}"
 
 
 def validate_analyze_cmd_args(args: AnalyzeCmdArgs):
     assert args.input_dir.is_dir(), f'{args.input_dir} is not a directory'
     if args.procs is not None:
         assert args.procs > 0, f'Number of processes must be > 0. Received {args.procs}'
+    if args.scan_threads is not None:
+        assert args.scan_threads > 0, f'Number of scanning threads must be > 0. Received {args.scan_threads}'
+    if args.window is not None:
+        assert args.window > 0, f'Window size must be > 0. Received {args.window}'
 
 
 def validate_perfcmp_cmd_args(args: PerfcmpCmdArgs):
@@ -66,6 +137,8 @@ def validate_cli_args(args: Args):
     match args.cmd_name:
         case 'run':
             validate_run_cmd_args(args)
+        case 'race':
+            validate_race_cmd_args(args)
         case 'analyze':
             validate_analyze_cmd_args(args)
         case 'perfcmp':
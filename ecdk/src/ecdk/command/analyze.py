@@ -7,9 +7,9 @@ from context import Context
 
 
 def analyze(ctx: Context, args: AnalyzeCmdArgs):
-    experiment_batch: list[Experiment] = extract_experiments_from_dir(args.input_dir)
+    experiment_batch: list[Experiment] = extract_experiments_from_dir(args.input_dir, args.scan_threads)
 
     if args.output_dir is not None:
         init_processed_data_file_hierarchy(experiment_batch, args.output_dir)
 
-    process_experiment_batch_output(experiment_batch, args.output_dir, args.procs, args.plot)
+    process_experiment_batch_output(experiment_batch, args.output_dir, args.procs, args.plot, args.cache, args.batch_dataset, args.window)
@@ -0,0 +1,96 @@
+import json
+from pathlib import Path
+from cli.args import RaceCmdArgs
+from experiment.race import ConfigRace
+from experiment.runner import LocalExperimentRunner
+from experiment.cost import TaskCostModel, TaskDurationHistory
+from experiment.solver import SolverProxy
+from experiment.model import (
+    ExperimentConfig,
+    Experiment,
+    ExperimentBatch,
+    SolverConfigFile,
+    SolverExecutableInfo,
+    EcdkInfo,
+)
+from data.file_resolver import resolve_all_input_files
+from data.tools import maybe_load_instance_metadata
+from core.tools import (
+    exp_name_from_input_file,
+    output_dir_for_experiment_with_name,
+    attach_timestamp_to_dir,
+    current_timestamp_iso8601
+)
+from core.fs import initialize_file_hierarchy
+from command.run import shrink_experiments_to_results
+from context import Context
+
+
+def race_summary_file(race_dir: Path) -> Path:
+    return race_dir.joinpath('race.json')
+
+
+def race(ctx: Context, args: RaceCmdArgs):
+    """ Races solver configurations on the instances. Every configuration gets its own batch directory inside the output
+    directory, with as many series as rounds the configuration survived, so the batches can be analyzed & compared as usual """
+    metadata_store = maybe_load_instance_metadata(args.metadata_file or ctx.instance_metadata_file)
+    input_files = resolve_all_input_files(args.input_files, recursive=False)
+
+    start_timestamp = current_timestamp_iso8601()
+    race_dir = args.output_dir
+    if not ctx.is_ares and args.attach_timestamp:
+        race_dir = attach_timestamp_to_dir(race_dir, start_timestamp)
+
+    solver_proxy = SolverProxy(args.bin)
+    solver_info = SolverExecutableInfo(version=solver_proxy.version())
+    ecdk_info = EcdkInfo(version=ctx.ecdk_version)
+
+    batches: dict[str, ExperimentBatch] = {}
+    for config_file in args.config_files:
+        batch_dir = race_dir.joinpath(config_file.stem)
+        experiments = []
+        for file in input_files:
+            name = exp_name_from_input_file(file)
+            metadata = metadata_store.get(name)
+            assert metadata is not None, f"Missing metadata for {name}. Aborting."
+            experiments.append(Experiment(
+                name=name,
+                instance=metadata,
+                config=ExperimentConfig(file, output_dir_for_experiment_with_name(name, batch_dir), config_file, args.max_rounds),
+                result=None,
+                batch_dir=batch_dir
+            ))
+        batches[config_file.stem] = ExperimentBatch(output_dir=batch_dir,
+                                                    experiments=experiments,
+                                                    solver_config=SolverConfigFile(config_file),
+                                                    start_time=start_timestamp,
+                                                    solver_info=solver_info,
+                                                    ecdk_info=ecdk_info)
+        initialize_file_hierarchy(batches[config_file.stem])
+
+    history_file = ctx.ecdk_task_history_path()
+    runner = LocalExperimentRunner(
+        solver_proxy,
+        cost_model=TaskCostModel(metadata_store, TaskDurationHistory.load(history_file)),
+        history_file=history_file,
+        progress=args.progress
+    )
+    config_race = ConfigRace(
+        runner,
+        {name: [exp.config for exp in batch.experiments] for name, batch in batches.items()},
+        min_rounds=args.min_rounds
+    )
+    rounds = config_race.run(args.max_rounds, args.procs)
+
+    for name, batch in batches.items():
+        shrink_experiments_to_results(batch.output_dir, batch.experiments, config_race.experiment_results(name))
+
+    with open(race_summary_file(race_dir), 'w') as file:
+        json.dump({
+            'configs': {name: str(batch.solver_config.path) for name, batch in batches.items()},
+            'instances': [str(file) for file in input_files],
+            'survivors': config_race.alive,
+            'rounds': [race_round.as_dict() for race_round in rounds],
+        }, file, indent=4)
+
+    print(f"Configurations left in the race: {', '.join(config_race.alive)}. Summary saved to {race_summary_file(race_dir)}")
@@ -1,28 +1,203 @@
+import os
+import json
+import shutil
+import dataclasses
 from cli.args import RunCmdArgs
-from experiment.runner import LocalExperimentBatchRunner, HyperQueueRunner
+from pathlib import Path
+from typing import Dict, Optional
+from experiment.runner import LocalExperimentBatchRunner, HyperQueueRunner, FsQueueRunner, TaskExecutionPolicy, completed_series_filter
+from experiment.cost import TaskCostModel, TaskDurationHistory
+from experiment.cache import ResultStore
+from experiment.adaptive import SeriesCountPolicy
+from core.convergence import StagnationRule
 from experiment.solver import SolverProxy
+from experiment.sweep import ConfigSweep, parse_grid_spec
 from experiment.model import (
     ExperimentConfig,
     Experiment,
     ExperimentBatch,
+    ExperimentResult,
     SolverConfigFile,
     SolverExecutableInfo,
     EcdkInfo,
 )
 from data.file_resolver import resolve_all_input_files
-from data.tools import maybe_load_instance_metadata
+from data.model import InstanceMetadata
+from data.tools import maybe_load_instance_metadata, experiment_desc_from_dir
 from core.tools import (
     exp_name_from_input_file,
     output_dir_for_experiment_with_name,
     attach_timestamp_to_dir,
     current_timestamp_iso8601
 )
-from core.fs import initialize_file_hierarchy
+from core.fs import (
+    initialize_file_hierarchy,
+    experiment_file_from_directory,
+    dump_experiment_config,
+    batch_config_file,
+    output_dir_for_series,
+    journal_file_for_batch,
+    concurrency_control_file_for_batch,
+    queue_dir_for_batch,
+    sweep_dir_for_batch
+)
+from core.concurrency import ConcurrencyController
+from core.placement import CorePlacement, is_pinning_supported
+from core.journal import RunJournal
 from core.version import Version
+from core.env import slurm_job_end_time
 from context import Context
 
 
+def series_count_policy_from_args(args: RunCmdArgs) -> Optional[SeriesCountPolicy]:
+    if args.max_series is None:
+        return None
+    return SeriesCountPolicy(
+        wave_size=args.runs or 1,
+        max_series=args.max_series,
+        fitness_ci_width=args.fitness_ci_width,
+        hit_ratio_ci_width=args.hit_ratio_ci_width
+    )
+
+
+def shrink_experiments_to_results(batch_dir: Path, experiments: list[Experiment], results: list[ExperimentResult]):
+    """ Experiments of adaptive run might end up with fewer series than prepared for, so directories of series that
+    have not been run are removed & configuration files are rewritten with actual number of series """
+    for exp, result in zip(experiments, results):
+        n_series = result.n_series()
+        if n_series == exp.config.n_series:
+            continue
+        for series_id in range(n_series, exp.config.n_series):
+            shutil.rmtree(output_dir_for_series(exp.config.output_dir, series_id), ignore_errors=True)
+        exp.config = dataclasses.replace(exp.config, n_series=n_series)
+        dump_experiment_config(exp)
+
+    config_file = batch_config_file(batch_dir)
+    with open(config_file, 'r') as file:
+        batch_config = json.load(file)
+    n_series = {exp.name: exp.config.n_series for exp in experiments}
+    for exp_dict in batch_config.get('configs', []):
+        if exp_dict['name'] in n_series:
+            exp_dict['config']['n_series'] = n_series[exp_dict['name']]
+    with open(config_file, 'w') as file:
+        json.dump(batch_config, file, indent=4)
+
+
+def stagnation_rule_from_args(args: RunCmdArgs) -> Optional[StagnationRule]:
+    if args.stagnation_patience is None and args.min_predicted_gain is None:
+        return None
+    return StagnationRule(
+        patience=args.stagnation_patience,
+        patience_factor=args.stagnation_factor,
+        min_predicted_gain=args.min_predicted_gain
+    )
+
+
+def run_locally(ctx: Context,
+                args: RunCmdArgs,
+                solver_proxy: SolverProxy,
+                experiments: list[Experiment],
+                batch_dir: Path,
+                metadata_store: Optional[Dict[str, InstanceMetadata]],
+                resume: bool = False):
+    experiment_configs = [exp.config for exp in experiments]
+    history_file = ctx.ecdk_task_history_path()
+    cost_model = TaskCostModel(metadata_store, TaskDurationHistory.load(history_file))
+    policy = TaskExecutionPolicy(
+        task_timeout=args.task_timeout,
+        timeout_factor=args.timeout_factor,
+        retry_limit=args.retries,
+        speculate_after=args.speculate_after,
+        deadline=args.deadline or slurm_job_end_time(),
+        compress_stdout=args.compress_logs,
+        stdout_size_cap=args.log_size_cap,
+        stagnation=stagnation_rule_from_args(args)
+    )
+    if policy.deadline is not None:
+        print(f"Series that would not complete before {policy.effective_deadline()} are not going to be started")
+
+    controller = None
+    if args.adaptive:
+        control_file = concurrency_control_file_for_batch(batch_dir)
+        controller = ConcurrencyController(max_limit=args.procs, control_file=control_file)
+        controller.install_signal_handlers()
+        print(f"Adaptive concurrency (max {args.procs} processes); to override the limit write it to {control_file} "
+              f"or send SIGUSR1 (+1) / SIGUSR2 (-1) to process {os.getpid()}")
+
+    placement = None
+    if args.pin:
+        if is_pinning_supported():
+            placement = CorePlacement(cores_per_task=args.cores_per_task)
+            assert placement.n_slots > 0, f"Not enough physical cores to dedicate {args.cores_per_task} to single process"
+            if placement.n_slots < args.procs:
+                print(f"[WARN] Only {placement.n_slots} cpu sets available for pinning, running at most {placement.n_slots} processes in parallel")
+        else:
+            print("[WARN] CPU pinning is not supported on this platform, processes will not be pinned")
+
+    result_store = None
+    if args.result_store:
+        result_store = ResultStore(args.result_store_dir or ctx.ecdk_result_store_dir())
+        print(f"Series already present in result store {result_store.root} are not going to be run again")
+
+    series_policy = series_count_policy_from_args(args)
+    if series_policy is not None:
+        print(f"Running series in waves of {series_policy.wave_size} until the results are precise enough, at most {series_policy.max_series} per experiment")
+
+    with RunJournal(journal_file_for_batch(batch_dir)) as journal:
+        skip = completed_series_filter(journal) if resume else None
+        results = LocalExperimentBatchRunner(
+            solver_proxy,
+            experiment_configs,
+            cost_model=cost_model,
+            history_file=history_file,
+            batch_dir=batch_dir,
+            journal=journal,
+            skip=skip,
+            policy=policy,
+            controller=controller,
+            placement=placement,
+            progress=args.progress,
+            result_store=result_store,
+            series_policy=series_policy,
+            best_known=[exp.instance.best_solution if exp.instance is not None else None for exp in experiments]
+        ).run(process_limit=args.procs)
+
+    if series_policy is not None:
+        shrink_experiments_to_results(batch_dir, experiments, results)
+
+
+def resume(ctx: Context, args: RunCmdArgs):
+    """ Continues batch that has been interrupted, running only the series that are missing or have failed """
+    metadata_store = maybe_load_instance_metadata(args.metadata_file or ctx.instance_metadata_file)
+    batch_dir: Path = args.resume_dir
+
+    experiments = [
+        experiment_desc_from_dir(directory)
+        for directory in sorted(batch_dir.iterdir())
+        if experiment_file_from_directory(directory).is_file()
+    ]
+    assert len(experiments) > 0, f"No experiments found in {batch_dir}"
+
+    print(f"Resuming batch {batch_dir} with {len(experiments)} experiments")
+    run_locally(ctx, args, SolverProxy(args.bin), experiments, batch_dir, metadata_store, resume=True)
+
+
+def work_on_queue(args: RunCmdArgs, runner: FsQueueRunner):
+    print(f"Processing queue {runner.queue.directory} with {args.procs} processes")
+    runinfo = runner.work(process_limit=args.procs)
+    print(f"Worker completed {runinfo.success_count + runinfo.failed_count} series (OK: {runinfo.success_count}, ERR: {runinfo.failed_count}) in {runinfo.duration}")
+
+
 def run(ctx: Context, args: RunCmdArgs):
+    if args.resume_dir is not None:
+        resume(ctx, args)
+        return
+
+    if args.join_queue_dir is not None:
+        # Series of batch started with --fs-queue are processed alongside other workers
+        work_on_queue(args, FsQueueRunner(SolverProxy(args.bin), queue_dir_for_batch(args.join_queue_dir)))
+        return
+
     metadata_store = maybe_load_instance_metadata(args.metadata_file or ctx.instance_metadata_file)
 
     # Not recursive as we don't want to load Taillard specification
@@ -35,27 +210,36 @@ def run(ctx: Context, args: RunCmdArgs):
     if not ctx.is_ares and args.attach_timestamp:
         base_dir = attach_timestamp_to_dir(base_dir, start_timestamp)
 
+    sweep = ConfigSweep(args.config_files or [], parse_grid_spec(args.grid) if args.grid else None)
+    # Configurations are generated into the batch directory, so the batch is self-contained
+    sweep_configs = sweep.materialize(sweep_dir_for_batch(base_dir)) or [None]
+    if not sweep.is_trivial():
+        print(f"Sweep of {len(sweep_configs)} solver configurations: {', '.join(cfg.name for cfg in sweep_configs)}")
+
     batch = []
     for file in input_files:
-        name = exp_name_from_input_file(file)
-        metadata = metadata_store.get(name)
-        assert metadata is not None, f"Missing metadata for {metadata}. Aborting."
-        out_dir = output_dir_for_experiment_with_name(name, base_dir)
-        batch.append(
-            Experiment(
-                name=name,
-                instance=metadata,  # WARN: This may fail for few experiments
-                config=ExperimentConfig(file,
-                                        out_dir,
-                                        args.config_file,
-                                        args.runs if args.runs else 1),
-                result=None,
-                batch_dir=base_dir
+        instance_name = exp_name_from_input_file(file)
+        metadata = metadata_store.get(instance_name)
+        assert metadata is not None, f"Missing metadata for {instance_name}. Aborting."
+        for sweep_config in sweep_configs:
+            name = sweep.experiment_name(instance_name, sweep_config)
+            out_dir = output_dir_for_experiment_with_name(name, base_dir)
+            batch.append(
+                Experiment(
+                    name=name,
+                    instance=metadata,  # WARN: This may fail for few experiments
+                    config=ExperimentConfig(file,
+                                            out_dir,
+                                            sweep_config.path if sweep_config is not None else None,
+                                            args.max_series or args.runs or 1),
+                    result=None,
+                    batch_dir=base_dir
+                )
             )
-        )
 
     solver_proxy = SolverProxy(args.bin)
-    solver_config = SolverConfigFile(args.config_file) if args.config_file else None
+    # Batch-wide solver config is described only when all the experiments share it
+    solver_config = SolverConfigFile(sweep_configs[0].path) if sweep.is_trivial() and sweep_configs[0] is not None else None
     solver_info = SolverExecutableInfo(version=solver_proxy.version())
     ecdk_info = EcdkInfo(version=ctx.ecdk_version)
 
@@ -64,20 +248,22 @@ def run(ctx: Context, args: RunCmdArgs):
                             solver_config=solver_config,
                             start_time=start_timestamp,
                             solver_info=solver_info,
-                            ecdk_info=ecdk_info)
+                            ecdk_info=ecdk_info,
+                            sweep=sweep if not sweep.is_trivial() else None)
 
     # Create file hierarchy & dump configuration data
     initialize_file_hierarchy(batch)
 
-    experiment_configs = [exp.config for exp in batch.experiments]
-
     if args.hq and ctx.is_ares:
         HyperQueueRunner(solver_proxy).run(batch, ctx=ctx, postprocess=args.experimental_postprocess)
+    elif args.fs_queue:
+        configs = [exp.config for exp in batch.experiments]
+        runner = FsQueueRunner(solver_proxy, queue_dir_for_batch(batch.output_dir))
+        runner.enqueue(configs, TaskCostModel(metadata_store, TaskDurationHistory.load(ctx.ecdk_task_history_path())))
+        print(f"Enqueued {sum(cfg.n_series for cfg in configs)} series, other workers can join with --join-queue {batch.output_dir}")
+        work_on_queue(args, runner)
     else:
-        LocalExperimentBatchRunner(
-            solver_proxy,
-            experiment_configs
-        ).run(process_limit=args.procs)
+        run_locally(ctx, args, solver_proxy, batch.experiments, batch.output_dir, metadata_store)
 
 
 if __name__ == "__main__":
@@ -41,6 +41,15 @@ class Context:
     def ecdk_db_path(self) -> Path:
         return get_data_dir_from_ecdk_dir(self.ecdk_dir).joinpath('main.db')
 
+    def ecdk_task_history_path(self) -> Path:
+        return get_data_dir_from_ecdk_dir(self.ecdk_dir).joinpath('task_history.csv')
+
+    def ecdk_result_store_dir(self) -> Path:
+        # Long-term storage is shared between the batches & survives scratch purges
+        if self.long_term_cache_dir is not None:
+            return self.long_term_cache_dir.joinpath('ecdk-result-store')
+        return get_data_dir_from_ecdk_dir(self.ecdk_dir).joinpath('result_store')
+
     def ecdk_instance_solutions_dir(self) -> Path:
         return get_raw_solutions_dir_from_data_dir(self.ecdk_input_data_dir())
 
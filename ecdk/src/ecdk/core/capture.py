@@ -0,0 +1,94 @@
+import gzip
+from pathlib import Path
+from typing import Optional, Callable
+
+SOLVER_DESC_BEGIN_MARKER = b'BEGIN_SOLVER_DESC'
+SOLVER_DESC_END_MARKER = b'END_SOLVER_DESC'
+
+
+class OutputSink:
+    ''' Consumer of output of the task process, fed with chunks as they are read from the pipe '''
+
+    def write(self, chunk: bytes):
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class LogFileSink(OutputSink):
+    ''' Writes the output to file. When `max_bytes` is specified, only that many bytes are kept, the rest
+        is dropped & a note with number of dropped bytes is appended at the end. '''
+
+    def __init__(self, file: Path, max_bytes: Optional[int] = None):
+        self.file: Path = file
+        self.max_bytes: Optional[int] = max_bytes
+        self.written: int = 0
+        self.dropped: int = 0
+        self._fd = self._open()
+
+    def _open(self):
+        return open(self.file, 'wb')
+
+    def write(self, chunk: bytes):
+        if self.max_bytes is not None:
+            allowed = max(self.max_bytes - self.written, 0)
+            self.dropped += max(len(chunk) - allowed, 0)
+            chunk = chunk[:allowed]
+        if chunk:
+            self._fd.write(chunk)
+            self.written += len(chunk)
+
+    def close(self):
+        if self._fd is None:
+            return
+        if self.dropped > 0:
+            self._fd.write(f'\n[ecdk] Output truncated, {self.dropped} bytes dropped\n'.encode())
+        self._fd.close()
+        self._fd = None
+
+
+class CompressedLogSink(LogFileSink):
+    ''' Writes the output gzip-compressed on the fly, `max_bytes` limits size of uncompressed output '''
+
+    def __init__(self, file: Path, max_bytes: Optional[int] = None, compress_level: int = 6):
+        self.compress_level: int = compress_level
+        super().__init__(file, max_bytes)
+
+    def _open(self):
+        return gzip.open(self.file, 'wb', compresslevel=self.compress_level)
+
+
+class SolverDescCapture(OutputSink):
+    ''' Passes the output through to `sink`, extracting the solver description block (`BEGIN_SOLVER_DESC` ...
+        `END_SOLVER_DESC`) on the way. The block is expected at the beginning of the output, so only first
+        `scan_limit` bytes are searched. '''
+
+    def __init__(self, sink: OutputSink, on_captured: Callable[[str], None], scan_limit: int = 1 << 20):
+        ''' :param on_captured: called with the description (contents between the markers, as in solver output) '''
+        self.sink: OutputSink = sink
+        self.on_captured: Callable[[str], None] = on_captured
+        self.scan_limit: int = scan_limit
+        self._buffer: Optional[bytearray] = bytearray()
+
+    def write(self, chunk: bytes):
+        self.sink.write(chunk)
+        if self._buffer is None:
+            return
+        self._buffer.extend(chunk)
+
+        begin = self._buffer.find(SOLVER_DESC_BEGIN_MARKER)
+        if begin >= 0:
+            # Description starts on the line after the marker, and ends right before the line with end marker
+            desc_start = self._buffer.find(b'\n', begin)
+            end = self._buffer.find(SOLVER_DESC_END_MARKER, desc_start if desc_start >= 0 else begin)
+            if desc_start >= 0 and end >= 0:
+                self.on_captured(self._buffer[desc_start + 1:end].decode(errors='replace'))
+                self._buffer = None
+                return
+
+        if len(self._buffer) > self.scan_limit:
+            self._buffer = None
+
+    def close(self):
+        self.sink.close()
@@ -0,0 +1,149 @@
+import os
+import math
+import signal
+import datetime as dt
+from pathlib import Path
+from typing import Optional, Iterable
+
+
+def _read_meminfo() -> dict[str, int]:
+    ''' :returns: mapping field name -> value in KiB, parsed from /proc/meminfo, empty if it is not available '''
+    fields: dict[str, int] = {}
+    try:
+        with open('/proc/meminfo', 'r') as file:
+            for line in file:
+                name, _, value = line.partition(':')
+                fields[name] = int(value.split()[0])
+    except (OSError, ValueError, IndexError):
+        return {}
+    return fields
+
+
+def _read_process_rss(pid: int) -> Optional[int]:
+    ''' :returns: current resident set size of the process in KiB, None if it can not be determined '''
+    try:
+        with open(f'/proc/{pid}/status', 'r') as file:
+            for line in file:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def available_cpus() -> int:
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class ConcurrencyController:
+    ''' Decides how many tasks may run simultaneously, re-evaluated by the scheduler while the batch is running.
+        Lowering the limit never stops running tasks, it only holds off starting new ones.
+
+        The limit is the minimum of:
+
+        1. `max_limit`, possibly overridden by the operator - either by writing a number to `control_file`
+           or by sending SIGUSR1 (+1) / SIGUSR2 (-1) to the runtime process (see `install_signal_handlers`),
+        2. number of cores not busy with processes other than ours, according to 1 minute load average,
+        3. number of tasks that fit into available memory, given the largest RSS observed for a task so far.
+
+        To avoid oscillation, after the initial evaluation the limit drops immediately but grows by at most one every `interval` seconds.
+        It never drops below `min_limit`, so the batch always makes progress. '''
+
+    def __init__(self,
+                 max_limit: int,
+                 min_limit: int = 1,
+                 control_file: Optional[Path] = None,
+                 memory_reserve_mb: float = 512,
+                 interval: float = 2.0):
+        assert 1 <= min_limit <= max_limit, f"Expected 1 <= min_limit <= max_limit, received {min_limit}, {max_limit}"
+        self.max_limit: int = max_limit
+        self.min_limit: int = min_limit
+        self.control_file: Optional[Path] = control_file
+        self.memory_reserve_kb: int = int(memory_reserve_mb * 1024)
+        self.interval: float = interval
+
+        # Limit requested by the operator, None means `max_limit`
+        self.operator_limit: Optional[int] = None
+        self._control_file_mtime: Optional[float] = None
+
+        self._peak_task_rss: int = 0  # KiB
+        self._current: Optional[int] = None
+        self._last_increase: Optional[dt.datetime] = None
+
+    def install_signal_handlers(self):
+        ''' Must be called from the main thread '''
+        if not hasattr(signal, 'SIGUSR1'):
+            return
+        signal.signal(signal.SIGUSR1, lambda *_: self.__adjust_operator_limit(1))
+        signal.signal(signal.SIGUSR2, lambda *_: self.__adjust_operator_limit(-1))
+
+    def __adjust_operator_limit(self, delta: int):
+        current = self.operator_limit if self.operator_limit is not None else self.max_limit
+        self.operator_limit = max(self.min_limit, current + delta)
+
+    def __read_control_file(self):
+        if self.control_file is None:
+            return
+        try:
+            mtime = self.control_file.stat().st_mtime
+        except OSError:
+            return
+        if mtime == self._control_file_mtime:
+            return
+        self._control_file_mtime = mtime
+        try:
+            self.operator_limit = max(self.min_limit, int(self.control_file.read_text().strip()))
+        except ValueError:
+            print(f'[{dt.datetime.now()}][WARN] Ignoring malformed concurrency control file {self.control_file}')
+
+    def observe_peak_rss(self, max_rss: Optional[int]):
+        ''' Records peak RSS (KiB) of completed task '''
+        if max_rss is not None:
+            self._peak_task_rss = max(self._peak_task_rss, max_rss)
+
+    def cpu_limit(self, n_running: int) -> Optional[int]:
+        if not hasattr(os, 'getloadavg'):
+            return None
+        # Our own processes contribute to the load, only the rest is foreign
+        foreign_load = max(os.getloadavg()[0] - n_running, 0)
+        return math.floor(available_cpus() - foreign_load)
+
+    def memory_limit(self, running_pids: list[int]) -> Optional[int]:
+        for pid in running_pids:
+            self.observe_peak_rss(_read_process_rss(pid))
+        if self._peak_task_rss == 0:
+            return None
+        mem_available = _read_meminfo().get('MemAvailable')
+        if mem_available is None:
+            return None
+        # Running tasks might still grow up to the peak
+        running_rss = sum(filter(None, map(_read_process_rss, running_pids)))
+        headroom = mem_available - self.memory_reserve_kb - (self._peak_task_rss * len(running_pids) - running_rss)
+        return len(running_pids) + math.floor(headroom / self._peak_task_rss)
+
+    def limit(self, running_pids: Iterable[int] = ()) -> int:
+        ''' :param running_pids: pids of currently running task processes
+            :returns: number of tasks that may run simultaneously right now '''
+        running_pids = list(running_pids)
+        self.__read_control_file()
+
+        bounds = [self.max_limit if self.operator_limit is None else self.operator_limit]
+        bounds.extend(filter(lambda b: b is not None, (self.cpu_limit(len(running_pids)), self.memory_limit(running_pids))))
+        target = max(self.min_limit, min(bounds))
+
+        now = dt.datetime.now()
+        if self._current is None:
+            print(f'[{now}][LIMIT] Initial concurrency limit {target}')
+            self._current = target
+        elif target > self._current:
+            if self._last_increase is not None and (now - self._last_increase).total_seconds() < self.interval:
+                return self._current
+            target = self._current + 1
+            self._last_increase = now
+
+        if target != self._current:
+            print(f'[{now}][LIMIT] Concurrency limit {self._current} -> {target}')
+            self._current = target
+        return self._current
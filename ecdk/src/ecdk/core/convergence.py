@@ -0,0 +1,114 @@
+from pathlib import Path
+from typing import NamedTuple, Optional, Dict
+
+
+class Improvement(NamedTuple):
+    ''' New best solution reported by the solver (single `newbest` event) '''
+    generation: int
+    time: float  # seconds since the solver start
+    fitness: float
+
+
+class _EventFileTail:
+    ''' Reads lines appended to the event file since the last read. The file might not exist yet, and its last line
+        might be still partially written. '''
+
+    def __init__(self, file: Path):
+        self.file: Path = file
+        self.offset: int = 0
+        self._partial: bytes = b''
+
+    def read_lines(self) -> list[str]:
+        try:
+            with open(self.file, 'rb') as fd:
+                fd.seek(self.offset)
+                data = fd.read()
+        except FileNotFoundError:
+            return []
+        self.offset += len(data)
+        data = self._partial + data
+        complete, _, self._partial = data.rpartition(b'\n')
+        return complete.decode(errors='replace').splitlines() if complete else []
+
+
+class StagnationRule(NamedTuple):
+    ''' Criteria of stopping series that are not expected to improve their result anymore. Series is stopped when
+        either of the enabled criteria is met, but never before it has been running for `min_runtime` seconds. '''
+
+    # Series is stopped after this many seconds without new best solution. None disables the criterion.
+    patience: Optional[float] = None
+
+    # Additionally to `patience`, time without improvement must exceed this multiple of the time the last improvement has
+    # been found at, so the series that improve slowly but steadily are not stopped. None disables this condition.
+    patience_factor: Optional[float] = None
+
+    # Series is stopped once the improvement of fitness predicted for the rest of its expected duration drops below this
+    # fraction of the current fitness. Rate of improvement is taken from the last `window` improvements. The criterion is
+    # used only for series with known expected duration. None disables the criterion.
+    min_predicted_gain: Optional[float] = None
+    window: int = 5
+
+    min_runtime: float = 0
+
+
+class ConvergenceMonitor:
+    ''' Follows the best solutions reported by running series (tails their `newbest` event files)
+        and decides which series should be stopped according to the `rule`. '''
+
+    # Column layout of newbest event file: event_name,generation,total_duration (ms),fitness
+    GENERATION_COL = 1
+    TIME_COL = 2
+    FITNESS_COL = 3
+
+    def __init__(self, rule: StagnationRule, interval: float = 5.0):
+        ''' :param interval: how often the running series should be checked, in seconds '''
+        assert rule.patience is not None or rule.min_predicted_gain is not None, "At least one stopping criterion must be enabled"
+        self.rule: StagnationRule = rule
+        self.interval: float = interval
+        self._tails: Dict[int, _EventFileTail] = {}
+        self._improvements: Dict[int, list[Improvement]] = {}
+
+    def __parse(self, line: str) -> Optional[Improvement]:
+        fields = line.split(',')
+        try:
+            return Improvement(int(fields[self.GENERATION_COL]), float(fields[self.TIME_COL]) / 1000, float(fields[self.FITNESS_COL]))
+        except (ValueError, IndexError):
+            # Header
+            return None
+
+    def improvements(self, key: int, progress_file: Path) -> list[Improvement]:
+        tail = self._tails.setdefault(key, _EventFileTail(progress_file))
+        improvements = self._improvements.setdefault(key, [])
+        improvements.extend(filter(None, map(self.__parse, tail.read_lines())))
+        return improvements
+
+    def check(self, key: int, progress_file: Path, elapsed: float, expected_duration: Optional[float] = None) -> Optional[str]:
+        ''' :param key: identifies the series (process) across the calls
+            :param progress_file: newbest event file of the series
+            :param elapsed: running time of the series in seconds
+            :param expected_duration: predicted total running time of the series in seconds
+            :returns: reason for stopping the series, None if it should continue '''
+        improvements = self.improvements(key, progress_file)
+        # Series is never stopped before it reports any solution, as it would be left without result
+        if elapsed < self.rule.min_runtime or len(improvements) == 0:
+            return None
+
+        last_time = improvements[-1].time
+        stagnant_for = elapsed - last_time
+        if self.rule.patience is not None and stagnant_for >= self.rule.patience:
+            if self.rule.patience_factor is None or stagnant_for >= self.rule.patience_factor * last_time:
+                return f'no improvement for {stagnant_for:.0f}s'
+
+        if self.rule.min_predicted_gain is not None and expected_duration is not None and len(improvements) >= 2:
+            window = improvements[-self.rule.window:]
+            span = max(elapsed - window[0].time, 1e-3)
+            rate = (window[0].fitness - window[-1].fitness) / span
+            predicted_gain = rate * max(expected_duration - elapsed, 0)
+            if predicted_gain < self.rule.min_predicted_gain * abs(window[-1].fitness):
+                return f'predicted improvement {predicted_gain:.2f} of fitness {window[-1].fitness:.0f}'
+
+        return None
+
+    def forget(self, key: int):
+        self._tails.pop(key, None)
+        self._improvements.pop(key, None)
@@ -1,4 +1,5 @@
 import os
+import datetime as dt
 from typing import Callable, Optional, TypeVar, Literal
 from pathlib import Path
 
@@ -22,6 +23,9 @@ class ArrayJobSpec:
         """ ID if the job we are currently in """
         self.array_task_id: Optional[int] = getmap_env('SLURM_ARRAY_TASK_ID', int)
 
+        """ Number of cpus allocated for every task of the job-array (set only if --cpus-per-task was specified) """
+        self.cpus_per_task: Optional[int] = getmap_env('SLURM_CPUS_PER_TASK', int)
+
     def last_task_id(self) -> Optional[int]:
         return self.array_task_count - 1
 
@@ -59,6 +63,11 @@ def getmap_env(var: str, mapfunc: Callable[[str], T]) -> Optional[T]:
     return mapfunc(var_as_str)
 
 
+def slurm_job_end_time() -> Optional[dt.datetime]:
+    """ End of the Slurm allocation the process runs in, if it is known """
+    return getmap_env('SLURM_JOB_END_TIME', lambda ts: dt.datetime.fromtimestamp(int(ts)))
+
+
 def get_runtime_name() -> RuntimeName:
     """ Hacky way to detect whether we are running on Ares or not """
     username = os.getenv('USER', default=None)
@@ -11,6 +11,40 @@ def experiment_file_resolver(experiment: Experiment) -> Path:
     return experiment_file_from_directory(experiment.config.output_dir)
 
 
+def experiment_dir_in_batch(experiment: Experiment) -> Path:
+    """ Directory of experiment loaded from batch directory. Unlike `config.output_dir` it remains valid
+    when the batch directory has been moved since the run """
+    return experiment.batch_dir.joinpath(experiment.config.output_dir.name)
+
+
+def accounting_file_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('accounting.csv')
+
+
+def journal_file_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('journal.jsonl')
+
+
+def concurrency_control_file_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('procs')
+
+
+def status_file_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('status.json')
+
+
+def solver_desc_file_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('solver_desc.json')
+
+
+def sweep_dir_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('sweep')
+
+
+def queue_dir_for_batch(batch_dir: Path) -> Path:
+    return batch_dir.joinpath('queue')
+
+
 def output_dir_for_series(base_output_dir: Path, series_id: int) -> Path:
     dir_name = base_output_dir.stem + \
         '-series-' + \
@@ -18,6 +52,10 @@ def output_dir_for_series(base_output_dir: Path, series_id: int) -> Path:
     return base_output_dir.joinpath(dir_name)
 
 
+def event_file_for_series(series_dir: Path, event_name: str) -> Path:
+    return series_dir.joinpath(f'event_{event_name}.csv')
+
+
 def solver_logfile_for_series(base_output_dir: Path, series_id: int) -> Path:
     directory = output_dir_for_series(base_output_dir, series_id)
     return directory.joinpath('stdout.log')
@@ -31,6 +69,16 @@ def dump_exp_batch_config(config_file: Path, batch: ExperimentBatch):
         json.dump(joined_config, file, indent=4)
 
 
+def dump_experiment_config(experiment: Experiment):
+    experiment_file = experiment_file_resolver(experiment)
+    with open(experiment_file, 'w') as file:
+        json.dump(experiment.as_dict(), file, indent=4)
+
+
+def batch_config_file(batch_dir: Path) -> Path:
+    return batch_dir.joinpath("config.json")
+
+
 # TODO: This function should not be here
 def initialize_file_hierarchy(batch: ExperimentBatch):
     """ Creates directory structure for the output & dumps experiments / series configuration
@@ -42,7 +90,7 @@ def initialize_file_hierarchy(batch: ExperimentBatch):
 
     base_dir = batch.output_dir
     base_dir.mkdir(parents=True, exist_ok=True)
-    config_file = base_dir.joinpath("config.json")
+    config_file = batch_config_file(base_dir)
 
     dump_exp_batch_config(config_file, batch)
 
@@ -52,9 +100,7 @@ def initialize_file_hierarchy(batch: ExperimentBatch):
             series_dir = output_dir_for_series(experiment.config.output_dir, series_i)
             series_dir.mkdir(parents=True, exist_ok=True)
 
-        experiment_file = experiment_file_resolver(experiment)
-        with open(experiment_file, 'w') as file:
-            json.dump(experiment.as_dict(), file, indent=4)
+        dump_experiment_config(experiment)
 
 
 def get_main_plotdir(basedir: Path) -> Path:
@@ -0,0 +1,155 @@
+import os
+import json
+import time
+import socket
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+
+class Lease(NamedTuple):
+    ''' Task claimed by a worker. The worker owns the task as long as the lease file exists in the claimed directory. '''
+    name: str  # name of the task file in the queue
+    path: Path  # current location of the task file (in the claimed directory)
+    payload: dict
+
+
+class FsTaskQueue:
+    ''' Task queue kept in a directory on filesystem shared by the workers, which does not need any service running.
+
+        Every task is a JSON file, which moves between subdirectories `pending` -> `claimed` -> `done` / `failed`.
+        All the transitions are done with `os.rename`, which is atomic also on network filesystems (NFS, Lustre),
+        so exactly one worker succeeds in claiming given task. Claimed file is suffixed with id of the worker, and its
+        mtime is the heartbeat of the lease - lease that has not been renewed for `lease_timeout` seconds is considered
+        abandoned (e.g. the worker node crashed) & any worker puts the task back to `pending`.
+
+        Tasks are claimed in lexicographic order of their names. '''
+
+    PENDING = 'pending'
+    CLAIMED = 'claimed'
+    DONE = 'done'
+    FAILED = 'failed'
+
+    OWNER_SEPARATOR = '@'
+
+    def __init__(self, directory: Path, worker_id: Optional[str] = None, lease_timeout: float = 300):
+        self.directory: Path = directory
+        self.worker_id: str = worker_id or f'{socket.gethostname()}-{os.getpid()}'
+        self.lease_timeout: float = lease_timeout
+        assert self.OWNER_SEPARATOR not in self.worker_id, f"Worker id must not contain '{self.OWNER_SEPARATOR}'"
+        for state in (self.PENDING, self.CLAIMED, self.DONE, self.FAILED):
+            self.directory.joinpath(state).mkdir(parents=True, exist_ok=True)
+
+    def _dir(self, state: str) -> Path:
+        return self.directory.joinpath(state)
+
+    def _count(self, state: str) -> int:
+        return sum(1 for _ in os.scandir(self._dir(state)))
+
+    def put(self, name: str, payload: dict):
+        ''' Adds the task to the queue. File is written under temporary name first, so no worker sees it partially written '''
+        tmp_file = self._dir(self.PENDING).joinpath(f'.{name}.tmp')
+        with open(tmp_file, 'w') as file:
+            json.dump(payload, file)
+        os.rename(tmp_file, self._dir(self.PENDING).joinpath(name))
+
+    def claim(self) -> Optional[Lease]:
+        ''' :returns: lease of the first pending task, None if there are no pending tasks '''
+        for name in sorted(entry.name for entry in os.scandir(self._dir(self.PENDING)) if not entry.name.startswith('.')):
+            lease_path = self._dir(self.CLAIMED).joinpath(f'{name}{self.OWNER_SEPARATOR}{self.worker_id}')
+            try:
+                os.rename(self._dir(self.PENDING).joinpath(name), lease_path)
+            except FileNotFoundError:
+                # Claimed by other worker in the meantime
+                continue
+            os.utime(lease_path)
+            with open(lease_path, 'r') as file:
+                return Lease(name, lease_path, json.load(file))
+        return None
+
+    def renew(self, lease: Lease) -> bool:
+        ''' :returns: False if the lease has been lost, i.e. it expired & the task has been put back to the queue '''
+        try:
+            os.utime(lease.path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def complete(self, lease: Lease, ok: bool) -> bool:
+        ''' Moves the task to `done` or `failed` directory.
+
+            :returns: False if the lease has been lost in the meantime, the task is going to be run by other worker then '''
+        try:
+            os.rename(lease.path, self._dir(self.DONE if ok else self.FAILED).joinpath(lease.name))
+            return True
+        except FileNotFoundError:
+            return False
+
+    def requeue_expired(self) -> list[str]:
+        ''' Puts tasks with leases that have not been renewed for `lease_timeout` seconds back to the queue.
+
+            :returns: names of requeued tasks '''
+        requeued = []
+        now = time.time()
+        for entry in os.scandir(self._dir(self.CLAIMED)):
+            try:
+                expired = now - entry.stat().st_mtime > self.lease_timeout
+            except FileNotFoundError:
+                continue
+            if not expired:
+                continue
+            name = entry.name.rpartition(self.OWNER_SEPARATOR)[0]
+            try:
+                os.rename(entry.path, self._dir(self.PENDING).joinpath(name))
+                requeued.append(name)
+            except FileNotFoundError:
+                # Completed, or requeued by other worker in the meantime
+                continue
+        return requeued
+
+    def pending_count(self) -> int:
+        return sum(1 for entry in os.scandir(self._dir(self.PENDING)) if not entry.name.startswith('.'))
+
+    def claimed_count(self) -> int:
+        return self._count(self.CLAIMED)
+
+    def is_drained(self) -> bool:
+        ''' Whether there are no tasks pending nor being processed '''
+        return self.pending_count() == 0 and self.claimed_count() == 0
+
+
+class LeaseKeeper:
+    ''' Renews held leases periodically on a background thread, as long as the tasks are running. '''
+
+    def __init__(self, queue: FsTaskQueue, interval: Optional[float] = None):
+        self.queue: FsTaskQueue = queue
+        self.interval: float = interval if interval is not None else queue.lease_timeout / 4
+        self._leases: dict[str, Lease] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.__renew_loop, name='lease-keeper', daemon=True)
+
+    def __renew_loop(self):
+        while not self._stop.wait(self.interval):
+            with self._lock:
+                leases = list(self._leases.values())
+            for lease in leases:
+                if not self.queue.renew(lease):
+                    print(f'[WARN] Lease of {lease.name} has been lost')
+                    self.release(lease)
+
+    def hold(self, lease: Lease):
+        with self._lock:
+            self._leases[lease.name] = lease
+
+    def release(self, lease: Lease):
+        with self._lock:
+            self._leases.pop(lease.name, None)
+
+    def __enter__(self) -> 'LeaseKeeper':
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
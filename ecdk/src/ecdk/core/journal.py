@@ -0,0 +1,67 @@
+import os
+import json
+import datetime as dt
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+
+class JournalEntry(NamedTuple):
+    ''' Single state transition of a task. '''
+    key: str
+    state: str
+    timestamp: str
+    return_code: Optional[int] = None
+
+
+class RunJournal:
+    ''' Append-only log of task state transitions kept in the batch directory. Each line is a separate JSON
+        object, and is flushed to disk before `record` returns, so the journal survives the runtime process
+        being killed at any point. At most the last line might be truncated, which is tolerated when loading.
+
+        Tasks are identified by their output directory, relative to the directory of the journal file. '''
+
+    STARTED = 'started'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+
+    def __init__(self, file: Path):
+        self.file: Path = file
+        self._fd = None
+
+    def key_for(self, task_dir: Path) -> str:
+        return os.path.relpath(task_dir, self.file.parent)
+
+    def record(self, task_dir: Path, state: str, return_code: Optional[int] = None):
+        if self._fd is None:
+            self._fd = open(self.file, 'a')
+        entry = JournalEntry(self.key_for(task_dir), state, dt.datetime.now().isoformat(), return_code)
+        self._fd.write(json.dumps(entry._asdict()) + '\n')
+        self._fd.flush()
+        os.fsync(self._fd.fileno())
+
+    def close(self):
+        if self._fd is not None:
+            self._fd.close()
+            self._fd = None
+
+    def last_states(self) -> Dict[str, JournalEntry]:
+        ''' :returns: mapping task key -> most recent journal entry for the task '''
+        states: Dict[str, JournalEntry] = {}
+        if not self.file.is_file():
+            return states
+
+        with open(self.file, 'r') as file:
+            for line in file:
+                try:
+                    entry = JournalEntry(**json.loads(line))
+                except (json.JSONDecodeError, TypeError):
+                    # Runtime might have been killed in the middle of writing the entry
+                    continue
+                states[entry.key] = entry
+        return states
+
+    def __enter__(self) -> 'RunJournal':
+        return self
+
+    def __exit__(self, *args):
+        self.close()
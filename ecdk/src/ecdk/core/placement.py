@@ -0,0 +1,92 @@
+import os
+import itertools as it
+from pathlib import Path
+from typing import NamedTuple, Optional, Callable
+
+CPU_SYSFS_DIR = Path('/sys/devices/system/cpu')
+
+
+class LogicalCpu(NamedTuple):
+    ''' Single hardware thread together with its position in the topology '''
+    id: int
+    core: tuple[int, ...]  # ids of SMT siblings (including this one), identify the physical core
+    package: int  # socket, used as approximation of NUMA node
+
+
+def _parse_cpu_list(text: str) -> list[int]:
+    ''' Parses kernel cpu list format, e.g. `0-3,8,10-11` '''
+    cpus = []
+    for part in text.strip().split(','):
+        if not part:
+            continue
+        first, _, last = part.partition('-')
+        cpus.extend(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def _read_cpu_topology(cpu: int, sysfs_dir: Path) -> LogicalCpu:
+    topology_dir = sysfs_dir.joinpath(f'cpu{cpu}', 'topology')
+    try:
+        siblings = tuple(_parse_cpu_list(topology_dir.joinpath('thread_siblings_list').read_text()))
+    except (OSError, ValueError):
+        siblings = (cpu, )
+    try:
+        package = int(topology_dir.joinpath('physical_package_id').read_text())
+    except (OSError, ValueError):
+        package = 0
+    return LogicalCpu(cpu, siblings, package)
+
+
+def is_pinning_supported() -> bool:
+    return hasattr(os, 'sched_setaffinity') and hasattr(os, 'sched_getaffinity')
+
+
+def cpu_topology(sysfs_dir: Path = CPU_SYSFS_DIR) -> list[LogicalCpu]:
+    ''' :returns: logical cpus the runtime process is allowed to run on, ordered by package & physical core '''
+    allowed = sorted(os.sched_getaffinity(0))
+    return sorted((_read_cpu_topology(cpu, sysfs_dir) for cpu in allowed), key=lambda c: (c.package, c.core, c.id))
+
+
+class CorePlacement:
+    ''' Pool of disjoint cpu sets, each one dedicated to single task process at a time.
+
+        Every set consists of `cores_per_task` physical cores from the same package, so multi-threaded solver does not
+        communicate across sockets. With `avoid_smt` only one hardware thread of every physical core is used, so tasks
+        do not share execution units & L1/L2 caches with each other. Cores that do not fill whole set are left unused. '''
+
+    def __init__(self, cores_per_task: int = 1, avoid_smt: bool = True, topology: Optional[list[LogicalCpu]] = None):
+        assert cores_per_task >= 1, f"Number of cores per task must be >= 1, received {cores_per_task}"
+        topology = topology if topology is not None else cpu_topology()
+        self.cores_per_task: int = cores_per_task
+        self.slots: list[tuple[int, ...]] = []
+
+        for _, package_cpus in it.groupby(topology, key=lambda c: c.package):
+            cores: list[tuple[int, ...]] = []
+            for _, core_cpus in it.groupby(package_cpus, key=lambda c: c.core):
+                threads = tuple(cpu.id for cpu in core_cpus)
+                cores.append(threads[:1] if avoid_smt else threads)
+            for i in range(0, len(cores) - cores_per_task + 1, cores_per_task):
+                self.slots.append(tuple(it.chain.from_iterable(cores[i:i + cores_per_task])))
+
+        self._free: list[tuple[int, ...]] = list(self.slots)
+
+    @property
+    def n_slots(self) -> int:
+        return len(self.slots)
+
+    def acquire(self) -> Optional[tuple[int, ...]]:
+        ''' :returns: free cpu set, None if all of them are taken '''
+        if len(self._free) == 0:
+            return None
+        return self._free.pop(0)
+
+    def release(self, cpus: tuple[int, ...]):
+        assert cpus in self.slots and cpus not in self._free, f"Releasing cpu set {cpus} that has not been acquired"
+        self._free.append(cpus)
+        self._free.sort(key=self.slots.index)
+
+    @staticmethod
+    def pinning_fn(cpus: tuple[int, ...]) -> Callable[[], None]:
+        ''' :returns: function binding the calling process to given cpus, meant to be run in the child process
+            before exec, so all the threads of the solver inherit the affinity '''
+        return lambda: os.sched_setaffinity(0, cpus)
@@ -0,0 +1,184 @@
+import os
+import sys
+import json
+import statistics
+import datetime as dt
+from pathlib import Path
+from typing import Dict, Optional, TextIO
+from core.scheduler import SchedulerObserver, Task, RunningTask, CompletedTask, RunInfo
+
+
+class ProgressTracker(SchedulerObserver):
+    ''' Tracks progress of the batch & periodically reports it as single status line on the terminal and as JSON
+        file (written atomically), that can be polled by other processes. Replaces per-task logging, only failures
+        are logged separately.
+
+        ETA is computed from predicted durations of the remaining tasks (`Task.expected_duration`), corrected by the
+        ratio of observed to predicted durations of completed tasks. Durations of tasks without prediction are
+        assumed to be the mean observed duration. The total remaining work is divided by the number of processes. '''
+
+    def __init__(self,
+                 groups: Dict[int, str],
+                 expected_durations: Optional[Dict[int, Optional[float]]] = None,
+                 status_file: Optional[Path] = None,
+                 refresh_interval: float = 2.0,
+                 stream: Optional[TextIO] = sys.stdout):
+        ''' :param groups: mapping task id -> name of the group (experiment) the task belongs to, for all the tasks in the batch
+            :param expected_durations: mapping task id -> predicted duration in seconds
+            :param status_file: if present, the status is saved there
+            :param refresh_interval: minimal interval in seconds between consecutive status updates
+            :param stream: terminal the status is printed to, None disables printing '''
+        self.groups: Dict[int, str] = groups
+        self.expected_durations: Dict[int, Optional[float]] = expected_durations or {}
+        self.status_file: Optional[Path] = status_file
+        self.refresh_interval: float = refresh_interval
+        self.stream: Optional[TextIO] = stream
+        self._is_tty: bool = stream is not None and stream.isatty()
+
+        self.process_limit: int = 1
+        self.start_time: dt.datetime = dt.datetime.now()
+        self.running: Dict[int, RunningTask] = {}  # pid -> task
+        self.completed: int = 0
+        self.failed: int = 0
+        self.skipped: int = 0
+        self.group_totals: Dict[str, int] = {}
+        self.group_done: Dict[str, int] = {}
+        for group in groups.values():
+            self.group_totals[group] = self.group_totals.get(group, 0) + 1
+            self.group_done.setdefault(group, 0)
+
+        self._durations: list[float] = []
+        self._prediction_ratios: list[float] = []
+        self._finished_ids: set[int] = set()
+        self._last_report: Optional[dt.datetime] = None
+
+    @property
+    def total(self) -> int:
+        return len(self.groups)
+
+    def throughput(self) -> float:
+        ''' :returns: tasks finished per minute '''
+        minutes = (dt.datetime.now() - self.start_time).total_seconds() / 60
+        return (self.completed + self.failed) / minutes if minutes > 0 else 0.0
+
+    def eta(self) -> Optional[dt.timedelta]:
+        if len(self._durations) == 0:
+            return None
+        mean_duration = statistics.fmean(self._durations)
+        correction = statistics.median(self._prediction_ratios) if len(self._prediction_ratios) > 0 else 1.0
+
+        def predicted(task_id: int) -> float:
+            expected = self.expected_durations.get(task_id)
+            return expected * correction if expected is not None else mean_duration
+
+        running_ids = {task.id for task in self.running.values()}
+        remaining_work = sum(
+            predicted(task_id) for task_id in self.groups.keys()
+            if task_id not in self._finished_ids and task_id not in running_ids
+        )
+        remaining_work += sum(max(predicted(task.id) - task.elapsed(), 0) for task in self.running.values() if not task.speculative)
+        return dt.timedelta(seconds=remaining_work / max(self.process_limit, 1))
+
+    def status(self) -> dict:
+        eta = self.eta()
+        return {
+            'timestamp': dt.datetime.now().isoformat(),
+            'start_time': self.start_time.isoformat(),
+            'total': self.total,
+            'completed': self.completed,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'running': len(self.running),
+            'tasks_per_minute': round(self.throughput(), 3),
+            'eta_seconds': round(eta.total_seconds(), 1) if eta is not None else None,
+            'experiments': {
+                group: {'done': self.group_done[group], 'total': total} for group, total in self.group_totals.items()
+            },
+        }
+
+    def report(self, force: bool = False):
+        now = dt.datetime.now()
+        if not force and self._last_report is not None and (now - self._last_report).total_seconds() < self.refresh_interval:
+            return
+        self._last_report = now
+
+        status = self.status()
+        if self.status_file is not None:
+            tmp_file = self.status_file.with_name(f'.{self.status_file.name}.tmp')
+            with open(tmp_file, 'w') as file:
+                json.dump(status, file, indent=4)
+            os.replace(tmp_file, self.status_file)
+
+        if self.stream is None:
+            return
+
+        eta = f"{dt.timedelta(seconds=int(status['eta_seconds']))}" if status['eta_seconds'] is not None else '?'
+        experiments_done = sum(1 for group in self.group_totals if self.group_done[group] == self.group_totals[group])
+        line = (f"[{status['completed'] + status['failed']}/{status['total']}] OK: {status['completed']}, ERR: {status['failed']}, "
+                f"SKIP: {status['skipped']}, RUN: {status['running']} | {status['tasks_per_minute']:.2f} tasks/min | "
+                f"experiments {experiments_done}/{len(self.group_totals)} | ETA {eta}")
+        if self._is_tty:
+            self.stream.write(f'\r\033[K{line}')
+        else:
+            self.stream.write(f'{line}\n')
+        self.stream.flush()
+
+    def __finish(self, task_id: int):
+        self._finished_ids.add(task_id)
+        group = self.groups.get(task_id)
+        if group is not None:
+            self.group_done[group] += 1
+
+    def batch_started(self, process_limit: int):
+        self.process_limit = process_limit
+        self.start_time = dt.datetime.now()
+        self.report(force=True)
+
+    def task_started(self, task: RunningTask):
+        self.running[task.process.pid] = task
+        self.report()
+
+    def task_skipped(self, task: Task):
+        self.skipped += 1
+        self.__finish(task.id)
+        self.report()
+
+    def task_retried(self, task: CompletedTask):
+        self.__forget_running(task)
+
+    def task_completed(self, task: CompletedTask):
+        self.__forget_running(task)
+        if task.is_ok():
+            self.completed += 1
+            duration = task.duration.total_seconds()
+            self._durations.append(duration)
+            expected = self.expected_durations.get(task.id)
+            if expected is not None and expected > 0 and not task.speculative:
+                self._prediction_ratios.append(duration / expected)
+        else:
+            self.failed += 1
+            self.__log_line(f'[{dt.datetime.now()}][ERROR] {task}')
+        self.__finish(task.id)
+        self.report()
+
+    def batch_completed(self, runinfo: RunInfo):
+        self.report(force=True)
+        if self.stream is None:
+            return
+        if self._is_tty:
+            self.stream.write('\n')
+        self.stream.write(f"Completed batch of {runinfo.success_count + runinfo.failed_count} (OK: {runinfo.success_count}, "
+                          f"ERR: {runinfo.failed_count}, SKIPPED: {runinfo.skipped_count}) in {runinfo.duration}\n")
+        self.stream.flush()
+
+    def __forget_running(self, task: CompletedTask):
+        # Completed task does not carry the pid, all the copies of the task are finished at this point
+        for pid in [pid for pid, running in self.running.items() if running.id == task.id]:
+            del self.running[pid]
+
+    def __log_line(self, line: str):
+        if self.stream is None:
+            return
+        if self._is_tty:
+            self.stream.write('\r\033[K')
+        self.stream.write(f'{line}\n')
@@ -1,8 +1,18 @@
+import os
+import time
 import datetime as dt
+import itertools as it
+import selectors
+import statistics
 import subprocess as sp
-from typing import NamedTuple, Tuple, Dict
-from time import sleep
+from collections import deque
+from typing import NamedTuple, Tuple, Dict, Optional, Iterable, Iterator, Generator, Callable, IO
 from pathlib import Path
+from core.concurrency import ConcurrencyController
+from core.placement import CorePlacement
+from core.capture import OutputSink
+from core.convergence import ConvergenceMonitor
+from core.usage import ResourceUsage
 # from tqdm import tqdm
 
 
@@ -14,6 +24,23 @@ class Task(NamedTuple):
     process_args: Tuple | list
     stdout_file: Path
 
+    # Wall-clock limit in seconds, the process is terminated once it is exceeded
+    timeout: Optional[float] = None
+
+    # Predicted duration in seconds, used to detect stragglers
+    expected_duration: Optional[float] = None
+
+    # Factory of an independent replica of this task, used for speculative execution of stragglers.
+    # The replica must have the same id & must not share any output locations with the original task.
+    clone: Optional[Callable[[], 'Task']] = None
+
+    # Factory of the consumer of the process output (stdout & stderr), called for every attempt.
+    # When specified, the output is read through a pipe instead of being redirected to `stdout_file`.
+    stdout_sink: Optional[Callable[[], OutputSink]] = None
+
+    # File the process reports new best solutions to, followed by the convergence monitor (see `ConvergenceMonitor`)
+    progress_file: Optional[Path] = None
+
 
 class CompletedTask(NamedTuple):
     ''' Represents single completed task, succeeded or failed, with some associated
@@ -23,6 +50,24 @@ class CompletedTask(NamedTuple):
     start_time: dt.datetime
     end_time: dt.datetime
 
+    # Not available on platforms without `wait4`
+    rusage: Optional[ResourceUsage] = None
+
+    # Number of times the task has been started, retries included (speculative replicas are not counted)
+    attempts: int = 1
+
+    # Whether the process has been terminated due to exceeding its timeout
+    timed_out: bool = False
+
+    # Whether the result comes from speculative replica of the task (see `Task.clone`)
+    speculative: bool = False
+
+    # Cpus the process has been pinned to, None if it was not pinned
+    cpus: Optional[tuple[int, ...]] = None
+
+    # Reason the process has been terminated for by the convergence monitor, None if it has not been stopped
+    early_stopped: Optional[str] = None
+
     @property
     def duration(self) -> dt.timedelta:
         return self.end_time - self.start_time
@@ -32,25 +77,35 @@ class CompletedTask(NamedTuple):
         return self.origin.id
 
     def is_ok(self) -> bool:
-        return self.return_code is not None and self.return_code == 0
+        ''' Whether the task has completed successfully. Task stopped by the convergence monitor is considered successful,
+            as its process has been terminated on purpose '''
+        return (self.return_code is not None and self.return_code == 0) or self.early_stopped is not None
 
 
 class RunningTask(NamedTuple):
     ''' Represents task that is currently running on associated process.
-        The process might be already completed. '''
+        The process might be already completed. Single task might be run on few processes
+        at once (speculative execution), hence the identity is determined by the process. '''
     origin: Task
     process: sp.Popen
     start_time: dt.datetime
+    stdout: Optional[IO] = None
+    speculative: bool = False
+    cpus: Optional[tuple[int, ...]] = None
+    sink: Optional[OutputSink] = None
 
     @property
     def id(self) -> int:
         return self.origin.id
 
+    def elapsed(self) -> float:
+        return (dt.datetime.now() - self.start_time).total_seconds()
+
     def __eq__(self, other):
-        return self.origin.id == other.origin.id
+        return self.process.pid == other.process.pid
 
     def __hash__(self):
-        return self.origin.id
+        return self.process.pid
 
 
 class RunInfo(NamedTuple):
@@ -60,131 +115,642 @@ class RunInfo(NamedTuple):
     success_count: int
     failed_count: int
 
+    # Tasks that have not been started, because they would not complete before the deadline or it has already passed
+    skipped_count: int = 0
+
     @property
     def duration(self) -> dt.timedelta:
         return self.end_time - self.start_time
 
 
+def _reap(process: sp.Popen) -> tuple[bool, Optional[ResourceUsage]]:
+    ''' Non-blocking check whether the process has exited. If so, the process is reaped and its resource usage returned.
+        `wait4` is used instead of `Popen.poll`, as it is the only way to get resource usage of single child process.
+
+        :returns: tuple of 1. whether the process has exited, 2. its resource usage if available '''
+    if process.returncode is not None:
+        return True, None
+
+    if not hasattr(os, 'wait4'):
+        return process.poll() is not None, None
+
+    try:
+        pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+    except ChildProcessError:
+        # Already reaped by someone else, Popen knows how to deal with it
+        return process.poll() is not None, None
+
+    if pid == 0:
+        return False, None
+
+    process.returncode = os.waitstatus_to_exitcode(status)
+    return True, ResourceUsage.from_rusage(rusage)
+
+
+class _OutputPump:
+    ''' Moves output of the task process from the pipe to the sink of the task '''
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, task: RunningTask):
+        self.task: RunningTask = task
+        self.fd: int = task.process.stdout.fileno()
+        os.set_blocking(self.fd, False)
+
+    def pump(self) -> bool:
+        ''' Reads all the data available without blocking.
+
+            :returns: False if the end of the stream has been reached '''
+        while True:
+            try:
+                chunk = os.read(self.fd, self.CHUNK_SIZE)
+            except BlockingIOError:
+                return True
+            if not chunk:
+                return False
+            self.task.sink.write(chunk)
+
+    def drain(self):
+        ''' Reads the stream until its end, blocking if necessary '''
+        os.set_blocking(self.fd, True)
+        while chunk := os.read(self.fd, self.CHUNK_SIZE):
+            self.task.sink.write(chunk)
+
+
+class _CompletionWatcher:
+    ''' Blocks the runtime process until at least one of the watched child processes exits.
+
+        On Linux every child gets a pidfd (see `pidfd_open(2)`) registered in a selector, so the wait
+        returns as soon as the kernel reports process exit. Where pidfds are not available (other platforms,
+        old kernels, restricted sandboxes) the watcher falls back to querying the processes every `poll_interval` seconds.
+
+        Output of tasks with a sink is read from their pipes, registered in the same selector, while waiting. '''
+
+    def __init__(self, poll_interval: float = 0.1):
+        self.poll_interval: float = poll_interval
+        self._selector = selectors.DefaultSelector()
+        self._pidfds: Dict[int, int] = {}
+        self._pumps: Dict[int, _OutputPump] = {}
+        self._polled: set[RunningTask] = set()
+
+    def watch(self, task: RunningTask):
+        if task.sink is not None:
+            pump = _OutputPump(task)
+            self._pumps[task.process.pid] = pump
+            self._selector.register(pump.fd, selectors.EVENT_READ, pump)
+
+        pidfd = self.__open_pidfd(task.process.pid)
+        if pidfd is None:
+            self._polled.add(task)
+            return
+        self._pidfds[task.process.pid] = pidfd
+        self._selector.register(pidfd, selectors.EVENT_READ, task)
+
+    def unwatch(self, task: RunningTask, drain: bool = True):
+        ''' :param drain: whether the remaining output of the task should be passed to its sink '''
+        pidfd = self._pidfds.pop(task.process.pid, None)
+        if pidfd is not None:
+            self._selector.unregister(pidfd)
+            os.close(pidfd)
+        self._polled.discard(task)
+
+        pump = self._pumps.pop(task.process.pid, None)
+        if pump is not None:
+            self.__unregister_pump(pump)
+            if drain:
+                pump.drain()
+
+    def __unregister_pump(self, pump: _OutputPump):
+        if pump.fd in self._selector.get_map():
+            self._selector.unregister(pump.fd)
+
+    def wait(self, timeout: Optional[float] = None) -> list[tuple[RunningTask, Optional[ResourceUsage]]]:
+        ''' Waits until some of the watched processes exit or `timeout` seconds pass. Please note that returned tasks
+            have their processes already reaped, so `process.returncode` is set.
+
+            :param timeout: upper bound for waiting time in seconds, None means no limit
+            :returns: list of tasks whose processes have completed, each with resources used by its process.
+                Empty only if the timeout has passed. '''
+        deadline = None if timeout is None else time.monotonic() + timeout
+        finished: list[tuple[RunningTask, Optional[ResourceUsage]]] = []
+        while True:
+            select_timeout = None if len(self._polled) == 0 else self.poll_interval
+            if deadline is not None:
+                remaining = max(deadline - time.monotonic(), 0)
+                select_timeout = remaining if select_timeout is None else min(select_timeout, remaining)
+
+            candidates = []
+            for key, _ in self._selector.select(select_timeout):
+                if isinstance(key.data, _OutputPump):
+                    if not key.data.pump():
+                        self.__unregister_pump(key.data)
+                else:
+                    candidates.append(key.data)
+            candidates.extend(self._polled)
+
+            for task in candidates:
+                done, rusage = _reap(task.process)
+                if done:
+                    finished.append((task, rusage))
+
+            if len(finished) > 0 or (deadline is not None and time.monotonic() >= deadline):
+                return finished
+
+    def close(self):
+        for pidfd in self._pidfds.values():
+            os.close(pidfd)
+        self._pidfds.clear()
+        self._selector.close()
+
+    def __open_pidfd(self, pid: int) -> Optional[int]:
+        if not hasattr(os, 'pidfd_open'):
+            return None
+        try:
+            return os.pidfd_open(pid)
+        except OSError:
+            return None
+
+
+class _TaskState:
+    ''' Bookkeeping of single task during `MultiProcessTaskRunner.run_iter`. '''
+
+    def __init__(self, task: Task):
+        self.task: Task = task
+        self.attempts: int = 0
+        self.copies: list[RunningTask] = []
+        self.speculated: bool = False
+
+        # pid -> time (monotonic) after which the process is killed, for processes that exceeded the timeout
+        # or have been stopped by the convergence monitor
+        self.kill_at: Dict[int, float] = {}
+
+        # pid -> reason, for processes stopped by the convergence monitor
+        self.stop_reasons: Dict[int, str] = {}
+
+    def timeout_at(self, copy: RunningTask, deadline_at: Optional[float] = None) -> Optional[float]:
+        ''' :param deadline_at: monotonic time no task may run past
+            :returns: monotonic time the process of given copy exceeds its timeout at '''
+        if copy.origin.timeout is None:
+            return deadline_at
+        timeout_at = time.monotonic() - copy.elapsed() + copy.origin.timeout
+        return timeout_at if deadline_at is None else min(timeout_at, deadline_at)
+
+
+class SchedulerObserver:
+    ''' Receives notifications on progress of the batch run by `MultiProcessTaskRunner`. All the methods are called
+        from the scheduling loop, so they should return quickly. '''
+
+    def batch_started(self, process_limit: int):
+        pass
+
+    def task_started(self, task: RunningTask):
+        ''' Called for every attempt & every speculative replica of the task '''
+        pass
+
+    def task_skipped(self, task: Task):
+        pass
+
+    def task_timed_out(self, task: RunningTask):
+        pass
+
+    def task_stopped_early(self, task: RunningTask, reason: str):
+        pass
+
+    def task_retried(self, task: CompletedTask):
+        ''' Called with the failed attempt, right before the task is put back to the queue '''
+        pass
+
+    def task_completed(self, task: CompletedTask):
+        pass
+
+    def batch_completed(self, runinfo: RunInfo):
+        pass
+
+
+class LoggingObserver(SchedulerObserver):
+    ''' Logs every event as separate line '''
+
+    def task_started(self, task: RunningTask):
+        if task.speculative:
+            print(f'[{dt.datetime.now()}][SPECL] {task.origin}')
+        else:
+            print(f'[{dt.datetime.now()}][START] {task.origin}')
+
+    def task_skipped(self, task: Task):
+        print(f'[{dt.datetime.now()}][SKIP ] {task} would not complete before the deadline')
+
+    def task_timed_out(self, task: RunningTask):
+        print(f'[{dt.datetime.now()}][TMOUT] {task.origin} after {task.elapsed():.2f}s')
+
+    def task_stopped_early(self, task: RunningTask, reason: str):
+        print(f'[{dt.datetime.now()}][STOPD] {task.origin} after {task.elapsed():.2f}s, {reason}')
+
+    def task_retried(self, task: CompletedTask):
+        print(f'[{dt.datetime.now()}][RETRY] {task}')
+
+    def task_completed(self, task: CompletedTask):
+        if task.is_ok():
+            print(f'[{dt.datetime.now()}][COMPL] {task}')
+        else:
+            print(f'[{dt.datetime.now()}][ERROR] {task}')
+
+    def batch_completed(self, runinfo: RunInfo):
+        n_tasks = runinfo.success_count + runinfo.failed_count
+        print(f"Completed batch of {n_tasks} (OK: {runinfo.success_count}, ERR: {runinfo.failed_count}, SKIPPED: {runinfo.skipped_count}) in {runinfo.duration}")
+
+
+class ObserverGroup(SchedulerObserver):
+    ''' Forwards every event to all of the observers '''
+
+    def __init__(self, *observers: SchedulerObserver):
+        self.observers: tuple[SchedulerObserver, ...] = observers
+
+    def batch_started(self, process_limit: int):
+        for observer in self.observers:
+            observer.batch_started(process_limit)
+
+    def task_started(self, task: RunningTask):
+        for observer in self.observers:
+            observer.task_started(task)
+
+    def task_skipped(self, task: Task):
+        for observer in self.observers:
+            observer.task_skipped(task)
+
+    def task_timed_out(self, task: RunningTask):
+        for observer in self.observers:
+            observer.task_timed_out(task)
+
+    def task_stopped_early(self, task: RunningTask, reason: str):
+        for observer in self.observers:
+            observer.task_stopped_early(task, reason)
+
+    def task_retried(self, task: CompletedTask):
+        for observer in self.observers:
+            observer.task_retried(task)
+
+    def task_completed(self, task: CompletedTask):
+        for observer in self.observers:
+            observer.task_completed(task)
+
+    def batch_completed(self, runinfo: RunInfo):
+        for observer in self.observers:
+            observer.batch_completed(runinfo)
+
+
 class MultiProcessTaskRunner:
     ''' Runs collection on tasks on limited pool of processes. To be exact
         each task is run in separate process, however the number of processes
         run simultaneously can be limited via appriopriate parameters. '''
 
-    def __log_run(self, task: Task):
-        print(f'[{dt.datetime.now()}][START] {task}')
+    # Time given to the process between SIGTERM & SIGKILL after it has exceeded its timeout
+    KILL_GRACE_PERIOD: float = 5.0
 
-    def __log_complete_success(self, task: CompletedTask):
-        print(f'[{dt.datetime.now()}][COMPL] {task}')
+    def __init__(self, observer: Optional['SchedulerObserver'] = None):
+        ''' :param observer: notified about progress of the batch, by default every event is logged to stdout '''
+        self.observer: SchedulerObserver = observer if observer is not None else LoggingObserver()
 
-    def __log_complete_error(self, task: CompletedTask):
-        print(f'[{dt.datetime.now()}][ERROR] {task}')
+    def __release_resources(self, task: RunningTask, placement: Optional[CorePlacement]):
+        if task.stdout is not None:
+            task.stdout.close()
+        if task.sink is not None:
+            task.process.stdout.close()
+            task.sink.close()
+        if task.cpus is not None:
+            placement.release(task.cpus)
 
-    def __complete_task(self, task: RunningTask, fileobjs: Dict[int, object]) -> CompletedTask:
-        file = fileobjs.get(task.id)
-        if file is not None:
-            file.close()
-            del fileobjs[task.id]
+    def __complete_task(self, task: RunningTask, state: _TaskState, placement: Optional[CorePlacement],
+                        rusage: Optional[ResourceUsage] = None) -> CompletedTask:
+        self.__release_resources(task, placement)
 
         return CompletedTask(
             origin=task.origin,
             return_code=task.process.returncode,
             start_time=task.start_time,
-            end_time=dt.datetime.now()
+            end_time=dt.datetime.now(),
+            rusage=rusage,
+            attempts=state.attempts,
+            timed_out=task.process.pid in state.kill_at and task.process.pid not in state.stop_reasons,
+            speculative=task.speculative,
+            cpus=task.cpus,
+            early_stopped=state.stop_reasons.get(task.process.pid)
         )
 
-    def __schedule_task(self, task: Task, task_collection: set[RunningTask], fileobjs: Dict[int, object]):
-        file = None
-        if task.stdout_file is not None:
+    def __schedule_task(self, task: Task, state: _TaskState, watcher: _CompletionWatcher, placement: Optional[CorePlacement],
+                        speculative: bool = False) -> RunningTask:
+        file, sink = None, None
+        if task.stdout_sink is not None:
+            sink = task.stdout_sink()
+        elif task.stdout_file is not None:
             # TODO: handle the errors somehow
             file = open(task.stdout_file, 'w')
-            fileobjs[task.id] = file
-        task_collection.add(RunningTask(
+        cpus = placement.acquire() if placement is not None else None
+        running_task = RunningTask(
             origin=task,
-            process=sp.Popen(task.process_args, stdout=file if file is not None else sp.DEVNULL, stderr=sp.STDOUT),
-            start_time=dt.datetime.now()
-        ))
-
-    def run(self, tasks: list[Task], process_limit: int = 1, poll_interval: float = 0.1) -> tuple[list[CompletedTask], RunInfo]:
-        ''' Runs list of `tasks` in parallel, each task on separate process. Number of processes running simultaneously
-            is limited by the `process_limit` param. The scheduling algorithm is based on primitive spinlock. Nothing sophisticated.
-            The processes are queried every `poll_interval` seconds for their completion status, and then if any processes
-            were found to be completed, new processes are started in their place.
-
-            Please note that each task MUST have unique id from the set {0, 1, len(tasks) - 1}. This invariant is not verified, and must be
-            satisfied by the caller.
-
-            The results in output array of completed tasks are in order of task ids.
-
-            :param tasks: list of tasks to perform
+            process=sp.Popen(task.process_args,
+                             stdout=sp.PIPE if sink is not None else file if file is not None else sp.DEVNULL,
+                             stderr=sp.STDOUT,
+                             preexec_fn=CorePlacement.pinning_fn(cpus) if cpus is not None else None),
+            start_time=dt.datetime.now(),
+            stdout=file,
+            speculative=speculative,
+            cpus=cpus,
+            sink=sink
+        )
+        if not speculative:
+            state.attempts += 1
+        state.copies.append(running_task)
+        watcher.watch(running_task)
+        return running_task
+
+    def __stop_copy(self, copy: RunningTask, state: _TaskState, watcher: _CompletionWatcher, placement: Optional[CorePlacement]):
+        ''' Kills process of the copy that is no longer needed & waits for it '''
+        copy.process.kill()
+        copy.process.wait()
+        watcher.unwatch(copy, drain=False)
+        state.copies.remove(copy)
+        self.__release_resources(copy, placement)
+
+    def __enforce_timeouts(self, states: Iterable[_TaskState], deadline_at: Optional[float]) -> Optional[float]:
+        ''' Terminates processes that exceeded their timeout or the deadline & kills the ones that ignored the termination request.
+
+            :returns: monotonic time of the next timeout related event, if there is any '''
+        now = time.monotonic()
+        next_event = None
+        for state in states:
+            for copy in state.copies:
+                pid = copy.process.pid
+                if pid in state.kill_at:
+                    if now >= state.kill_at[pid]:
+                        copy.process.kill()
+                        continue
+                    event = state.kill_at[pid]
+                else:
+                    event = state.timeout_at(copy, deadline_at)
+                    if event is None:
+                        continue
+                    if now >= event:
+                        self.observer.task_timed_out(copy)
+                        copy.process.terminate()
+                        state.kill_at[pid] = now + self.KILL_GRACE_PERIOD
+                        event = state.kill_at[pid]
+                next_event = event if next_event is None else min(next_event, event)
+        return next_event
+
+    def __stop_converged(self, states: Iterable[_TaskState], monitor: ConvergenceMonitor):
+        ''' Terminates processes the monitor considers hopeless, they are killed by `__enforce_timeouts` if they ignore the request '''
+        now = time.monotonic()
+        for state in states:
+            for copy in state.copies:
+                pid = copy.process.pid
+                if copy.origin.progress_file is None or pid in state.kill_at:
+                    continue
+                reason = monitor.check(pid, copy.origin.progress_file, copy.elapsed(), copy.origin.expected_duration)
+                if reason is None:
+                    continue
+                self.observer.task_stopped_early(copy, reason)
+                copy.process.terminate()
+                state.kill_at[pid] = now + self.KILL_GRACE_PERIOD
+                state.stop_reasons[pid] = reason
+
+    def __find_straggler(self, states: Iterable[_TaskState], speculate_after: float, observed: list[float]) -> tuple[Optional[_TaskState], Optional[float]]:
+        ''' Finds task which runs for more than `speculate_after` times its expected duration, and has not been speculated yet.
+            Expected duration is taken from the task or, if not specified, median of observed durations of completed tasks is used.
+
+            :returns: tuple of 1. the most overdue straggler if any, 2. monotonic time the next task becomes straggler at '''
+        fallback_expected = statistics.median(observed) if len(observed) > 0 else None
+        now = time.monotonic()
+        straggler, straggler_ratio, next_event = None, 0.0, None
+        for state in states:
+            if state.speculated or state.task.clone is None or len(state.copies) != 1:
+                continue
+            copy = state.copies[0]
+            expected = copy.origin.expected_duration or fallback_expected
+            if expected is None or expected <= 0:
+                continue
+            ratio = copy.elapsed() / expected
+            if ratio >= speculate_after:
+                if ratio > straggler_ratio:
+                    straggler, straggler_ratio = state, ratio
+            else:
+                event = now + (speculate_after * expected - copy.elapsed())
+                next_event = event if next_event is None else min(next_event, event)
+        return straggler, next_event
+
+    def run_iter(self,
+                 tasks: Iterable[Task],
+                 process_limit: int = 1,
+                 poll_interval: float = 0.1,
+                 retry_limit: int = 0,
+                 speculate_after: Optional[float] = None,
+                 controller: Optional[ConcurrencyController] = None,
+                 placement: Optional[CorePlacement] = None,
+                 deadline: Optional[dt.datetime] = None,
+                 on_start: Optional[Callable[[Task], None]] = None,
+                 monitor: Optional[ConvergenceMonitor] = None) -> Generator[CompletedTask, None, RunInfo]:
+        ''' Runs `tasks` in parallel, each task on separate process, yielding every task as soon as its process exits.
+            Number of processes running simultaneously is limited by the `process_limit` param. The runtime process blocks until
+            any of the running processes exits and immediately starts next task in its place, so no core is left idle between tasks.
+            See `_CompletionWatcher` for details on how the completion is detected.
+
+            `tasks` are consumed lazily - next task is taken from the iterable only when there is a free slot for it.
+            Each task must have an id unique in the run. Tasks are yielded in order of completion.
+
+            Task exceeding its `timeout` is terminated (& killed if it does not exit within `KILL_GRACE_PERIOD`) and treated as failed.
+            Tasks that failed for other reason are started again, up to `retry_limit` times, before any new task. When there are no more tasks to start
+            and some of the slots are free, tasks running `speculate_after` times longer than expected are replicated (see `Task.clone`);
+            whichever copy completes successfully first is yielded and the other one is killed. Tasks the `monitor` considers
+            converged are terminated the same way as the ones that exceeded their timeout, and are not retried either.
+
+            Closing the generator before it is exhausted terminates all the still running processes.
+
+            :param tasks: iterable of tasks to perform
             :param process_limit: upper bound for number of simultaneously running processes
-            :param poll_interval: spinlock interval in seconds
-            :returns: tuple of 1. list of completed tasks, 2. some metrics for whole batch '''
-        finished_count = 0
+            :param poll_interval: interval in seconds for querying the processes in case the platform does not
+                support event driven completion detection
+            :param retry_limit: how many times failed task is restarted
+            :param speculate_after: ratio of running time to expected duration, after which the task is considered
+                a straggler; None disables speculative execution
+            :param controller: if present, it decides the limit of simultaneously running processes instead of `process_limit`.
+                The limit is re-evaluated at least every `controller.interval` seconds
+            :param placement: if present, every process is pinned to a cpu set from the placement exclusively, which
+                additionally limits the number of simultaneously running processes to the number of available sets
+            :param deadline: if present, tasks with `expected_duration` that would not complete before it are skipped,
+                no task is started after it & the running ones are terminated when it passes (reported as timed out)
+            :param on_start: called right before the task is started, for each attempt
+            :param monitor: if present, progress of tasks with `progress_file` is checked every `monitor.interval` seconds
+            :returns: generator of completed tasks; metrics for whole batch are the return value of the generator '''
+        n_tasks = 0
         failed_count = 0
-        running_tasks = set()
-        n_tasks = len(tasks)
-        n_scheduled = min(process_limit, n_tasks)
+        skipped_count = 0
+        n_running = 0
+        pending_tasks: Iterator[Task] = iter(tasks)
+        retry_queue: deque[Task] = deque()
+        states: Dict[int, _TaskState] = {}
+        observed_durations: list[float] = []
 
         start_time = dt.datetime.now()
+        self.observer.batch_started(process_limit if controller is None else controller.max_limit)
+        deadline_at = time.monotonic() + (deadline - start_time).total_seconds() if deadline is not None else None
 
-        # Note that at most :param process_limit descriptios are open at the same time
-        fileobjs = {}
+        # Note that at most one descriptor per running process is open at the same time
+        watcher = _CompletionWatcher(poll_interval)
         # progress_bar = tqdm(total=n_tasks)
 
-        for task_id, task in enumerate(tasks[:n_scheduled]):
-            self.__log_run(task)
-            self.__schedule_task(task, running_tasks, fileobjs)
-
-        just_scheduled_tasks: set[RunningTask] = set()
-        just_finished_tasks: set[RunningTask] = set()
-        completed_tasks: list[CompletedTask] = [-1 for _ in range(n_tasks)]
-
-        while True:
-            just_scheduled_tasks.clear()
-            just_finished_tasks.clear()
-
-            for task in running_tasks:
-                return_code = task.process.poll()
-
-                # If the process has not completed yet, let it run
-                if return_code is None:
+        def current_limit() -> int:
+            limit = process_limit
+            if controller is not None:
+                limit = controller.limit(copy.process.pid for state in states.values() for copy in state.copies)
+            if placement is not None:
+                limit = min(limit, placement.n_slots)
+            return limit
+
+        def fits_before_deadline(task: Task) -> bool:
+            if deadline_at is None or task.expected_duration is None:
+                return True
+            return time.monotonic() + task.expected_duration <= deadline_at
+
+        def skip_task(task: Task):
+            nonlocal skipped_count
+            self.observer.task_skipped(task)
+            states.pop(task.id, None)
+            skipped_count += 1
+
+        def fill_free_slots() -> Optional[float]:
+            nonlocal n_running
+            limit = current_limit()
+            while n_running < limit:
+                if deadline_at is not None and time.monotonic() >= deadline_at:
+                    # No task is started after the deadline, all the remaining ones are skipped
+                    for task in it.chain(retry_queue, pending_tasks):
+                        skip_task(task)
+                    retry_queue.clear()
+                    break
+                task = retry_queue.popleft() if len(retry_queue) > 0 else next(pending_tasks, None)
+                if task is None:
+                    break
+                if not fits_before_deadline(task):
+                    # Shorter tasks might still fit
+                    skip_task(task)
                     continue
+                state = states.setdefault(task.id, _TaskState(task))
+                if on_start is not None:
+                    on_start(task)
+                self.observer.task_started(self.__schedule_task(task, state, watcher, placement))
+                n_running += 1
+
+            if speculate_after is None:
+                return None
+
+            # Free slots at the tail of the batch can be used for replicas of stragglers
+            while n_running < limit:
+                straggler, next_event = self.__find_straggler(states.values(), speculate_after, observed_durations)
+                if straggler is None:
+                    return next_event
+                straggler.speculated = True
+                self.observer.task_started(self.__schedule_task(straggler.task.clone(), straggler, watcher, placement, speculative=True))
+                n_running += 1
+            return None
+
+        try:
+            next_speculation = fill_free_slots()
+            next_check = time.monotonic() + monitor.interval if monitor is not None else None
+
+            while n_running > 0:
+                if next_check is not None and time.monotonic() >= next_check:
+                    self.__stop_converged(states.values(), monitor)
+                    next_check = time.monotonic() + monitor.interval
+                next_timeout = self.__enforce_timeouts(states.values(), deadline_at)
+                next_reevaluation = time.monotonic() + controller.interval if controller is not None else None
+                wakeups = [t for t in (next_timeout, next_speculation, next_reevaluation, next_check) if t is not None]
+                wait_timeout = max(min(wakeups) - time.monotonic(), 0) if len(wakeups) > 0 else None
+
+                ready: list[CompletedTask] = []
+                for task, rusage in watcher.wait(wait_timeout):
+                    state = states.get(task.id)
+                    if state is None or task not in state.copies:
+                        # Already stopped, because other copy of the task has completed
+                        continue
+
+                    # The process has completed
+                    watcher.unwatch(task)
+                    state.copies.remove(task)
+                    n_running -= 1
+                    if monitor is not None:
+                        monitor.forget(task.process.pid)
+                    completed_task = self.__complete_task(task, state, placement, rusage)
+                    if controller is not None and rusage is not None:
+                        controller.observe_peak_rss(rusage.max_rss)
+
+                    if completed_task.is_ok():
+                        for copy in list(state.copies):
+                            self.__stop_copy(copy, state, watcher, placement)
+                            n_running -= 1
+                            if monitor is not None:
+                                monitor.forget(copy.process.pid)
+                        if completed_task.early_stopped is None:
+                            observed_durations.append(completed_task.duration.total_seconds())
+                    elif len(state.copies) > 0:
+                        # Other copy of the task is still running, let it finish
+                        continue
+                    elif state.attempts <= retry_limit and not completed_task.timed_out and completed_task.early_stopped is None:
+                        self.observer.task_retried(completed_task)
+                        state.speculated = False
+                        retry_queue.append(state.task)
+                        continue
+
+                    del states[task.id]
+                    n_tasks += 1
+                    if not completed_task.is_ok():
+                        failed_count += 1
+                    self.observer.task_completed(completed_task)
+                    ready.append(completed_task)
+
+                # If there are any tasks left to schedule, start them
+                # before handing over the results, so the freed slots do not wait on the consumer
+                next_speculation = fill_free_slots()
 
-                # The process has completed
-                completed_task = self.__complete_task(task, fileobjs)
-                completed_tasks[task.id] = completed_task
-                just_finished_tasks.add(task)
-                finished_count += 1
+                # progress_bar.update()
+                for completed_task in ready:
+                    yield completed_task
+        finally:
+            for state in states.values():
+                for copy in list(state.copies):
+                    self.__stop_copy(copy, state, watcher, placement)
+            watcher.close()
 
-                if not completed_task.is_ok():
-                    self.__log_complete_error(completed_task)
-                    failed_count += 1
-                else:
-                    self.__log_complete_success(completed_task)
-                    pass
+        end_time = dt.datetime.now()
+        runinfo = RunInfo(start_time, end_time, n_tasks - failed_count, failed_count, skipped_count)
 
-                # If there are any tasks left to schedule
-                if n_scheduled < n_tasks:
-                    task = tasks[n_scheduled]
-                    self.__log_run(task)
-                    self.__schedule_task(task, just_scheduled_tasks, fileobjs)
-                    n_scheduled += 1
+        self.observer.batch_completed(runinfo)
+        return runinfo
 
-                # progress_bar.update()
+    def run(self, tasks: list[Task], process_limit: int = 1, poll_interval: float = 0.1, **kwargs) -> tuple[list[Optional[CompletedTask]], RunInfo]:
+        ''' Runs list of `tasks` in parallel & waits for all of them to complete. See `run_iter` for description
+            of the scheduling.
 
-            running_tasks.difference_update(just_finished_tasks)
-            running_tasks.update(just_scheduled_tasks)
+            Please note that each task MUST have unique id from the set {0, 1, len(tasks) - 1}. This invariant is not verified, and must be
+            satisfied by the caller.
 
-            if len(running_tasks) == 0:
-                break
-            else:
-                sleep(poll_interval)
+            The results in output array of completed tasks are in order of task ids. Tasks skipped due to the deadline
+            have None in their place.
 
-        end_time = dt.datetime.now()
-        runinfo = RunInfo(start_time, end_time, n_tasks - failed_count, failed_count)
+            :param tasks: list of tasks to perform
+            :param process_limit: upper bound for number of simultaneously running processes
+            :param poll_interval: see `run_iter`
+            :param kwargs: passed down to `run_iter`
+            :returns: tuple of 1. list of completed tasks, 2. some metrics for whole batch '''
+        n_tasks = len(tasks)
+        completed_tasks: list[Optional[CompletedTask]] = [None for _ in range(n_tasks)]
 
-        assert len(completed_tasks) == n_tasks
+        stream = self.run_iter(tasks, process_limit, poll_interval, **kwargs)
+        while True:
+            try:
+                completed_task = next(stream)
+            except StopIteration as stop:
+                runinfo: RunInfo = stop.value
+                break
+            completed_tasks[completed_task.id] = completed_task
 
-        print(f"Completed batch of {len(tasks)} (OK: {runinfo.success_count}, ERR: {runinfo.failed_count}) in {runinfo.duration}")
+        assert runinfo.success_count + runinfo.failed_count + runinfo.skipped_count == n_tasks
         return completed_tasks, runinfo
-
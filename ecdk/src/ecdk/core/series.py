@@ -1,4 +1,5 @@
-from typing import Dict, Iterable
+import os
+from typing import Dict, Iterable, Optional
 from pathlib import Path
 from experiment.model import (
     SeriesOutputFiles,
@@ -7,6 +8,8 @@ from experiment.model import (
     SeriesOutputMetadata,
 )
 from core.util import find_first_or_none
+from data.model import Col, Event, dtypes_for_event
+from core.fs import event_file_for_series
 import polars as pl
 import json
 
@@ -43,11 +46,66 @@ def _load_series_metadata_from_file(metadata_file: Path) -> SeriesOutputFiles:
     return metadata
 
 
+def load_event_data(event_name: str, file: Path) -> pl.DataFrame:
+    """ Loads event csv file with explicit (narrow) column types. Event name column is not loaded, as its value
+    is implied by the file. """
+    return pl.scan_csv(file, has_header=True, dtypes=dtypes_for_event(event_name)).drop(Col.EVENT).collect()
+
+
+def _last_event_record(file: Path, columns: tuple[str, ...]) -> Optional[tuple[int, ...]]:
+    """ Values of given (integer) columns in the last complete record of event file, None if there is no such record.
+    The file might have been left with partially written record by the terminated solver. """
+    try:
+        text = file.read_text()
+    except FileNotFoundError:
+        return None
+    lines = text.splitlines()
+    if len(lines) == 0:
+        return None
+    if not text.endswith('\n'):
+        lines.pop()
+    header = lines[0].split(',')
+    for line in reversed(lines[1:]):
+        fields = line.split(',')
+        try:
+            return tuple(int(fields[header.index(col)]) for col in columns)
+        except (ValueError, IndexError):
+            continue
+    return None
+
+
+def write_truncated_series_metadata(directory: Path, reason: str, total_time: int) -> bool:
+    """ Dumps run metadata of series, that has been stopped before completion (see `ConvergenceMonitor`)
+    and has not dumped it itself. The result of such series is the last new best solution it reported,
+    its solution string & hash are not known.
+
+    :param total_time: running time of the solver in milliseconds
+    :returns: False in case the series has not reported any solution, so it has no result """
+    newbest = _last_event_record(event_file_for_series(directory, Event.NEW_BEST), (Col.GENERATION, Col.FITNESS))
+    if newbest is None:
+        return False
+    # Best in generation event is reported every generation
+    bestingen = _last_event_record(event_file_for_series(directory, Event.BEST_IN_GEN), (Col.GENERATION,))
+    generation, fitness = newbest
+    metadata = {
+        'solution_string': None,
+        'hash': None,
+        'fitness': fitness,
+        'generation_count': max(generation, bestingen[0] if bestingen is not None else 0) + 1,
+        'total_time': total_time,
+        'chromosome': [],
+        'early_stopped': reason,
+    }
+    with open(directory.joinpath('run_metadata.json'), 'w') as file:
+        json.dump(metadata, file)
+    return True
+
+
 def _load_series_data_from_files(files: SeriesOutputFiles) -> SeriesOutputData:
     data: Dict[str, pl.DataFrame] = dict()
 
     for event_name, file in files.event_files.items():
-        data[event_name] = pl.read_csv(file, has_header=True)
+        data[event_name] = load_event_data(event_name, file)
 
     metadata = _load_series_metadata_from_file(files.run_metadata_file)
 
@@ -55,7 +113,9 @@ def _load_series_data_from_files(files: SeriesOutputFiles) -> SeriesOutputData:
 
 
 def _resolve_series_files_from_dir(directory: Path) -> SeriesOutputFiles:
-    all_files = list(filter(lambda file: file.is_file(), directory.iterdir()))
+    # Entries of the listing carry the file type, so no additional stat call is made for every file
+    with os.scandir(directory) as entries:
+        all_files = [Path(entry.path) for entry in entries if entry.is_file()]
     assert len(all_files) > 0, f"Ill formed series result - no files found in directory {directory}"
 
     event_files = _event_file_map_from_data_files(filter(__event_file_filter, all_files))
@@ -71,6 +131,12 @@ def materialize_series_output(output: SeriesOutput, force: bool = False):
         output.data = _load_series_data_from_files(output.files)
 
 
+def materialize_series_metadata(output: SeriesOutput):
+    """ Loads only the run metadata of the series, for consumers that get the event data elsewhere (e.g. from cache) """
+    if output.data is None:
+        output.data = SeriesOutputData(dict(), _load_series_metadata_from_file(output.files.run_metadata_file))
+
+
 def materialize_all_series_outputs(outputs: list[SeriesOutput], force: bool = False):
     """ :param force tells whether the data should be loaded even if there is a dataframe attached
     to an object already """
@@ -0,0 +1,27 @@
+import sys
+from typing import NamedTuple
+
+
+class ResourceUsage(NamedTuple):
+    ''' Resources consumed by single task process, as reported by the kernel (see `getrusage(2)`). '''
+    user_time: float  # seconds
+    system_time: float  # seconds
+    max_rss: int  # peak resident set size in KiB
+    voluntary_ctx_switches: int
+    involuntary_ctx_switches: int
+
+    @property
+    def cpu_time(self) -> float:
+        return self.user_time + self.system_time
+
+    @classmethod
+    def from_rusage(cls, rusage) -> 'ResourceUsage':
+        # ru_maxrss is reported in bytes on macOS & in kilobytes on Linux
+        max_rss = rusage.ru_maxrss // 1024 if sys.platform == 'darwin' else rusage.ru_maxrss
+        return cls(
+            user_time=rusage.ru_utime,
+            system_time=rusage.ru_stime,
+            max_rss=max_rss,
+            voluntary_ctx_switches=rusage.ru_nvcsw,
+            involuntary_ctx_switches=rusage.ru_nivcsw
+        )
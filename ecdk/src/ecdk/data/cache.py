@@ -0,0 +1,95 @@
+import os
+import json
+import polars as pl
+from pathlib import Path
+from typing import Optional
+from data.model import Col, SeriesId, DTYPE_FOR_COLUMN
+from core.series import load_event_data
+
+# Hidden, so it is not taken for series output directory
+CACHE_DIR_NAME = '.ecdk_cache'
+MANIFEST_FILE_NAME = 'manifest.json'
+
+# Bump when layout of the cached data changes, so old caches are rebuilt
+CACHE_FORMAT_VERSION = 2
+
+
+def cache_dir_for_experiment(exp_dir: Path) -> Path:
+    return exp_dir.joinpath(CACHE_DIR_NAME)
+
+
+def _source_fingerprint(sources: list[tuple[SeriesId, Path]]) -> list[list]:
+    fingerprint = []
+    for sid, file in sources:
+        stat = file.stat()
+        fingerprint.append([sid, file.name, stat.st_size, stat.st_mtime_ns])
+    return fingerprint
+
+
+class ExperimentEventCache:
+    """ Parquet copy of the event data of all series of single experiment, stored in the experiment directory.
+    Each event is converted from csv files of all the series into single typed table (with series id column)
+    on first load. Later loads are served from the cache as long as size & mtime of every source file is unchanged,
+    reading only the requested columns. """
+
+    def __init__(self, exp_dir: Path):
+        self.directory: Path = cache_dir_for_experiment(exp_dir)
+        self._manifest: Optional[dict] = None
+
+    @property
+    def manifest_file(self) -> Path:
+        return self.directory.joinpath(MANIFEST_FILE_NAME)
+
+    def _table_file(self, key: str) -> Path:
+        return self.directory.joinpath(f'{key}.parquet')
+
+    def _load_manifest(self) -> dict:
+        if self._manifest is None:
+            try:
+                with open(self.manifest_file, 'r') as file:
+                    self._manifest = json.load(file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                self._manifest = {}
+            if self._manifest.get('version') != CACHE_FORMAT_VERSION:
+                self._manifest = {'version': CACHE_FORMAT_VERSION, 'events': {}}
+        return self._manifest
+
+    def _dump_manifest(self):
+        tmp_file = self.manifest_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as file:
+            json.dump(self._manifest, file)
+        os.replace(tmp_file, self.manifest_file)
+
+    def is_valid(self, key: str, sources: list[tuple[SeriesId, Path]]) -> bool:
+        entry = self._load_manifest()['events'].get(key)
+        if entry is None or not self._table_file(key).is_file():
+            return False
+        try:
+            return entry == _source_fingerprint(sources)
+        except FileNotFoundError:
+            return False
+
+    def load(self, key: str, sources: list[tuple[SeriesId, Path]], columns: Optional[list[str]] = None) -> pl.DataFrame:
+        """ :param key: name of the cached table, usually event name
+        :param sources: event csv file of every series, with series id
+        :param columns: columns to load, all by default
+        :returns: data of all the series, stacked in order of `sources` """
+        if self.is_valid(key, sources):
+            return pl.read_parquet(self._table_file(key), columns=columns)
+
+        fingerprint = _source_fingerprint(sources)
+        df = pl.concat([
+            load_event_data(key, file).with_columns(pl.lit(sid, dtype=DTYPE_FOR_COLUMN[Col.SID]).alias(Col.SID))
+            for sid, file in sources
+        ])
+        try:
+            self.directory.mkdir(exist_ok=True)
+            tmp_file = self._table_file(key).with_suffix('.tmp')
+            df.write_parquet(tmp_file)
+            os.replace(tmp_file, self._table_file(key))
+            self._load_manifest()['events'][key] = fingerprint
+            self._dump_manifest()
+        except OSError as error:
+            # E.g. read-only batch directory, the data is just not cached
+            print(f'[WARN] Failed to cache {key} data in {self.directory}: {error}')
+        return df.select(columns) if columns is not None else df
@@ -1,3 +1,4 @@
+import polars as pl
 from dataclasses import dataclass
 from polars import DataFrame
 from typing import Optional
@@ -98,6 +99,7 @@ class Col:
     ITER_TIME = 'iter_time'
     SID = 'sid'
     DISTANCE = 'distance_avg'
+    EXPNAME = 'expname'  # Not present in solver output, added when data of whole batch is joined
 
     ALL_COLLS = (
         EVENT,
@@ -114,7 +116,8 @@ class Col:
         REPL_TIME,
         ITER_TIME,
         SID,
-        DISTANCE
+        DISTANCE,
+        EXPNAME
     )
 
 
@@ -124,10 +127,10 @@ SID_COL_INDEX = -1
 
 # We append series_id column which is not present in original result
 SCHEMA_FOR_EVENT = dict(map(lambda kv: (kv[0], [Col.EVENT] + kv[1] + [Col.SID]), [
-    (Event.NEW_BEST, [Col.GENERATION, Col.TIME, Col.FITNESS]),
-    (Event.POP_METRICS, [Col.GENERATION, Col.TIME, Col.POP_SIZE, Col.DIVERSITY, Col.DISTANCE]),
-    (Event.BEST_IN_GEN, [Col.GENERATION, Col.TIME, Col.FITNESS]),
-    (Event.POP_GEN_TIME, [Col.DURATION]),
+    (Event.NEW_BEST, [Col.GENERATION, Col.DURATION, Col.FITNESS]),
+    (Event.POP_METRICS, [Col.GENERATION, Col.DURATION, Col.POP_SIZE, Col.DIVERSITY, Col.DISTANCE]),
+    (Event.BEST_IN_GEN, [Col.GENERATION, Col.DURATION, Col.FITNESS]),
+    (Event.POP_GEN_TIME, [Col.TIME]),
     (Event.ITER_INFO, [Col.GENERATION, Col.EVAL_TIME, Col.SEL_TIME,
                        Col.CROSS_TIME, Col.MUT_TIME, Col.REPL_TIME, Col.ITER_TIME])
 ]))
@@ -141,10 +144,39 @@ COLUMN_INDICES_FOR_EVENT = dict(map(lambda kv: (kv[0], [EVENT_COL_INDEX] + kv[1]
 ]))
 
 
+# Event data is loaded with these types instead of inferred ones (64 bit), which keeps joined data of large batches
+# compact. Solver reports fitness as integer, times in milliseconds.
+DTYPE_FOR_COLUMN = {
+    Col.EVENT: pl.Categorical,
+    Col.GENERATION: pl.Int32,
+    Col.TIME: pl.UInt32,
+    Col.DURATION: pl.UInt32,
+    Col.FITNESS: pl.Int32,
+    Col.POP_SIZE: pl.Int32,
+    Col.DIVERSITY: pl.Float32,
+    Col.DISTANCE: pl.Float32,
+    Col.EVAL_TIME: pl.UInt32,
+    Col.SEL_TIME: pl.UInt32,
+    Col.CROSS_TIME: pl.UInt32,
+    Col.MUT_TIME: pl.UInt32,
+    Col.REPL_TIME: pl.UInt32,
+    Col.ITER_TIME: pl.UInt32,
+    Col.SID: pl.Int32,
+}
+
+
 def schema_for_event(event: EventName) -> list[str]:
     return SCHEMA_FOR_EVENT[event]
 
 
+def dtypes_for_event(event: EventName) -> dict[str, pl.PolarsDataType]:
+    """ Types of columns of given event. For events without known schema (e.g. older name of popmetrics)
+    types are picked by column name. """
+    if event not in SCHEMA_FOR_EVENT:
+        return DTYPE_FOR_COLUMN
+    return {col: DTYPE_FOR_COLUMN[col] for col in SCHEMA_FOR_EVENT[event]}
+
+
 def column_indices_for_event(event: EventName) -> list[int]:
     return COLUMN_INDICES_FOR_EVENT[event]
 
@@ -171,13 +203,31 @@ class JoinedExperimentData:
     summarydf: DataFrame
 
 
+@dataclass
+class BatchDataset:
+    """ Joined data from all experiments of given batch, each table has both experiment name (`Col.EXPNAME`)
+    & series id (`Col.SID`) columns, so the statistics for whole batch can be computed by single query. """
+
+    # Experiment name, best known solution & number of series of every experiment
+    experiments: DataFrame
+
+    newbest: DataFrame
+    popmetrics: DataFrame
+    bestingen: DataFrame
+    popgentime: DataFrame
+    iterinfo: DataFrame
+    summarydf: DataFrame
+
+
 SeriesId = int
 
 
 @dataclass
 class ExperimentValidationResult:
     expname: str
-    reconstructed_schedules: list[ScheduleReconstructionResult]
+
+    # None for series, which solution is not known (truncated, see `SeriesOutputMetadata.early_stopped`)
+    reconstructed_schedules: list[Optional[ScheduleReconstructionResult]]
 
     # Series ids of corrupted reconstruction results. Values in this array
     # can be used to index into reconstructed_schedules.
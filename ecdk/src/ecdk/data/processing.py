@@ -3,21 +3,31 @@ import polars.selectors as cs
 import itertools as it
 import context
 from tqdm import tqdm
+from dataclasses import dataclass
+from contextlib import nullcontext
+from multiprocessing import get_context
+from multiprocessing.pool import Pool
 from pathlib import Path
 from typing import Optional, Generator, Iterable
 from experiment.model import Experiment, Version, ExperimentId, SolutionHash
 from data.model import JoinedExperimentData, ExperimentValidationResult, SeriesId
-from .tools import experiment_data_from_all_series, extract_solver_desc_from_experiment_batch
+from .tools import (
+    experiment_from_dir,
+    experiment_data_from_all_series,
+    extract_solver_desc_from_experiment_batch,
+    batch_dataset_from_experiments,
+)
 from .plot import create_plots_for_experiment, plot_perf_cmp, visualise_instance_solution
 from .stat import (
     compute_per_exp_stats,
-    compute_global_exp_stats,
     compare_perf_info,
-    compute_convergence_iteration_per_exp,
-    compute_stats_from_solver_summary
+    PartialStats,
+    finalize_global_exp_stats,
+    finalize_convergence_iteration,
+    finalize_solver_summary_stats,
 )
-from core.fs import get_plotdir_for_exp, get_main_tabledir, get_data_dir_from_ecdk_dir
-from core.util import write_string_to_file
+from core.fs import get_plotdir_for_exp, get_main_tabledir, get_data_dir_from_ecdk_dir, experiment_dir_in_batch
+from core.util import write_string_to_file, iter_batched
 from problem import (
     validate_solution_string_in_context_of_instance,
     JsspInstance,
@@ -48,6 +58,10 @@ def validate_experiment_data(exp: Experiment, data: JoinedExperimentData, solver
 
     for s_id, s_output in enumerate(exp.result.series_outputs):
         md = s_output.data.metadata
+        if md.is_truncated():
+            # Solution of series stopped before completion is not known, there is nothing to validate
+            sol_reconstruction_results.append(None)
+            continue
         result = validate_solution_string_in_context_of_instance(md.solution_string,
                                                                  instance,
                                                                  md.fitness,
@@ -75,8 +89,12 @@ def validate_experiment_batch_data(batch: list[Experiment],
     return list(validate_experiment_batch_data_gen(batch, batch_data, solver_version))
 
 
-def find_some_best_series(exp: Experiment) -> int:
-    return min(range(len(exp.result.series_outputs)), key=lambda i: exp.result.series_outputs[i].data.metadata.fitness)
+def find_some_best_series(exp: Experiment, with_solution: bool = False) -> Optional[int]:
+    """ :param with_solution: whether only series with known solution string (not truncated) should be considered
+    :returns: id of series with the best result, None if there is no such series """
+    outputs = exp.result.series_outputs
+    candidates = [sid for sid in range(len(outputs)) if not (with_solution and outputs[sid].data.metadata.is_truncated())]
+    return min(candidates, key=lambda sid: outputs[sid].data.metadata.fitness, default=None)
 
 
 def process_experiment_data(exp: Experiment,
@@ -93,41 +111,61 @@ def process_experiment_data(exp: Experiment,
 
     exp_plotdir = get_plotdir_for_exp(exp, outdir) if outdir is not None else None
 
-    some_best_series = find_some_best_series(exp)
-
-    visualise_instance_solution(exp,
-                                validation_result.reconstructed_schedules[some_best_series].instance,
-                                some_best_series,
-                                exp_plotdir)
+    some_best_series = find_some_best_series(exp, with_solution=True)
+    if some_best_series is not None:
+        visualise_instance_solution(exp,
+                                    validation_result.reconstructed_schedules[some_best_series].instance,
+                                    some_best_series,
+                                    exp_plotdir)
 
-    create_plots_for_experiment(exp, data, some_best_series, exp_plotdir)
+    create_plots_for_experiment(exp, data, find_some_best_series(exp), exp_plotdir)
 
     # compute_per_exp_stats(exp, data)
 
 
-def process_experiment_batch_output(batch: list[Experiment], outdir: Optional[Path], process_count: int = 1, should_plot: bool = True):
-    """ :param outdir: directory for saving processed data """
+@dataclass
+class ExperimentAnalysis:
+    """ Outcome of analysis of single experiment done in worker process. Only this is sent back to the main process,
+    the experiment data is loaded, validated & plotted by the worker itself. """
 
-    print("Joining data from different series into single data frame...")
-    data: list[JoinedExperimentData] = [experiment_data_from_all_series(exp) for exp in tqdm(batch)]
+    expname: ExperimentId
 
-    print("Attempting to extract solver information from experiment batch...")
-    solver_desc_res = extract_solver_desc_from_experiment_batch(batch)
-    solver_version = Version(0, 1, 0)
-    if solver_desc_res is not None:
-        desc, json_str = solver_desc_res
-        solver_version = desc.version
-        print("Attempting to extract solver information from experiment batch OK")
-    else:
-        print("Attempting to extract solver information from experiment batch FAILED")
+    # Same as `ExperimentValidationResult.corrupted_series`
+    corrupted_series: Optional[list[SeriesId]]
 
-    print("Validating batch output...")
+    # None in case of corrupted data
+    stats: Optional[PartialStats]
 
-    # validation_results: Generator[ExperimentValidationResult, None, None] = validate_experiment_batch_data_gen(batch, data)
-    validation_results: list[ExperimentValidationResult] = validate_experiment_batch_data(batch, data, solver_version=solver_version, progress_bar=True)
+    @property
+    def ok(self) -> bool:
+        return self.corrupted_series is None or len(self.corrupted_series) == 0
+
+
+def analyze_experiment_from_dir(exp_dir: Path,
+                                outdir: Optional[Path],
+                                solver_version: Version,
+                                should_plot: bool = True,
+                                use_cache: bool = True,
+                                use_dataset: bool = False) -> ExperimentAnalysis:
+    """ Worker of the multiprocess analysis. It receives just path of the experiment directory, so that
+    none of the experiment data (nor instance / schedules) needs to be serialized between processes.
+    Experiment with corrupted data is not processed (plotted). """
+
+    exp = experiment_from_dir(exp_dir)
+    data = experiment_data_from_all_series(exp, use_cache)
+    validation_result = validate_experiment_data(exp, data, solver_version)
+    if not validation_result.ok:
+        return ExperimentAnalysis(exp.name, validation_result.corrupted_series, None)
+
+    process_experiment_data(exp, data, validation_result, outdir, should_plot)
+    dataset = batch_dataset_from_experiments([exp], [data]) if use_dataset else None
+    return ExperimentAnalysis(exp.name, None, PartialStats.of_experiments([exp], [data], dataset))
+
+
+def _exit_on_corrupted_data(results: Iterable[ExperimentValidationResult | ExperimentAnalysis]):
     has_corrupted_data = False
 
-    for result in filter(lambda res: not res.ok, validation_results):
+    for result in filter(lambda res: not res.ok, results):
         print(f"[ERROR] Experiment: {result.expname} has {len(result.corrupted_series)} corrupted series")
         # pprint(list(map(lambda sid: (sid, result.reconstructed_schedules[sid]), result.corrupted_series)))
         has_corrupted_data = True
@@ -140,28 +178,98 @@ def process_experiment_batch_output(batch: list[Experiment], outdir: Optional[Pa
     else:
         print("Validation finished successfully")
 
-    if process_count == 1:
-        print("Processing experiments data in single process...")
-        for exp, expdata, valres in tqdm(zip(batch, data, validation_results), total=len(batch)):
-            process_experiment_data(exp, expdata, valres, outdir, should_plot)
-    else:
+
+def process_experiment_window(window: list[Experiment],
+                              outdir: Optional[Path],
+                              solver_version: Version,
+                              pool: Optional[Pool] = None,
+                              should_plot: bool = True,
+                              use_cache: bool = True,
+                              use_dataset: bool = False) -> PartialStats:
+    """ Loads, validates & plots data of given experiments and reduces it to per experiment statistics.
+    Terminates the program in case any of the experiments has corrupted data.
+
+    :param pool: process pool the experiments are analyzed in (see `analyze_experiment_from_dir`), done in current process
+    if not specified. Note that in multiprocess context experiments with valid data are plotted even if some other
+    experiment turns out to be corrupted. """
+
+    if pool is not None:
         print("Processing experiments data in multiprocess context...")
-        from multiprocessing import get_context
-        with get_context("spawn").Pool(process_count) as pool:
-            pool.starmap(process_experiment_data,
-                         tqdm(zip(batch,
-                                  data,
-                                  validation_results,
-                                  it.repeat(outdir),
-                                  it.repeat(should_plot)),
-                              total=len(batch)))
+        results: list[ExperimentAnalysis] = pool.starmap(analyze_experiment_from_dir,
+                                                         tqdm(zip(map(experiment_dir_in_batch, window),
+                                                                  it.repeat(outdir),
+                                                                  it.repeat(solver_version),
+                                                                  it.repeat(should_plot),
+                                                                  it.repeat(use_cache),
+                                                                  it.repeat(use_dataset)),
+                                                              total=len(window)))
+        _exit_on_corrupted_data(results)
+        return PartialStats.merge([result.stats for result in results])
+
+    print("Joining data from different series into single data frame...")
+    data: list[JoinedExperimentData] = [experiment_data_from_all_series(exp, use_cache) for exp in tqdm(window)]
+
+    print("Validating batch output...")
+
+    # validation_results: Generator[ExperimentValidationResult, None, None] = validate_experiment_batch_data_gen(batch, data)
+    validation_results: list[ExperimentValidationResult] = validate_experiment_batch_data(window, data, solver_version=solver_version, progress_bar=True)
+    _exit_on_corrupted_data(validation_results)
+
+    print("Processing experiments data in single process...")
+    for exp, expdata, valres in tqdm(zip(window, data, validation_results), total=len(window)):
+        process_experiment_data(exp, expdata, valres, outdir, should_plot)
+
+    dataset = batch_dataset_from_experiments(window, data) if use_dataset else None
+    return PartialStats.of_experiments(window, data, dataset)
+
+
+def _release_experiment_data(window: Iterable[Experiment]):
+    for exp in window:
+        for series_output in exp.result.series_outputs:
+            series_output.data = None
+
+
+def process_experiment_batch_output(batch: list[Experiment],
+                                    outdir: Optional[Path],
+                                    process_count: int = 1,
+                                    should_plot: bool = True,
+                                    use_cache: bool = True,
+                                    use_dataset: bool = False,
+                                    window_size: Optional[int] = None):
+    """ :param outdir: directory for saving processed data
+    :param use_cache: whether event data should be loaded through Parquet cache in experiment directories
+    :param use_dataset: whether summary statistics should be computed from data of whole batch joined into single
+    tables (see `BatchDataset`) instead of experiment by experiment
+    :param window_size: number of experiments, which data is held in memory at once. Experiments are processed in windows
+    of this size & only per experiment statistics are kept from each of them, so peak memory depends on the largest
+    experiments instead of size of the batch. Whole batch is loaded at once by default. """
+
+    print("Attempting to extract solver information from experiment batch...")
+    solver_desc_res = extract_solver_desc_from_experiment_batch(batch)
+    solver_version = Version(0, 1, 0)
+    if solver_desc_res is not None:
+        desc, json_str = solver_desc_res
+        solver_version = desc.version
+        print("Attempting to extract solver information from experiment batch OK")
+    else:
+        print("Attempting to extract solver information from experiment batch FAILED")
+
+    window_size = window_size or len(batch)
+    parts: list[PartialStats] = []
+    with get_context("spawn").Pool(process_count) if process_count != 1 else nullcontext() as pool:
+        for i, window in enumerate(iter_batched(batch, window_size)):
+            if window_size < len(batch):
+                print(f"Processing experiments {i * window_size + 1}-{i * window_size + len(window)} of {len(batch)}...")
+            parts.append(process_experiment_window(list(window), outdir, solver_version, pool, should_plot, use_cache, use_dataset))
+            _release_experiment_data(window)
 
     tabledir = get_main_tabledir(outdir) if outdir is not None else None
 
     print("Computing statistics...")
-    run_metadata_stats_df = compute_stats_from_solver_summary(batch, data)
-    global_df = compute_global_exp_stats(batch, data, tabledir)
-    conv_df = compute_convergence_iteration_per_exp(batch, data, tabledir)
+    stats = PartialStats.merge(parts)
+    run_metadata_stats_df = finalize_solver_summary_stats(stats.solver_summary)
+    global_df = finalize_global_exp_stats(stats.global_stats, tabledir)
+    conv_df = finalize_convergence_iteration(stats.convergence)
 
     if run_metadata_stats_df is not None:
         print("Looking for any previously unknown solutions...")
@@ -1,11 +1,12 @@
 import polars as pl
+from dataclasses import dataclass
 from pathlib import Path
 from typing import Optional
 from experiment.model import Experiment
-from .model import JoinedExperimentData, Col
+from .model import JoinedExperimentData, BatchDataset, Col
 from .constants import FLOAT_PRECISION
 
-KEY_EXPNAME = 'expname'
+KEY_EXPNAME = Col.EXPNAME
 KEY_FITNESS_AVG = 'fitness_avg'
 KEY_FITNESS_STD = 'fitness_std'
 KEY_FITNESS_BEST = 'fitness_best'
@@ -45,14 +46,14 @@ def compute_per_exp_stats(exp: Experiment, data: JoinedExperimentData, outdir: O
     pass
 
 
-def compute_global_exp_stats(batch: list[Experiment], data: list[JoinedExperimentData], outdir: Optional[Path]):
-    fitness_avg_to_bks_dev_expr = (
-        (pl.col(KEY_FITNESS_AVG) - pl.col(KEY_BKS)) / pl.col(KEY_BKS) * 100
-    )
-    fitness_best_to_bks_dev_expr = (
-        (pl.col(KEY_FITNESS_BEST) - pl.col(KEY_BKS)) / pl.col(KEY_BKS) * 100
-    )
+def _fitness_to_bks_dev_exprs() -> list[pl.Expr]:
+    return [
+        ((pl.col(KEY_FITNESS_AVG) - pl.col(KEY_BKS)) / pl.col(KEY_BKS) * 100).alias(KEY_FAVGTOBKS),
+        ((pl.col(KEY_FITNESS_BEST) - pl.col(KEY_BKS)) / pl.col(KEY_BKS) * 100).alias(KEY_FBTOBKS),
+    ]
+
 
+def _global_exp_stats_per_exp(batch: list[Experiment], data: list[JoinedExperimentData]) -> pl.DataFrame:
     dfmain = pl.DataFrame()
 
     for exp, expdata in zip(batch, data):
@@ -110,10 +111,7 @@ def compute_global_exp_stats(batch: list[Experiment], data: list[JoinedExperimen
                 pl.Series(KEY_NSERIES, [exp.config.n_series]),
                 dfbks_hitratio.get_column(KEY_BKS_HITRATIO)
             ])
-            .with_columns([
-                fitness_avg_to_bks_dev_expr.alias(KEY_FAVGTOBKS),
-                fitness_best_to_bks_dev_expr.alias(KEY_FBTOBKS)
-            ])
+            .with_columns(_fitness_to_bks_dev_exprs())
             .collect()
             .hstack(df, in_place=True)
         )
@@ -121,6 +119,84 @@ def compute_global_exp_stats(batch: list[Experiment], data: list[JoinedExperimen
         dfmain.vstack(dfres, in_place=True)
         # break
 
+    return dfmain
+
+
+def _global_exp_stats_from_dataset(dataset: BatchDataset) -> pl.DataFrame:
+    """ Same table as computed by `_global_exp_stats_per_exp`, by single query over whole batch """
+    colexp = pl.col(KEY_EXPNAME)
+    diversity = (
+        dataset.popmetrics.lazy()
+        .group_by(colexp)
+        .agg([
+            pl.col(Col.DIVERSITY).mean().alias(KEY_DIV_AVG),
+            pl.col(Col.DIVERSITY).std().alias(KEY_DIV_STD),
+        ])
+    )
+    improvements = (
+        dataset.newbest.lazy()
+        .group_by([colexp, pl.col(Col.SID)])
+        .agg((pl.len() - 1).alias('count'))  # -1 because new_best is also reported from initial population
+        .group_by(colexp)
+        .agg([
+            pl.col('count').mean().alias(KEY_FITNESS_IMP_AVG),
+            pl.col('count').std().alias(KEY_FITNESS_IMP_STD)
+        ])
+    )
+    itertime = (
+        dataset.iterinfo.lazy()
+        .group_by(colexp)
+        .agg([
+            pl.col(Col.ITER_TIME).mean().alias(KEY_ITERTIME_AVG),
+            pl.col(Col.ITER_TIME).std().alias(KEY_ITERTIME_STD)
+        ])
+    )
+    bks_hitratio = (
+        dataset.bestingen.lazy()
+        .group_by([colexp, pl.col(Col.SID)])
+        .agg(pl.col(Col.FITNESS).min().alias(KEY_FITNESS_BEST))
+        .join(dataset.experiments.lazy(), on=KEY_EXPNAME)
+        .group_by(colexp)
+        .agg(((pl.col(KEY_FITNESS_BEST) == pl.col(KEY_BKS)).sum() * 100 / pl.col(KEY_NSERIES).first()).alias(KEY_BKS_HITRATIO))
+    )
+    fitness = (
+        dataset.bestingen.lazy()
+        .group_by(colexp)
+        .agg([
+            pl.col(Col.FITNESS).mean().alias(KEY_FITNESS_AVG),
+            pl.col(Col.FITNESS).std().alias(KEY_FITNESS_STD),
+            pl.col(Col.FITNESS).min().alias(KEY_FITNESS_BEST),
+        ])
+    )
+    # Experiments table is the base, so experiments with no data in some table get nulls as in the loop
+    return (
+        dataset.experiments.lazy()
+        .join(fitness, on=KEY_EXPNAME, how='left')
+        .join(bks_hitratio, on=KEY_EXPNAME, how='left')
+        .join(diversity, on=KEY_EXPNAME, how='left')
+        .join(improvements, on=KEY_EXPNAME, how='left')
+        .join(itertime, on=KEY_EXPNAME, how='left')
+        .with_columns(pl.col(KEY_BKS_HITRATIO).fill_null(0.0))
+        .with_columns(_fitness_to_bks_dev_exprs())
+        .collect()
+    )
+
+
+def compute_global_exp_stats(batch: list[Experiment],
+                             data: list[JoinedExperimentData],
+                             outdir: Optional[Path],
+                             dataset: Optional[BatchDataset] = None):
+    """ :param dataset: joined data of whole batch; when passed the statistics are computed from it by single query,
+    instead of querying data of each experiment separately """
+    if dataset is not None:
+        dfmain = _global_exp_stats_from_dataset(dataset)
+    else:
+        dfmain = _global_exp_stats_per_exp(batch, data)
+    return finalize_global_exp_stats(dfmain, outdir)
+
+
+def finalize_global_exp_stats(dfmain: pl.DataFrame, outdir: Optional[Path]) -> pl.DataFrame:
+    """ Prints & saves the summary of experiments, given the table with row per experiment """
     dfmain = (
         dfmain.lazy()
         .select([  # Column order, few columns are excluded: KEY_NSERIES
@@ -193,7 +269,7 @@ def compare_perf_info(df_base: pl.DataFrame, df_bench: pl.DataFrame):
     print(df_res)
 
 
-def compute_convergence_iteration_per_exp(batch: list[Experiment], data: list[JoinedExperimentData], outdir: Optional[Path]) -> pl.DataFrame:
+def _convergence_iteration_per_exp(batch: list[Experiment], data: list[JoinedExperimentData]) -> pl.DataFrame:
     main_df = pl.DataFrame()
     colgen = pl.col(Col.GENERATION)
 
@@ -233,6 +309,50 @@ def compute_convergence_iteration_per_exp(batch: list[Experiment], data: list[Jo
 
         main_df.vstack(avg_cvg_iter, in_place=True)
 
+    return main_df
+
+
+def _convergence_iteration_from_dataset(dataset: BatchDataset) -> pl.DataFrame:
+    """ Same table as computed by `_convergence_iteration_per_exp`, by single query over whole batch """
+    colgen = pl.col(Col.GENERATION)
+    converged = pl.col('converged')
+    converged_gen = colgen.filter(converged)
+    return (
+        dataset.newbest.lazy()
+        .group_by([pl.col(KEY_EXPNAME), pl.col(Col.SID)])
+        .agg([
+            pl.col(Col.FITNESS).sort_by(colgen).last(),
+            colgen.sort_by(colgen).last(),
+        ])
+        .join(dataset.experiments.lazy(), on=KEY_EXPNAME)
+        .with_columns((pl.col(Col.FITNESS) == pl.col(KEY_BKS)).alias('converged'))
+        .group_by(pl.col(KEY_EXPNAME))
+        .agg([
+            converged_gen.mean().alias('avg_cvg_iter'),
+            converged_gen.std().alias('std_cvg_iter'),
+            converged_gen.median().alias('median_cvg_iter'),
+            converged_gen.min().alias('min_cvg_iter'),
+            converged_gen.max().alias('max_cvg_iter'),
+            (converged.sum() * 100 / pl.len()).alias(KEY_BKS_HITRATIO),
+            ((converged & (colgen <= 400)).sum() * 100 / pl.len()).alias('pre400_bks_hitratio'),
+        ])
+        .collect()
+    )
+
+
+def compute_convergence_iteration_per_exp(batch: list[Experiment],
+                                          data: list[JoinedExperimentData],
+                                          outdir: Optional[Path],
+                                          dataset: Optional[BatchDataset] = None) -> pl.DataFrame:
+    """ :param dataset: joined data of whole batch; when passed the statistics are computed from it by single query """
+    if dataset is not None:
+        main_df = _convergence_iteration_from_dataset(dataset)
+    else:
+        main_df = _convergence_iteration_per_exp(batch, data)
+    return finalize_convergence_iteration(main_df)
+
+
+def finalize_convergence_iteration(main_df: pl.DataFrame) -> pl.DataFrame:
     main_df = (
         main_df
         .filter(pl.col('avg_cvg_iter').is_not_null())
@@ -246,21 +366,17 @@ def compute_convergence_iteration_per_exp(batch: list[Experiment], data: list[Jo
     return main_df
 
 
-def compute_stats_from_solver_summary(
-        batch: list[Experiment],
-        data: list[JoinedExperimentData]) -> Optional[tuple[pl.DataFrame, pl.DataFrame]]:
-    """ Computes statistics & extracts information based on solver summary (run_metadata.json).
-    This function assumes that data & batch structures are synchronized (on index i there is data for ith experiment).
+def _without_truncated_series(summary_df: pl.DataFrame) -> pl.DataFrame:
+    # Solver of series stopped before completion has not reported these statistics (nor solution hash)
+    return summary_df.filter(pl.col(KEY_HASH).is_not_null())
 
-    :param batch: iterable of experiments
-    :param data: joined data for respective batch experiments
-    :return: tuple of two data frames - first one contains statistics, second one stores hashes & experiment_ids
-    """
+
+def _solver_summary_stats_per_exp(batch: list[Experiment], data: list[JoinedExperimentData]) -> Optional[tuple[pl.DataFrame, pl.DataFrame]]:
     main_df = pl.DataFrame()
     hash_df = pl.DataFrame()
 
     for exp, summary_df in zip(batch, map(lambda d: d.summarydf, data)):
-        summary_df: pl.DataFrame = summary_df
+        summary_df: pl.DataFrame = _without_truncated_series(summary_df)
 
         # As old data does not have data in certain columns we want to shortcircuit
         # and just don't compute these stats at all
@@ -324,6 +440,78 @@ def compute_stats_from_solver_summary(
         main_df.vstack(new_df, in_place=True)
         hash_df.vstack(new_hash_df, in_place=True)
 
+    return main_df, hash_df
+
+
+def _solver_summary_stats_from_dataset(dataset: BatchDataset) -> Optional[tuple[pl.DataFrame, pl.DataFrame]]:
+    """ Same tables as computed by `_solver_summary_stats_per_exp`, by single query (each) over whole batch """
+    summary_df = _without_truncated_series(dataset.summarydf)
+
+    # As old data does not have data in certain columns we want to shortcircuit
+    # and just don't compute these stats at all
+    if any(map(lambda value: value > 0, summary_df.null_count().row(0))):
+        return None
+
+    colexp = pl.col(KEY_EXPNAME)
+    main_df = (
+        summary_df
+        .lazy()
+        .group_by(colexp)
+        .agg([
+            pl.col(KEY_AGE_AVG).mean(),
+            pl.col(KEY_AGE_AVG).std().alias(KEY_AGE_STD),
+            pl.col(KEY_AGE_MAX).max(),
+            pl.col(KEY_HASH).n_unique().alias(KEY_UNIQUE_SOLS),
+            pl.col(KEY_INDV_COUNT).mean().alias(KEY_INDV_COUNT_AVG),
+            pl.col(KEY_INDV_COUNT).std().alias(KEY_INDV_COUNT_STD),
+            pl.col(KEY_CROSSOVER_INV_MAX).max(),
+            pl.col(KEY_CROSSOVER_INV_MIN).min(),
+            pl.col(Col.FITNESS).min().alias(KEY_FITNESS_BEST),
+            pl.col(KEY_TOTAL_TIME).mean().alias(KEY_TOTAL_TIME_AVG),
+            pl.col(KEY_TOTAL_TIME).std().alias(KEY_TOTAL_TIME_STD),
+        ])
+        .collect()
+    )
+
+    hash_df = (
+        summary_df
+        .lazy()
+        .filter(pl.col(Col.FITNESS) == pl.col(Col.FITNESS).min().over(colexp))
+        .group_by([colexp, pl.col(KEY_HASH)])
+        .agg([
+            pl.col(Col.FITNESS).first().alias(KEY_FITNESS_BEST),
+            pl.col(Col.SID).min(),  # We take smalest series id from unique ones
+        ])
+        .select([colexp, pl.col(KEY_FITNESS_BEST), pl.col(KEY_HASH), pl.col(Col.SID)])
+        .collect()
+    )
+    return main_df, hash_df
+
+
+def compute_stats_from_solver_summary(
+        batch: list[Experiment],
+        data: list[JoinedExperimentData],
+        dataset: Optional[BatchDataset] = None) -> Optional[tuple[pl.DataFrame, pl.DataFrame]]:
+    """ Computes statistics & extracts information based on solver summary (run_metadata.json).
+    This function assumes that data & batch structures are synchronized (on index i there is data for ith experiment).
+
+    :param batch: iterable of experiments
+    :param data: joined data for respective batch experiments
+    :param dataset: joined data of whole batch; when passed the statistics are computed from it by single query
+    :return: tuple of two data frames - first one contains statistics, second one stores hashes & experiment_ids
+    """
+    if dataset is not None:
+        tables = _solver_summary_stats_from_dataset(dataset)
+    else:
+        tables = _solver_summary_stats_per_exp(batch, data)
+    return finalize_solver_summary_stats(tables)
+
+
+def finalize_solver_summary_stats(tables: Optional[tuple[pl.DataFrame, pl.DataFrame]]) -> Optional[tuple[pl.DataFrame, pl.DataFrame]]:
+    if tables is None:
+        return None
+
+    main_df, hash_df = tables
     main_df = main_df.sort(KEY_EXPNAME)
     hash_df = hash_df.sort(KEY_EXPNAME)
 
@@ -331,3 +519,42 @@ def compute_stats_from_solver_summary(
     print(hash_df)
     return main_df, hash_df
 
+
+@dataclass
+class PartialStats:
+    """ Rows (per experiment) of the summary tables computed for part of the batch, e.g. single window of experiments.
+    Data of the part can be released once these are computed; tables of whole batch are obtained by merging the parts
+    & passing them to respective `finalize_*` function. """
+
+    global_stats: pl.DataFrame
+    convergence: pl.DataFrame
+
+    # None when solver summary of some experiment lacks data, see `compute_stats_from_solver_summary`
+    solver_summary: Optional[tuple[pl.DataFrame, pl.DataFrame]]
+
+    @classmethod
+    def of_experiments(cls,
+                       batch: list[Experiment],
+                       data: list[JoinedExperimentData],
+                       dataset: Optional[BatchDataset] = None) -> 'PartialStats':
+        if dataset is not None:
+            return cls(_global_exp_stats_from_dataset(dataset),
+                       _convergence_iteration_from_dataset(dataset),
+                       _solver_summary_stats_from_dataset(dataset))
+        return cls(_global_exp_stats_per_exp(batch, data),
+                   _convergence_iteration_per_exp(batch, data),
+                   _solver_summary_stats_per_exp(batch, data))
+
+    @classmethod
+    def merge(cls, parts: list['PartialStats']) -> 'PartialStats':
+        assert len(parts) > 0, "At least one part is required"
+        summaries = [part.solver_summary for part in parts]
+        solver_summary = None
+        if all(summary is not None for summary in summaries):
+            solver_summary = (pl.concat([summary[0] for summary in summaries], how='vertical_relaxed'),
+                              pl.concat([summary[1] for summary in summaries], how='vertical_relaxed'))
+        return cls(
+            global_stats=pl.concat([part.global_stats for part in parts], how='vertical_relaxed'),
+            convergence=pl.concat([part.convergence for part in parts], how='vertical_relaxed'),
+            solver_summary=solver_summary
+        )
@@ -1,8 +1,11 @@
+import os
 import polars as pl
 import core.fs
 import json
+import gzip
 from tqdm import tqdm
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Iterable
 from pathlib import Path
 from experiment.model import (
     ExperimentResult,
@@ -15,29 +18,47 @@ from data.model import (
     Event,
     InstanceMetadata,
     JoinedExperimentData,
+    BatchDataset,
+    DTYPE_FOR_COLUMN,
 )
-from core.series import load_series_output, materialize_series_output
+from core.series import load_series_output, materialize_series_output, materialize_series_metadata
+from data.cache import ExperimentEventCache
+from data.stat import KEY_BKS, KEY_NSERIES
+
+
+def _subdirectories(directory: Path) -> list[Path]:
+    """ Subdirectories in order of the directory listing. Entries of the listing carry the file type, so no
+    additional stat call is made for every entry, which matters on network filesystems. """
+    with os.scandir(directory) as entries:
+        return [Path(entry.path) for entry in entries if entry.is_dir()]
 
 
 def experiment_result_from_dir(directory: Path, materialize: bool = False) -> ExperimentResult:
     # Metadata collected by SolverProxy is not dumped on the disk currently.
     # TODO: dump it on the disk & load it here
     result = ExperimentResult([], None)
-    for series_dir in filter(lambda file: file.is_dir(), directory.iterdir()):
+    # Hidden directories are leftovers of speculative series replicas
+    for series_dir in filter(lambda file: not file.name.startswith('.'), _subdirectories(directory)):
         series_output = load_series_output(series_dir, lazy=not materialize)
         result.series_outputs.append(series_output)
 
     return result
 
 
+def is_experiment_dir(directory: Path) -> bool:
+    # Batch directory might contain other directories as well, e.g. generated solver configs of a sweep
+    return directory.is_dir() and core.fs.experiment_file_from_directory(directory).is_file()
+
+
 def extract_experiment_results_from_dir(directory: Path, materialize: bool = False) -> list[ExperimentResult]:
     exp_results = []
-    for exp_dir in filter(lambda file: file.is_dir(), directory.iterdir()):
+    for exp_dir in filter(is_experiment_dir, _subdirectories(directory)):
         exp_results.append(experiment_result_from_dir(exp_dir, materialize))
     return exp_results
 
 
-def experiment_from_dir(directory: Path, materialize: bool = False) -> Experiment:
+def experiment_desc_from_dir(directory: Path) -> Experiment:
+    """ Loads experiment description (without any results) from its output directory """
     exp_file = core.fs.experiment_file_from_directory(directory)
     exp: Experiment = None
     with open(exp_file, 'r') as file:
@@ -45,17 +66,36 @@ def experiment_from_dir(directory: Path, materialize: bool = False) -> Experimen
 
     assert exp is not None, f"Failed to load experiment configuration data for {exp_file}"
 
-    exp_result = experiment_result_from_dir(directory, materialize)
-    exp.result = exp_result
     exp.batch_dir = directory.parent
     return exp
 
 
-def extract_experiments_from_dir(directory: Path) -> list[Experiment]:
+def experiment_from_dir(directory: Path, materialize: bool = False) -> Experiment:
+    exp = experiment_desc_from_dir(directory)
+    exp.result = experiment_result_from_dir(directory, materialize)
+    return exp
+
+
+def _experiment_from_dir_or_none(directory: Path) -> Optional[Experiment]:
+    # Batch directory might contain other directories as well, e.g. generated solver configs of a sweep
+    try:
+        exp = experiment_desc_from_dir(directory)
+    except FileNotFoundError:
+        return None
+    exp.result = experiment_result_from_dir(directory)
+    return exp
+
+
+def extract_experiments_from_dir(directory: Path, workers: Optional[int] = None) -> list[Experiment]:
+    """ Loads description & series files of every experiment of the batch. Experiments are loaded on a thread pool,
+    as it is dominated by filesystem metadata operations; the order of experiments is the order of the directory listing.
+
+    :param workers: number of threads, by default picked by `ThreadPoolExecutor` """
     print("Loading experiments output data into memory...", flush=True)
-    return [
-        experiment_from_dir(d) for d in tqdm(filter(lambda f: f.is_dir(), directory.iterdir()))
-    ]
+    exp_dirs = _subdirectories(directory)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        experiments = list(tqdm(executor.map(_experiment_from_dir_or_none, exp_dirs), total=len(exp_dirs)))
+    return [exp for exp in experiments if exp is not None]
 
 
 def data_frame_from_file(data_file: Path, has_header: bool = False) -> pl.DataFrame:
@@ -73,7 +113,21 @@ def __update_df_with(base_df: pl.DataFrame, new_df: pl.DataFrame) -> pl.DataFram
 
 
 def __add_sid_column_to_df(df: pl.DataFrame, sid: int) -> pl.DataFrame:
-    return df.with_columns(pl.Series(Col.SID, [sid for _ in range(0, df.shape[0])]))
+    return df.with_columns(pl.lit(sid, dtype=DTYPE_FOR_COLUMN[Col.SID]).alias(Col.SID))
+
+
+# Explicit, as any of the values might be None (e.g. hash of truncated series)
+_METADATA_DF_SCHEMA = {
+    'gen_count': pl.Int64,
+    'total_time': pl.Int64,
+    'fitness': pl.Int64,
+    'hash': pl.Utf8,
+    'age_avg': pl.Float64,
+    'age_max': pl.Int64,
+    'indv_count': pl.Int64,
+    'co_inv_max': pl.Int64,
+    'co_inv_min': pl.Int64,
+}
 
 
 def _df_from_metadata(md: SeriesOutputMetadata) -> pl.DataFrame:
@@ -89,10 +143,15 @@ def _df_from_metadata(md: SeriesOutputMetadata) -> pl.DataFrame:
         'indv_count': md.individual_count,
         'co_inv_max': md.crossover_involvement_max,
         'co_inv_min': md.crossover_involvement_min,
-    })
+    }, schema=_METADATA_DF_SCHEMA)
+
 
+def experiment_data_from_all_series(experiment: Experiment, use_cache: bool = True) -> JoinedExperimentData:
+    """ :param use_cache: whether the event data should be loaded through the experiment's Parquet cache,
+    see `ExperimentEventCache`; csv files are parsed on every call otherwise """
+    if use_cache and len(experiment.result.series_outputs) > 0:
+        return _experiment_data_from_cache(experiment)
 
-def experiment_data_from_all_series(experiment: Experiment) -> JoinedExperimentData:
     exp_data = JoinedExperimentData(
         newbest=None,
         popmetrics=None,
@@ -119,6 +178,58 @@ def experiment_data_from_all_series(experiment: Experiment) -> JoinedExperimentD
     return exp_data
 
 
+def _experiment_data_from_cache(experiment: Experiment) -> JoinedExperimentData:
+    outputs = experiment.result.series_outputs
+    cache = ExperimentEventCache(outputs[0].files.directory.parent)
+
+    def event_sources(*events: str) -> list[tuple[int, Path]]:
+        # First of the events present in the series, see the popmetrics comment above
+        return [
+            (sid, next(output.files.event_files[event] for event in events if event in output.files.event_files))
+            for sid, output in enumerate(outputs)
+        ]
+
+    summarydf = None
+    for sid, series_output in enumerate(outputs):
+        materialize_series_metadata(series_output)
+        summarydf = __update_df_with(summarydf, __add_sid_column_to_df(_df_from_metadata(series_output.data.metadata), sid))
+
+    return JoinedExperimentData(
+        newbest=cache.load(Event.NEW_BEST, event_sources(Event.NEW_BEST)),
+        popmetrics=cache.load(Event.POP_METRICS, event_sources(Event.POP_METRICS, Event.DIVERSITY)),
+        bestingen=cache.load(Event.BEST_IN_GEN, event_sources(Event.BEST_IN_GEN)),
+        popgentime=cache.load(Event.POP_GEN_TIME, event_sources(Event.POP_GEN_TIME)),
+        iterinfo=cache.load(Event.ITER_INFO, event_sources(Event.ITER_INFO)),
+        summarydf=summarydf,
+    )
+
+
+def batch_dataset_from_experiments(batch: list[Experiment], data: list[JoinedExperimentData]) -> BatchDataset:
+    """ Stacks joined data of all experiments into single tables with experiment name column.
+    This function assumes that data & batch structures are synchronized (on index i there is data for ith experiment). """
+
+    def stacked(frames: Iterable[pl.DataFrame]) -> pl.DataFrame:
+        # Types inferred from csv files of different experiments might differ, e.g. int & float fitness
+        return pl.concat([
+            df.with_columns(pl.lit(exp.name).alias(Col.EXPNAME))
+            for exp, df in zip(batch, frames)
+        ], how='vertical_relaxed')
+
+    return BatchDataset(
+        experiments=pl.DataFrame({
+            Col.EXPNAME: [exp.name for exp in batch],
+            KEY_BKS: [exp.instance.best_solution for exp in batch],
+            KEY_NSERIES: [exp.config.n_series for exp in batch],
+        }, schema={Col.EXPNAME: pl.Utf8, KEY_BKS: pl.Int64, KEY_NSERIES: pl.Int64}),
+        newbest=stacked(d.newbest for d in data),
+        popmetrics=stacked(d.popmetrics for d in data),
+        bestingen=stacked(d.bestingen for d in data),
+        popgentime=stacked(d.popgentime for d in data),
+        iterinfo=stacked(d.iterinfo for d in data),
+        summarydf=stacked(d.summarydf for d in data),
+    )
+
+
 def maybe_load_instance_metadata(metadata_file: Optional[Path]) -> Optional[Dict[str, InstanceMetadata]]:
     if metadata_file is None:
         return None
@@ -134,6 +245,11 @@ def extract_solver_desc_from_experiment_batch(batch: list[Experiment]) -> Option
     assert len(batch) > 0, "Can not extract solver desc, because batch is empty"
     exp = batch[0]
 
+    # Captured by the runner while the batch was running, when solver output has been captured
+    if exp.batch_dir is not None and (desc_file := core.fs.solver_desc_file_for_batch(exp.batch_dir)).is_file():
+        json_str = desc_file.read_text()
+        return json.loads(json_str, object_hook=SolverDescription.from_dict), json_str
+
     assert exp.result is not None, "Can not extract solver desc, because exp has no result"
     assert len(exp.result.series_outputs) > 0, "Can not extract solver desc, because there are no series outputs"
     series_output = exp.result.series_outputs[0]
@@ -152,7 +268,7 @@ def _parse_solver_description_from_file(file: Path) -> Optional[tuple[SolverDesc
     json_str = None
 
     # print('parsing')
-    with open(file, 'r') as fd:
+    with (gzip.open(file, 'rt') if file.suffix == '.gz' else open(file, 'r')) as fd:
         while (line := fd.readline()) != '':
             if not line.startswith(start_marker):
                 continue
@@ -163,6 +279,9 @@ def _parse_solver_description_from_file(file: Path) -> Optional[tuple[SolverDesc
         buffer = []
 
         while not (json_line := fd.readline()).startswith(end_marker):
+            # Output might have been truncated (see `--log-size-cap`) before the end marker
+            if json_line == '':
+                return None
             buffer.append(json_line)
 
         json_str = ''.join(buffer)
@@ -0,0 +1,108 @@
+import polars as pl
+import datetime as dt
+from pathlib import Path
+from typing import Optional
+from .model import ExperimentConfig, ExperimentResult
+from core.env import getmap_env
+from data.constants import FLOAT_PRECISION
+
+ACCOUNTING_SCHEMA = {
+    'expname': pl.Utf8,
+    'sid': pl.Int64,
+    'status': pl.Int64,
+    'attempts': pl.Int64,
+    'timed_out': pl.Boolean,
+    'early_stopped': pl.Utf8,
+    'restored': pl.Boolean,
+    'wall_time': pl.Float64,
+    'user_time': pl.Float64,
+    'system_time': pl.Float64,
+    'max_rss_mb': pl.Float64,
+    'vol_ctx_switches': pl.Int64,
+    'invol_ctx_switches': pl.Int64,
+    'cpus': pl.Utf8,
+}
+
+
+def accounting_df_from_results(configs: list[ExperimentConfig], results: list[ExperimentResult]) -> pl.DataFrame:
+    """ Builds per-series resource accounting table. Series without resource usage information
+    (e.g. computed on platform that does not support it) have nulls in respective columns. """
+    rows = {col: [] for col in ACCOUNTING_SCHEMA.keys()}
+    for config, result in zip(configs, results):
+        if not result.has_metadata():
+            continue
+        # Experiments of a sweep share the instance, so they are told apart by their output directory
+        expname = config.output_dir.name
+        for sid, md in enumerate(result.metadata):
+            # Series that were not run by this runtime (e.g. completed in previous run)
+            if md is None:
+                continue
+            usage = md.resource_usage
+            rows['expname'].append(expname)
+            rows['sid'].append(sid)
+            rows['status'].append(md.status)
+            rows['attempts'].append(md.attempts)
+            rows['timed_out'].append(md.timed_out)
+            rows['early_stopped'].append(md.early_stopped)
+            rows['restored'].append(md.restored)
+            rows['wall_time'].append(md.duration.total_seconds() if not md.restored else None)
+            rows['user_time'].append(usage.user_time if usage else None)
+            rows['system_time'].append(usage.system_time if usage else None)
+            rows['max_rss_mb'].append(usage.max_rss / 1024 if usage else None)
+            rows['vol_ctx_switches'].append(usage.voluntary_ctx_switches if usage else None)
+            rows['invol_ctx_switches'].append(usage.involuntary_ctx_switches if usage else None)
+            rows['cpus'].append(','.join(map(str, md.cpus)) if md.cpus is not None else None)
+    return pl.DataFrame(rows, schema=ACCOUNTING_SCHEMA)
+
+
+def write_accounting_table(df: pl.DataFrame, outfile: Path):
+    """ Saves the table. If the file already exists (e.g. batch is being resumed), rows for
+    series that are not present in `df` are preserved. """
+    if outfile.is_file():
+        previous_df = pl.read_csv(outfile, has_header=True, dtypes=ACCOUNTING_SCHEMA)
+        # Tables written by older versions lack some of the columns
+        previous_df = previous_df.with_columns(
+            pl.lit(None, dtype=dtype).alias(col) for col, dtype in ACCOUNTING_SCHEMA.items() if col not in previous_df.columns
+        ).select(ACCOUNTING_SCHEMA.keys())
+        df = pl.concat([
+            previous_df.join(df, on=['expname', 'sid'], how='anti'),
+            df
+        ]).sort(['expname', 'sid'])
+    df.write_csv(outfile, include_header=True, float_precision=FLOAT_PRECISION)
+
+
+def print_accounting_report(df: pl.DataFrame, batch_duration: dt.timedelta, process_limit: int, mem_per_cpu_mb: Optional[float] = None):
+    """ Prints core-hours summary of the batch & experiments that exceeded the memory limit.
+
+    :param df: accounting table, see `accounting_df_from_results`
+    :param batch_duration: wall time of the whole batch
+    :param process_limit: number of cores reserved for the batch
+    :param mem_per_cpu_mb: memory limit per core, if not specified `SLURM_MEM_PER_CPU` is used when set """
+    if df.height == 0:
+        return
+
+    mem_per_cpu_mb = mem_per_cpu_mb or getmap_env('SLURM_MEM_PER_CPU', float)
+
+    cpu_hours = (df.select((pl.col('user_time') + pl.col('system_time')).sum()).item() or 0) / 3600
+    task_hours = df.select(pl.col('wall_time').sum()).item() / 3600
+    reserved_core_hours = batch_duration.total_seconds() * process_limit / 3600
+    utilization = task_hours * 100 / reserved_core_hours if reserved_core_hours > 0 else 0
+
+    print(f"Core-hours reserved: {reserved_core_hours:.3f}, busy: {task_hours:.3f} ({utilization:.2f}%), CPU time: {cpu_hours:.3f} h")
+
+    per_exp_df = (
+        df.lazy()
+        .group_by(pl.col('expname'))
+        .agg([
+            pl.col('max_rss_mb').max().alias('max_rss_mb'),
+            (pl.col('user_time') + pl.col('system_time')).sum().alias('cpu_time'),
+        ])
+        .sort(pl.col('max_rss_mb'), descending=True, nulls_last=True)
+        .collect()
+    )
+    print(per_exp_df.head(10))
+
+    if mem_per_cpu_mb is not None:
+        exceeding_df = per_exp_df.filter(pl.col('max_rss_mb') > mem_per_cpu_mb)
+        if exceeding_df.height > 0:
+            print(f"[WARN] {exceeding_df.height} experiment(s) exceeded {mem_per_cpu_mb} MB per core: {exceeding_df.get_column('expname').to_list()}")
@@ -0,0 +1,82 @@
+import math
+import statistics
+from dataclasses import dataclass
+from typing import Optional
+
+
+def _t_quantile(p: float, df: int) -> float:
+    """ Quantile of Student's t distribution, Cornish-Fisher expansion around the normal quantile.
+    Accurate to <1% for df >= 3, underestimates noticeably below that. """
+    z = statistics.NormalDist().inv_cdf(p)
+    return (z
+            + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+
+# Fewer values would require exact t quantiles, see `_t_quantile`
+MIN_SAMPLE_SIZE = 4
+
+
+def mean_ci_half_width(values: list[float], confidence: float = 0.95) -> float:
+    """ Half-width of the confidence interval of the mean """
+    assert len(values) >= MIN_SAMPLE_SIZE, f"At least {MIN_SAMPLE_SIZE} values are required to estimate the confidence interval"
+    t = _t_quantile(1 - (1 - confidence) / 2, len(values) - 1)
+    return t * statistics.stdev(values) / math.sqrt(len(values))
+
+
+def wilson_half_width(successes: int, n: int, confidence: float = 0.95) -> float:
+    """ Half-width of Wilson score interval of the success ratio, well behaved also for ratios close to 0 & 1 """
+    assert n > 0, "At least one trial is required to estimate the confidence interval"
+    z = statistics.NormalDist().inv_cdf(1 - (1 - confidence) / 2)
+    p = successes / n
+    return z / (1 + z ** 2 / n) * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2))
+
+
+@dataclass
+class SeriesCountPolicy:
+    """ Number of series of every experiment is decided while the batch is running. Series are run in waves of
+    `wave_size` series of every unfinished experiment, and after every wave each experiment is checked against the
+    stopping criteria. Experiments with low variance of the result (e.g. easy instances, where every series finds the
+    optimum) stop after the first waves, so the compute goes to the experiments where it matters. """
+
+    # Number of series run for every unfinished experiment in single wave. Statistics are evaluated
+    # only after `max(wave_size, MIN_SAMPLE_SIZE)` successful series.
+    wave_size: int
+
+    # Experiment is stopped after this many series regardless of the statistics
+    max_series: int
+
+    # Experiment is stopped once half-width of the confidence interval of mean fitness drops to this fraction
+    # of best known solution (or of the mean, if BKS is unknown). None disables the criterion.
+    fitness_ci_width: Optional[float] = 0.01
+
+    # Experiment is stopped once half-width of the confidence interval of ratio of series that reached best known solution
+    # drops to this value. None disables the criterion, it is not used for instances with unknown BKS.
+    hit_ratio_ci_width: Optional[float] = None
+
+    confidence: float = 0.95
+
+    def stop_reason(self, n_series: int, fitness: list[int], best_known: Optional[int] = None) -> Optional[str]:
+        """ :param n_series: number of series run so far, including the failed ones
+        :param fitness: fitness of the best solution found by every successful series
+        :param best_known: best known solution of the instance
+        :returns: description of the criterion that has been met, None if the experiment should continue """
+        if n_series >= self.max_series:
+            return f'reached maximum of {self.max_series} series'
+        if len(fitness) < max(self.wave_size, MIN_SAMPLE_SIZE):
+            return None
+
+        if self.fitness_ci_width is not None:
+            half_width = mean_ci_half_width(fitness, self.confidence)
+            reference = best_known if best_known is not None else statistics.fmean(fitness)
+            if half_width <= self.fitness_ci_width * reference:
+                return f'fitness CI half-width {half_width:.2f} <= {self.fitness_ci_width:.2%} of {reference:.0f}'
+
+        if self.hit_ratio_ci_width is not None and best_known is not None:
+            hits = sum(1 for value in fitness if value <= best_known)
+            half_width = wilson_half_width(hits, len(fitness), self.confidence)
+            if half_width <= self.hit_ratio_ci_width:
+                return f'BKS hit ratio {hits / len(fitness):.2f} with CI half-width {half_width:.3f}'
+
+        return None
@@ -0,0 +1,121 @@
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Dict, Optional
+from .solver import SolverParams
+
+# Keys of solver config, that differ between series of the same experiment & do not influence the result
+_SERIES_SPECIFIC_CONFIG_KEYS = ('input_file', 'output_dir')
+
+# Series output is considered complete only when solver dumped its run metadata
+_COMPLETION_MARKER = 'run_metadata.json'
+
+
+def _link_or_copy(src: str, dst: str):
+    """ Hard links the file if possible (same filesystem), copies it otherwise. The completion marker is always
+    copied, as it is what decides whether the series is complete (see `completed_series_filter`) """
+    if os.path.basename(src) == _COMPLETION_MARKER:
+        shutil.copy2(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _link_tree(src: Path, dst: Path):
+    shutil.copytree(src, dst, copy_function=_link_or_copy)
+
+
+class ResultStore:
+    """ Content-addressed store of series outputs. Series is identified by hash of the solver binary, the effective
+    solver config, contents of the instance file & the series index, so identical series computed by any batch (e.g.
+    baseline configuration appearing in every comparison) are reused instead of running the solver again.
+
+    Entries are laid out as `<root>/<key[:2]>/<key>` & are immutable once published. Files are hard linked between the
+    store & the batch directories whenever they are on the same filesystem, copied otherwise. As writes to linked file
+    modify the store entry as well, files of series output in the batch directory must not be modified in place;
+    before the series is computed again its output directory has to be detached from the store, see `detach`. """
+
+    def __init__(self, root: Path):
+        self.root: Path = root
+        self.root.mkdir(parents=True, exist_ok=True)
+        # (path, size, mtime) -> digest, so every file is read at most once
+        self._digests: Dict[tuple[str, int, int], str] = {}
+
+    def _file_digest(self, file: Path) -> str:
+        stat = file.stat()
+        memo_key = (str(file.resolve()), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            hasher = hashlib.sha256()
+            with open(file, 'rb') as fd:
+                while chunk := fd.read(1 << 20):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+            self._digests[memo_key] = digest
+        return digest
+
+    def _config_digest(self, config_file: Optional[Path]) -> str:
+        if config_file is None:
+            return ''
+        with open(config_file, 'r') as fd:
+            config = json.load(fd)
+        for key in _SERIES_SPECIFIC_CONFIG_KEYS:
+            config.pop(key, None)
+        return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+    def key_for(self, binary: Path, params: SolverParams, series_id: int) -> str:
+        """ :param series_id: index of the series within its experiment """
+        hasher = hashlib.sha256()
+        for part in (self._file_digest(binary), self._config_digest(params.config_file),
+                     self._file_digest(params.input_file), str(series_id)):
+            hasher.update(part.encode())
+            hasher.update(b'\0')
+        return hasher.hexdigest()
+
+    def entry_dir(self, key: str) -> Path:
+        return self.root.joinpath(key[:2], key)
+
+    def contains(self, key: str) -> bool:
+        return self.entry_dir(key).joinpath(_COMPLETION_MARKER).is_file()
+
+    def restore(self, key: str, output_dir: Path) -> bool:
+        """ Puts stored series output in place of `output_dir`, replacing its current contents.
+
+        :returns: False if there is no such entry in the store """
+        if not self.contains(key):
+            return False
+        if output_dir.exists():
+            shutil.rmtree(output_dir)
+        _link_tree(self.entry_dir(key), output_dir)
+        return True
+
+    @staticmethod
+    def detach(output_dir: Path):
+        """ Replaces files of `output_dir` shared with other directories (store entries) through hard links
+        with their private copies, so they can be rewritten without modifying the store """
+        if not output_dir.is_dir():
+            return
+        for entry in os.scandir(output_dir):
+            if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_nlink > 1:
+                tmp_file = f'{entry.path}.detached'
+                shutil.copy2(entry.path, tmp_file)
+                os.replace(tmp_file, entry.path)
+
+    def store(self, key: str, output_dir: Path):
+        """ Publishes complete series output. Entry is assembled under temporary name & renamed, so other processes
+        (possibly on other nodes) never see it partially written. The first published entry wins. """
+        if self.contains(key) or not output_dir.joinpath(_COMPLETION_MARKER).is_file():
+            return
+        entry_dir = self.entry_dir(key)
+        entry_dir.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = entry_dir.with_name(f'.{key}.{os.getpid()}.tmp')
+        _link_tree(output_dir, tmp_dir)
+        try:
+            os.rename(tmp_dir, entry_dir)
+        except OSError:
+            # Published by other process in the meantime
+            shutil.rmtree(tmp_dir, ignore_errors=True)
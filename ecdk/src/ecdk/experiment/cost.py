@@ -0,0 +1,200 @@
+import heapq
+import statistics
+import polars as pl
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Iterable
+from .model import ExperimentConfig, SolverConfigFile, SolverConfigFileContents
+from data.model import InstanceMetadata
+from core.tools import exp_name_from_input_file
+
+# Solver does not expose its defaults, these are used only when config file does not specify the value.
+# Absolute value does not matter much, as long as it is the same for every task in the batch.
+DEFAULT_N_GEN = 400
+DEFAULT_POP_SIZE = 400
+
+
+@dataclass(frozen=True)
+class TaskCostKey:
+    """ Identifies class of solver runs that are expected to take the same amount of time """
+
+    instance: str
+    n_gen: int
+    pop_size: int
+    solver_type: str
+
+
+@dataclass(frozen=True)
+class TaskDurationRecord:
+    """ Single recorded solver run duration """
+
+    key: TaskCostKey
+    work_units: int
+    duration: float  # seconds
+
+
+class TaskDurationHistory:
+    """ Durations of solver runs recorded in previous batches. Stored as CSV file with single row per series. """
+
+    SCHEMA = {
+        'instance': pl.Utf8,
+        'n_gen': pl.Int64,
+        'pop_size': pl.Int64,
+        'solver_type': pl.Utf8,
+        'work_units': pl.Int64,
+        'duration': pl.Float64,
+    }
+
+    def __init__(self, records: Iterable[TaskDurationRecord] = ()):
+        self._durations: Dict[TaskCostKey, list[float]] = {}
+        self._secs_per_unit: list[float] = []
+        for record in records:
+            self.add(record)
+
+    def add(self, record: TaskDurationRecord):
+        self._durations.setdefault(record.key, []).append(record.duration)
+        if record.work_units > 0:
+            self._secs_per_unit.append(record.duration / record.work_units)
+
+    def mean_duration(self, key: TaskCostKey) -> Optional[float]:
+        durations = self._durations.get(key)
+        if not durations:
+            return None
+        return statistics.fmean(durations)
+
+    def secs_per_unit(self) -> Optional[float]:
+        """ Median of observed time per work unit across all recorded runs. Allows to translate
+        static cost estimate into seconds for runs that have not been observed yet. """
+        if len(self._secs_per_unit) == 0:
+            return None
+        return statistics.median(self._secs_per_unit)
+
+    def is_empty(self) -> bool:
+        return len(self._durations) == 0
+
+    @classmethod
+    def load(cls, history_file: Optional[Path]) -> 'TaskDurationHistory':
+        if history_file is None or not history_file.is_file():
+            return cls()
+
+        df = pl.read_csv(history_file, has_header=True, dtypes=cls.SCHEMA)
+        return cls(
+            TaskDurationRecord(
+                key=TaskCostKey(instance, n_gen, pop_size, solver_type),
+                work_units=work_units,
+                duration=duration
+            )
+            for instance, n_gen, pop_size, solver_type, work_units, duration in df.iter_rows()
+        )
+
+    @staticmethod
+    def append(history_file: Path, records: list[TaskDurationRecord]):
+        """ Appends records to the history file, creating it if necessary """
+        if len(records) == 0:
+            return
+
+        df = pl.DataFrame({
+            'instance': [r.key.instance for r in records],
+            'n_gen': [r.key.n_gen for r in records],
+            'pop_size': [r.key.pop_size for r in records],
+            'solver_type': [r.key.solver_type for r in records],
+            'work_units': [r.work_units for r in records],
+            'duration': [r.duration for r in records],
+        }, schema=TaskDurationHistory.SCHEMA)
+
+        write_header = not history_file.is_file()
+        history_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(history_file, 'a') as file:
+            df.write_csv(file, include_header=write_header)
+
+
+class TaskCostModel:
+    """ Predicts how long single solver run (series) of given experiment will take.
+
+    Recorded mean duration is used when this exact instance & configuration has been run before. Otherwise static
+    estimate `jobs * machines * n_gen * pop_size` is used, translated into seconds with time-per-unit observed in
+    the history (if there is any). Estimates are in seconds whenever the history is not empty, otherwise they are
+    only comparable with each other.
+    """
+
+    def __init__(self,
+                 metadata_store: Optional[Dict[str, InstanceMetadata]] = None,
+                 history: Optional[TaskDurationHistory] = None):
+        self.metadata_store: Dict[str, InstanceMetadata] = metadata_store or {}
+        self.history: TaskDurationHistory = history or TaskDurationHistory()
+        self._config_cache: Dict[Optional[Path], Optional[SolverConfigFileContents]] = {}
+        self._size_cache: Dict[Path, tuple[int, int]] = {}
+
+    def key_for(self, config: ExperimentConfig) -> TaskCostKey:
+        contents = self._config_contents(config.config_file)
+        n_gen, pop_size, solver_type = DEFAULT_N_GEN, DEFAULT_POP_SIZE, 'default'
+        if contents is not None:
+            n_gen = contents.n_gen or DEFAULT_N_GEN
+            pop_size = contents.pop_size or DEFAULT_POP_SIZE
+            solver_type = contents.solver_type or solver_type
+        return TaskCostKey(exp_name_from_input_file(config.input_file), n_gen, pop_size, solver_type)
+
+    def work_units(self, config: ExperimentConfig) -> int:
+        key = self.key_for(config)
+        jobs, machines = self._instance_size(config)
+        return jobs * machines * key.n_gen * key.pop_size
+
+    def estimate(self, config: ExperimentConfig) -> float:
+        """ :returns: predicted duration of single series of given experiment """
+        recorded = self.history.mean_duration(self.key_for(config))
+        if recorded is not None:
+            return recorded
+
+        secs_per_unit = self.history.secs_per_unit()
+        units = self.work_units(config)
+        return units * secs_per_unit if secs_per_unit is not None else float(units)
+
+    def record(self, config: ExperimentConfig, duration: float) -> TaskDurationRecord:
+        return TaskDurationRecord(self.key_for(config), self.work_units(config), duration)
+
+    def _config_contents(self, config_file: Optional[Path]) -> Optional[SolverConfigFileContents]:
+        if config_file is None:
+            return None
+        if config_file not in self._config_cache:
+            self._config_cache[config_file] = SolverConfigFile(config_file).contents
+        return self._config_cache[config_file]
+
+    def _instance_size(self, config: ExperimentConfig) -> tuple[int, int]:
+        metadata = self.metadata_store.get(exp_name_from_input_file(config.input_file))
+        if metadata is not None:
+            return metadata.jobs, metadata.machines
+
+        # Fallback to the header of instance file: `n_jobs n_machines`
+        if config.input_file not in self._size_cache:
+            with open(config.input_file, 'r') as file:
+                jobs, machines = map(int, file.readline().split()[:2])
+            self._size_cache[config.input_file] = (jobs, machines)
+        return self._size_cache[config.input_file]
+
+
+def order_longest_first(costs: list[float]) -> list[int]:
+    """ Longest-processing-time-first order of tasks. Ties are resolved by original position, so the
+    order is deterministic.
+
+    :param costs: predicted cost of each task
+    :returns: indices of tasks in order they should be scheduled in """
+    return sorted(range(len(costs)), key=lambda i: (-costs[i], i))
+
+
+def partition_longest_first(costs: list[float], n_shards: int) -> list[list[int]]:
+    """ Splits tasks into `n_shards` groups of similar total cost, with greedy longest-processing-time-first
+    algorithm: tasks are taken from the most expensive one & assigned to the shard with the lowest total cost so far.
+    Ties are resolved by position (of the task, then of the shard), so the partition depends only on the costs &
+    is the same in every process computing it.
+
+    :param costs: predicted cost of each task
+    :param n_shards: number of groups
+    :returns: indices of tasks assigned to each shard, in order they should be scheduled in """
+    assert n_shards > 0, f"Number of shards must be > 0, received {n_shards}"
+    shards: list[list[int]] = [[] for _ in range(n_shards)]
+    loads = [(0.0, shard_id) for shard_id in range(n_shards)]
+    for task_id in order_longest_first(costs):
+        load, shard_id = heapq.heappop(loads)
+        shards[shard_id].append(task_id)
+        heapq.heappush(loads, (load + costs[task_id], shard_id))
+    return shards
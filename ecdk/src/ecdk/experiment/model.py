@@ -3,6 +3,8 @@ from pathlib import Path
 from typing import Optional, Dict, TypeAlias
 from data.model import InstanceMetadata
 from core.version import Version
+from core.usage import ResourceUsage
+from .sweep import ConfigSweep
 import core.util
 from polars import DataFrame
 import datetime as dt
@@ -72,8 +74,9 @@ class SeriesOutputMetadata:
     """ Solver produces file (right now named `run_metadata.json`) with summary information about
     results of single run (single series). This structure models content of this file """
 
-    solution_string: str
-    hash: str
+    # None for series stopped before completion, see `early_stopped`
+    solution_string: Optional[str]
+    hash: Optional[str]
     fitness: int
     generation_count: int
     total_time: int
@@ -89,6 +92,10 @@ class SeriesOutputMetadata:
     start_timestamp: Optional[str]
     end_timestamp: Optional[str]
 
+    # Reason the solver has been stopped for before completing all the generations. Metadata of such series is not dumped
+    # by the solver, but reconstructed from its event data, with the last new best solution as the result.
+    early_stopped: Optional[str] = None
+
     @classmethod
     def from_dict(cls, md: Dict):
         return cls(
@@ -105,8 +112,12 @@ class SeriesOutputMetadata:
             crossover_involvement_min=md.get("crossover_involvement_min"),
             start_timestamp=md.get("start_timestamp"),
             end_timestamp=md.get("end_timestamp"),
+            early_stopped=md.get("early_stopped"),
         )
 
+    def is_truncated(self) -> bool:
+        return self.early_stopped is not None
+
 
 @dataclass(frozen=True)
 class SeriesOutputData:
@@ -143,6 +154,18 @@ class SolverParams:
     config_file: Optional[Path]
     stdout_file: Optional[Path]
 
+    def as_dict(self) -> dict:
+        return {
+            "input_file": str(self.input_file) if self.input_file is not None else None,
+            "output_dir": str(self.output_dir) if self.output_dir is not None else None,
+            "config_file": str(self.config_file) if self.config_file is not None else None,
+            "stdout_file": str(self.stdout_file) if self.stdout_file is not None else None,
+        }
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'SolverParams':
+        return SolverParams(**{key: Path(value) if value is not None else None for key, value in d.items()})
+
 
 @dataclass
 class SolverRunMetadata:
@@ -154,9 +177,33 @@ class SolverRunMetadata:
     duration: dt.timedelta
     status: int  # Executing process return code
 
+    # Resources consumed by the solver process. Not available on all platforms.
+    resource_usage: Optional[ResourceUsage] = None
+
+    # Number of times the solver has been started for the series, retries included
+    attempts: int = 1
+
+    # Whether the solver process has been terminated due to exceeding the time limit
+    timed_out: bool = False
+
+    # Whether the result comes from speculative replica of the series
+    speculative: bool = False
+
+    # Cpus the solver process has been pinned to, None if it was not pinned
+    cpus: Optional[tuple[int, ...]] = None
+
+    # Reason the solver has been stopped for before completing all the generations, because it stopped improving
+    # the solution. Such solver does not dump its run metadata, it is written by the runtime instead
+    # (see `write_truncated_series_metadata`).
+    early_stopped: Optional[str] = None
+
+    # Whether the output has been restored from the result store instead of running the solver.
+    # None of the other values describe actual solver process then.
+    restored: bool = False
+
     def is_ok(self) -> bool:
-        """ Whether the computation completed without any errors """
-        return self.status == 0
+        """ Whether the computation completed without any errors. Series stopped early has usable (truncated) result. """
+        return self.status == 0 or self.early_stopped is not None
 
 
 @dataclass
@@ -257,10 +304,12 @@ class ExperimentConfig:
 
     @classmethod
     def from_dict(cls, d: dict) -> 'ExperimentConfig':
+        # Missing config file is serialized as 'None' string
+        config_file = d.get('config_file')
         return ExperimentConfig(
             input_file=Path(d['input_file']),
             output_dir=Path(d['output_dir']),
-            config_file=Path(d.get('config_file')),
+            config_file=Path(config_file) if config_file not in (None, 'None') else None,
             n_series=int(d['n_series']),
         )
 
@@ -340,6 +389,9 @@ class ExperimentBatch:
     solver_info: Optional[SolverExecutableInfo] = None
     ecdk_info: Optional[EcdkInfo] = None
 
+    # Configurations the instances are run with, when more than single one is used
+    sweep: Optional[ConfigSweep] = None
+
     def as_dict(self) -> dict:
         result = {
             "output_dir": str(self.output_dir),
@@ -358,6 +410,9 @@ class ExperimentBatch:
         if self.ecdk_info is not None:
             result["ecdk_info"] = self.ecdk_info.as_dict()
 
+        if self.sweep is not None:
+            result["sweep"] = self.sweep.as_dict()
+
         return result
 
 
@@ -0,0 +1,186 @@
+import math
+import statistics
+import dataclasses
+import datetime as dt
+from dataclasses import dataclass
+from typing import Optional
+from .model import ExperimentConfig, ExperimentResult
+from .runner import LocalExperimentRunner, fitness_of_series
+from .solver import SolverParams, SolverResult
+
+# Critical values of the Studentized range statistic divided by sqrt(2), for alpha = 0.05 & number of compared
+# configurations 2..10, used by the Nemenyi post-hoc test (Demsar, 2006)
+NEMENYI_Q_05 = {2: 1.960, 3: 2.344, 4: 2.569, 5: 2.728, 6: 2.850, 7: 2.949, 8: 3.031, 9: 3.102, 10: 3.164}
+RACE_ALPHA = 0.05
+
+
+def ranks_within_block(values: list[float]) -> list[float]:
+    """ Ranks of the values, 1 being the lowest one. Tied values get the average of ranks they span. """
+    order = sorted(range(len(values)), key=lambda i: values[i])
+    ranks = [0.0] * len(values)
+    start = 0
+    while start < len(order):
+        end = start
+        while end + 1 < len(order) and values[order[end + 1]] == values[order[start]]:
+            end += 1
+        for i in order[start:end + 1]:
+            ranks[i] = (start + end) / 2 + 1
+        start = end + 1
+    return ranks
+
+
+def _chi2_sf(x: float, df: int) -> float:
+    """ Survival function of chi-squared distribution, Wilson-Hilferty approximation """
+    if x <= 0:
+        return 1.0
+    h = 2 / (9 * df)
+    z = ((x / df) ** (1 / 3) - (1 - h)) / math.sqrt(h)
+    return 1 - statistics.NormalDist().cdf(z)
+
+
+def mean_ranks(blocks: list[list[float]]) -> list[float]:
+    """ :param blocks: results of every configuration (columns) on every block (rows), lower is better """
+    ranks = [ranks_within_block(block) for block in blocks]
+    return [statistics.fmean(column) for column in zip(*ranks)]
+
+
+def friedman_test(blocks: list[list[float]]) -> float:
+    """ Friedman test of the hypothesis, that all the configurations perform equally well.
+
+    :param blocks: results of every configuration (columns) on every block (rows), lower is better
+    :returns: p-value """
+    n, k = len(blocks), len(blocks[0])
+    assert k >= 2 and n >= 1, "At least two configurations & one block are required"
+    ranks = mean_ranks(blocks)
+    statistic = 12 * n / (k * (k + 1)) * (sum(r ** 2 for r in ranks) - k * (k + 1) ** 2 / 4)
+    return _chi2_sf(statistic, k - 1)
+
+
+def nemenyi_critical_difference(k: int, n_blocks: int) -> float:
+    """ Minimal difference of mean ranks of two configurations, for which they are considered different """
+    assert k in NEMENYI_Q_05, f"Nemenyi test is supported for 2..{max(NEMENYI_Q_05)} configurations, received {k}"
+    return NEMENYI_Q_05[k] * math.sqrt(k * (k + 1) / (6 * n_blocks))
+
+
+@dataclass
+class RaceRound:
+    """ State of the race after single round """
+
+    index: int
+
+    # Number of blocks (instance x series) the statistics were computed on
+    n_blocks: int
+
+    # Mean rank of every configuration still in the race at the beginning of the round
+    mean_ranks: dict[str, float]
+
+    # Friedman test p-value, None if the test has not been run in this round
+    p_value: Optional[float]
+
+    # Configurations eliminated after this round
+    eliminated: list[str]
+
+    def as_dict(self) -> dict:
+        return dataclasses.asdict(self)
+
+
+class ConfigRace:
+    """ Races solver configurations against each other on a set of instances (F-race). In every round one series of every
+    configuration still in the race is run on every instance. Afterwards the configurations are ranked on every
+    (instance, series) block by the fitness found, and once the Friedman test rejects the hypothesis that all of them
+    perform equally, the configurations worse than the best one according to the Nemenyi post-hoc test are eliminated,
+    so no more compute is spent on them. """
+
+    def __init__(self,
+                 runner: LocalExperimentRunner,
+                 candidates: dict[str, list[ExperimentConfig]],
+                 min_rounds: int = 2):
+        """ :param runner: runs the series of every round
+        :param candidates: experiments of every configuration, in the same order of instances for every configuration
+        :param min_rounds: number of rounds before the first elimination """
+        n_instances = {len(configs) for configs in candidates.values()}
+        assert len(n_instances) == 1, "Every configuration must be run on the same instances"
+        assert 2 <= len(candidates) <= max(NEMENYI_Q_05), f"Between 2 and {max(NEMENYI_Q_05)} configurations can be raced, received {len(candidates)}"
+        self.runner: LocalExperimentRunner = runner
+        self.candidates: dict[str, list[ExperimentConfig]] = candidates
+        self.min_rounds: int = min_rounds
+        self.alive: list[str] = list(candidates.keys())
+        self.rounds: list[RaceRound] = []
+        # Fitness of every series, name -> instance index -> series id; inf for failed series
+        self.fitness: dict[str, list[list[float]]] = {name: [[] for _ in configs] for name, configs in candidates.items()}
+        self.results: dict[str, list[list[Optional[SolverResult]]]] = {name: [[] for _ in configs] for name, configs in candidates.items()}
+
+    def __run_round(self, round_index: int, process_limit: int):
+        configs = [dataclasses.replace(cfg, n_series=round_index + 1) for name in self.alive for cfg in self.candidates[name]]
+        owners = [(name, i) for name in self.alive for i in range(len(self.candidates[name]))]
+
+        def is_previous_round(params: SolverParams) -> bool:
+            return not params.output_dir.name.endswith(f'-series-{round_index}')
+
+        for name, instance_results in self.results.items():
+            if name in self.alive:
+                for series in instance_results:
+                    series.append(None)
+        # Every config has exactly one series run in this round, the others are skipped
+        for task_id, solver_result in self.runner.iter_multiprocess(configs, process_limit, is_previous_round):
+            name, i = owners[task_id // (round_index + 1)]
+            self.results[name][i][round_index] = solver_result
+
+        for name in self.alive:
+            for i, series in enumerate(self.results[name]):
+                result = series[round_index]
+                ok = result is not None and result.series_output is not None
+                self.fitness[name][i].append(fitness_of_series(result.series_output) if ok else math.inf)
+
+    def __blocks(self) -> list[list[float]]:
+        n_rounds = len(self.rounds) + 1
+        n_instances = len(next(iter(self.candidates.values())))
+        return [
+            [self.fitness[name][i][r] for name in self.alive]
+            for i in range(n_instances) for r in range(n_rounds)
+        ]
+
+    def __eliminate(self, round_index: int) -> RaceRound:
+        blocks = self.__blocks()
+        ranks = dict(zip(self.alive, mean_ranks(blocks)))
+        race_round = RaceRound(round_index, len(blocks), ranks, None, [])
+        if round_index + 1 < self.min_rounds or len(self.alive) < 2:
+            return race_round
+
+        race_round.p_value = friedman_test(blocks)
+        if race_round.p_value >= RACE_ALPHA:
+            return race_round
+
+        critical_difference = nemenyi_critical_difference(len(self.alive), len(blocks))
+        best = min(ranks.values())
+        race_round.eliminated = [name for name in self.alive if ranks[name] - best > critical_difference]
+        self.alive = [name for name in self.alive if name not in race_round.eliminated]
+        return race_round
+
+    def run(self, max_rounds: int, process_limit: int = 1) -> list[RaceRound]:
+        """ Runs the race until single configuration is left or `max_rounds` rounds are run.
+
+        :returns: summary of every round """
+        for round_index in range(max_rounds):
+            self.__run_round(round_index, process_limit)
+            race_round = self.__eliminate(round_index)
+            self.rounds.append(race_round)
+
+            ranks = ', '.join(f'{name}: {rank:.2f}' for name, rank in sorted(race_round.mean_ranks.items(), key=lambda kv: kv[1]))
+            p_value = f'{race_round.p_value:.4f}' if race_round.p_value is not None else '-'
+            print(f"[{dt.datetime.now()}][RACE ] Round {round_index + 1}: mean ranks {ranks}; Friedman p-value {p_value}")
+            if len(race_round.eliminated) > 0:
+                print(f"[{dt.datetime.now()}][RACE ] Eliminated {', '.join(race_round.eliminated)}")
+            if len(self.alive) < 2:
+                break
+        return self.rounds
+
+    def experiment_results(self, name: str) -> list[ExperimentResult]:
+        """ Results of every experiment of the configuration, with as many series as the rounds it took part in """
+        return [
+            ExperimentResult(
+                series_outputs=[res.series_output if res is not None else None for res in series],
+                metadata=[res.run_metadata if res is not None else None for res in series]
+            )
+            for series in self.results[name]
+        ]
@@ -1,12 +1,39 @@
+import sys
+import json
+import time
+import shutil
+import dataclasses
 import itertools as it
-from typing import Generator, Iterable
+import datetime as dt
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generator, Iterable, Optional, Callable, Dict
 from .solver import SolverProxy, SolverParams, SolverRunMetadata, SolverResult
 from .model import ExperimentResult, ExperimentConfig, SeriesOutput, ExperimentBatch
+from .cost import TaskCostModel, TaskDurationHistory, TaskDurationRecord, order_longest_first, partition_longest_first
+from .cache import ResultStore
+from .adaptive import SeriesCountPolicy
+from .accounting import accounting_df_from_results, write_accounting_table, print_accounting_report
 from core.util import iter_batched
-from core.fs import output_dir_for_series, solver_logfile_for_series
-from core.env import ArrayJobSpec, input_range_from_jobspec
-from core.scheduler import Task, MultiProcessTaskRunner
-from core.series import load_series_output
+from core.fs import (
+    output_dir_for_series,
+    solver_logfile_for_series,
+    accounting_file_for_batch,
+    status_file_for_batch,
+    solver_desc_file_for_batch,
+    event_file_for_series
+)
+from core.env import ArrayJobSpec
+from core.scheduler import Task, CompletedTask, MultiProcessTaskRunner, RunInfo, SchedulerObserver, LoggingObserver, ObserverGroup
+from core.progress import ProgressTracker
+from core.capture import OutputSink, LogFileSink, CompressedLogSink, SolverDescCapture
+from core.convergence import ConvergenceMonitor, StagnationRule
+from core.concurrency import ConcurrencyController, available_cpus
+from core.placement import CorePlacement
+from core.journal import RunJournal
+from core.fsqueue import FsTaskQueue, LeaseKeeper, Lease
+from core.series import load_series_output, write_truncated_series_metadata
+from data.model import InstanceMetadata, Event
 from context import Context
 from pprint import pprint
 
@@ -22,6 +49,83 @@ def solver_params_from_exp_config_collection(config_coll: Iterable[ExperimentCon
     return it.chain.from_iterable(solver_params_from_exp_config(config) for config in config_coll)
 
 
+def fitness_of_series(series_output: SeriesOutput) -> int:
+    """ Fitness of the best solution found, read from run metadata without loading the rest of the series data """
+    with open(series_output.files.run_metadata_file, 'r') as file:
+        return json.load(file)['fitness']
+
+
+def speculative_output_dir_for_series(series_dir: Path) -> Path:
+    """ Hidden sibling of the series directory, used as output of speculative replica of the series """
+    return series_dir.parent.joinpath(f'.{series_dir.name}-spec')
+
+
+def speculative_params(params: SolverParams) -> SolverParams:
+    """ Parameters of the series replica, with all the outputs redirected to separate directory, so the replica
+    does not interfere with the original solver process """
+    output_dir = speculative_output_dir_for_series(params.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stdout_file = output_dir.joinpath(params.stdout_file.name) if params.stdout_file is not None else None
+    return SolverParams(params.input_file, output_dir, params.config_file, stdout_file)
+
+
+@dataclass
+class TaskExecutionPolicy:
+    """ Limits, fault tolerance & output settings for series run in multiprocess mode. See `MultiProcessTaskRunner.run_iter`. """
+
+    # Wall-clock limit for single series in seconds
+    task_timeout: Optional[float] = None
+
+    # Wall-clock limit for single series as multiple of its estimated duration. Applied only when the cost
+    # model can estimate the duration in seconds (there is recorded history), ignored if `task_timeout` is set.
+    timeout_factor: Optional[float] = None
+
+    # How many times failed series is restarted. Series that exceeded the time limit are not restarted.
+    retry_limit: int = 0
+
+    # Ratio of running time to estimated duration, after which the series is run once again in parallel,
+    # if there are idle cores. None disables speculative execution.
+    speculate_after: Optional[float] = None
+
+    # Point in time all the series must complete before, e.g. end of the Slurm allocation. Series that are predicted
+    # not to complete in time are not started, and the ones still running are terminated, so the batch can be resumed.
+    deadline: Optional[dt.datetime] = None
+
+    # Time in seconds reserved before the deadline for terminating the solvers & saving the results
+    deadline_margin: float = 60
+
+    # Whether solver output should be saved gzip-compressed (as `stdout.log.gz`)
+    compress_stdout: bool = False
+
+    # Upper bound for size of solver output (uncompressed) saved for single series in bytes, the rest is dropped
+    stdout_size_cap: Optional[int] = None
+
+    # Criteria of stopping series that stopped improving their result before they complete. None disables the monitoring.
+    stagnation: Optional[StagnationRule] = None
+
+    def captures_stdout(self) -> bool:
+        return self.compress_stdout or self.stdout_size_cap is not None
+
+    def effective_deadline(self) -> Optional[dt.datetime]:
+        if self.deadline is None:
+            return None
+        return self.deadline - dt.timedelta(seconds=self.deadline_margin)
+
+
+def completed_series_filter(journal: RunJournal) -> Callable[[SolverParams], bool]:
+    """ Predicate telling whether given series has been completed by previous (possibly interrupted) run of the batch.
+    Series is considered completed when solver dumped its run metadata & the journal does not report a failure for it. """
+    last_states = journal.last_states()
+
+    def is_completed(params: SolverParams) -> bool:
+        entry = last_states.get(journal.key_for(params.output_dir))
+        if entry is not None and entry.state == RunJournal.FAILED:
+            return False
+        return params.output_dir.joinpath('run_metadata.json').is_file()
+
+    return is_completed
+
+
 # TODO
 # Reorganise this. Runner (runtime) should be responsible for taking input (experiment configurations), converting them into
 # appropriate tasks (for given scheduler) and passing these tasks down to owned scheduler.
@@ -31,29 +135,170 @@ def solver_params_from_exp_config_collection(config_coll: Iterable[ExperimentCon
 # LocalExperimentRunner postprocessing might be run in the same process -- this is not ideal, actually I would like it to be run in separate process...
 
 class LocalExperimentBatchRunner:
-    def __init__(self, solver: SolverProxy, configs: list[ExperimentConfig]):
+    def __init__(self,
+                 solver: SolverProxy,
+                 configs: list[ExperimentConfig],
+                 cost_model: Optional[TaskCostModel] = None,
+                 history_file: Optional[Path] = None,
+                 batch_dir: Optional[Path] = None,
+                 journal: Optional[RunJournal] = None,
+                 skip: Optional[Callable[[SolverParams], bool]] = None,
+                 policy: Optional[TaskExecutionPolicy] = None,
+                 controller: Optional[ConcurrencyController] = None,
+                 placement: Optional[CorePlacement] = None,
+                 progress: bool = False,
+                 result_store: Optional[ResultStore] = None,
+                 series_policy: Optional[SeriesCountPolicy] = None,
+                 best_known: Optional[list[Optional[int]]] = None):
+        """ :param batch_dir: if present, per-series resource accounting table & live status of the batch are saved there
+        :param journal: see `LocalExperimentRunner`
+        :param skip: predicate telling which series should not be run, e.g. because they were completed by previous run
+        :param policy: see `LocalExperimentRunner`
+        :param controller: see `LocalExperimentRunner`
+        :param placement: see `LocalExperimentRunner`
+        :param progress: see `LocalExperimentRunner`
+        :param result_store: see `LocalExperimentRunner`
+        :param series_policy: if present, number of series of every experiment is decided at runtime, see `LocalExperimentRunner.run_adaptive`
+        :param best_known: see `LocalExperimentRunner.run_adaptive` """
         self.solver: SolverProxy = solver
         self.configs: list[ExperimentConfig] = configs
-        self.runner: LocalExperimentRunner = LocalExperimentRunner(self.solver)
+        self.batch_dir: Optional[Path] = batch_dir
+        self.skip: Optional[Callable[[SolverParams], bool]] = skip
+        self.series_policy: Optional[SeriesCountPolicy] = series_policy
+        self.best_known: Optional[list[Optional[int]]] = best_known
+        self.runner: LocalExperimentRunner = LocalExperimentRunner(self.solver, cost_model, history_file, journal, policy,
+                                                                   controller, placement, batch_dir, progress, result_store)
 
     def run(self, process_limit: int = 1) -> list[ExperimentResult]:
         assert process_limit >= 1, "Process limit must be >= 0"
-        if process_limit == 1:
+        # Journaled runs go through the scheduler even for single process, as it records the state of each series
+        if process_limit == 1 and self.runner.journal is None and self.skip is None and self.runner.policy is None \
+                and self.runner.controller is None and self.runner.placement is None and self.runner.result_store is None \
+                and self.series_policy is None:
             return [self.runner.run(desc) for desc in self.configs]
+
+        start_time = dt.datetime.now()
+        if self.series_policy is not None:
+            results = self.runner.run_adaptive(self.configs, self.series_policy, process_limit, self.best_known, self.skip)
+            self.configs = [dataclasses.replace(cfg, n_series=result.n_series()) for cfg, result in zip(self.configs, results)]
         else:
-            return self.runner.run_multiprocess(self.configs, process_limit)
+            results = self.runner.run_multiprocess(self.configs, process_limit, self.skip)
+        batch_duration = dt.datetime.now() - start_time
+
+        accounting_df = accounting_df_from_results(self.configs, results)
+        print_accounting_report(accounting_df, batch_duration, process_limit)
+        if self.batch_dir is not None:
+            write_accounting_table(accounting_df, accounting_file_for_batch(self.batch_dir))
+        return results
 
 
 class LocalExperimentRunner:
-    def __init__(self, solver: SolverProxy):
+    def __init__(self,
+                 solver: SolverProxy,
+                 cost_model: Optional[TaskCostModel] = None,
+                 history_file: Optional[Path] = None,
+                 journal: Optional[RunJournal] = None,
+                 policy: Optional[TaskExecutionPolicy] = None,
+                 controller: Optional[ConcurrencyController] = None,
+                 placement: Optional[CorePlacement] = None,
+                 batch_dir: Optional[Path] = None,
+                 progress: bool = False,
+                 result_store: Optional[ResultStore] = None):
+        """ :param cost_model: if present, series are scheduled longest-first according to its estimates
+        :param history_file: if present, durations of successful series are appended to it after each multiprocess run,
+            so the cost model can use them in subsequent batches
+        :param journal: if present, start & completion of every series run in multiprocess mode is recorded there
+        :param policy: time limits, retries & speculative execution of series run in multiprocess mode
+        :param controller: if present, it decides the number of simultaneously running solver processes in multiprocess mode
+            instead of `process_limit`
+        :param placement: if present, every solver process run in multiprocess mode is pinned to dedicated cpu set
+        :param batch_dir: if present, progress of multiprocess run is periodically saved there (see `ProgressTracker`),
+            together with the solver description extracted from the solver output, in case the output is captured
+        :param progress: whether progress of multiprocess run should be reported as single status line, instead of logging
+            every series
+        :param result_store: if present, series of multiprocess run that have already been computed are restored from it
+            instead of running the solver, and successfully computed series are published there """
         self.solver: SolverProxy = solver
-
-    def _task_from_params(self, task_id: int, params: SolverParams) -> Task:
-        return Task(
+        self.cost_model: Optional[TaskCostModel] = cost_model
+        self.history_file: Optional[Path] = history_file
+        self.journal: Optional[RunJournal] = journal
+        self.policy: Optional[TaskExecutionPolicy] = policy
+        self.controller: Optional[ConcurrencyController] = controller
+        self.placement: Optional[CorePlacement] = placement
+        self.batch_dir: Optional[Path] = batch_dir
+        self.progress: bool = progress
+        self.result_store: Optional[ResultStore] = result_store
+
+    def _estimate_in_seconds(self, config: ExperimentConfig) -> Optional[float]:
+        # Without any history the estimates are not expressed in seconds
+        if self.cost_model is None or self.cost_model.history.is_empty():
+            return None
+        return self.cost_model.estimate(config)
+
+    def _task_from_params(self, task_id: int, params: SolverParams, config: Optional[ExperimentConfig] = None) -> Task:
+        task = Task(
             id=task_id,
             process_args=self.solver.exec_cmd_from_params(params),
             stdout_file=params.stdout_file
         )
+        if self.policy is None or config is None:
+            return task
+
+        expected_duration = self._estimate_in_seconds(config)
+        timeout = self.policy.task_timeout
+        if timeout is None and self.policy.timeout_factor is not None and expected_duration is not None:
+            timeout = self.policy.timeout_factor * expected_duration
+
+        clone = None
+        if self.policy.speculate_after is not None:
+            clone = lambda: self._task_from_params(task_id, speculative_params(params), config)  # noqa: E731
+
+        stdout_sink = None
+        if self.policy.captures_stdout() and params.stdout_file is not None:
+            stdout_sink = self._stdout_sink_fn(params.stdout_file)
+
+        progress_file = None
+        if self.policy.stagnation is not None:
+            progress_file = event_file_for_series(params.output_dir, Event.NEW_BEST)
+
+        return task._replace(timeout=timeout, expected_duration=expected_duration, clone=clone, stdout_sink=stdout_sink,
+                             progress_file=progress_file)
+
+    def _stdout_sink_fn(self, stdout_file: Path) -> Callable[[], OutputSink]:
+        if self.policy.compress_stdout:
+            return lambda: CompressedLogSink(stdout_file.with_name(stdout_file.name + '.gz'), self.policy.stdout_size_cap)
+        return lambda: LogFileSink(stdout_file, self.policy.stdout_size_cap)
+
+    def _with_solver_desc_capture(self, tasks: Iterable[Task]) -> Generator[Task, None, None]:
+        """ Extracts the solver description from output of the first series that prints it, so it does not have to be
+        parsed from the logs later """
+        desc_file = solver_desc_file_for_batch(self.batch_dir)
+        captured = desc_file.is_file()
+
+        def on_captured(desc: str):
+            nonlocal captured
+            if not captured:
+                desc_file.write_text(desc)
+                captured = True
+
+        for task in tasks:
+            if captured or task.stdout_sink is None:
+                yield task
+                continue
+            sink_fn = task.stdout_sink
+            yield task._replace(stdout_sink=lambda sink_fn=sink_fn: sink_fn() if captured else SolverDescCapture(sink_fn(), on_captured))
+
+    def _finalize_speculative_output(self, params: SolverParams, compl_task: CompletedTask):
+        """ Moves output of the replica that won in place of the original series output, or removes the output
+        of the replica that lost """
+        spec_dir = speculative_output_dir_for_series(params.output_dir)
+        if not spec_dir.is_dir():
+            return
+        if compl_task.speculative and compl_task.is_ok():
+            shutil.rmtree(params.output_dir)
+            spec_dir.rename(params.output_dir)
+        else:
+            shutil.rmtree(spec_dir)
 
     def run(self, config: ExperimentConfig) -> ExperimentResult:
         run_metadata: list[SolverRunMetadata] = []
@@ -64,29 +309,149 @@ class LocalExperimentRunner:
             run_metadata.append(solver_result.run_metadata)
         return ExperimentResult(series_outputs=series_outputs, metadata=run_metadata)
 
-    def run_multiprocess(self, configs: Iterable[ExperimentConfig], process_limit: int = 1) -> list[ExperimentResult]:
-        params_iter = solver_params_from_exp_config_collection(configs)
+    def _finalize_early_stopped_output(self, params: SolverParams, compl_task: CompletedTask) -> CompletedTask:
+        """ Dumps run metadata of series stopped by the convergence monitor, so its truncated result is used
+        like any other. Series, that has not reported any solution until it has been stopped, is considered failed. """
+        if write_truncated_series_metadata(params.output_dir, compl_task.early_stopped, int(compl_task.duration.total_seconds() * 1000)):
+            return compl_task
+        print(f"[{dt.datetime.now()}][WARN] Series {params.output_dir} has been stopped before reporting any solution")
+        return compl_task._replace(early_stopped=None)
+
+    def _solver_result_from_completed_task(self, params: SolverParams, compl_task: CompletedTask) -> SolverResult:
+        # Failed (e.g. killed) solver might have left incomplete output
+        series_output = load_series_output(params.output_dir, lazy=True) if compl_task.is_ok() else None
+        return SolverResult(
+            series_output=series_output,
+            run_metadata=SolverRunMetadata(  # Propagate more information from completed taks here
+                duration=compl_task.duration,
+                status=compl_task.return_code,
+                resource_usage=compl_task.rusage,
+                attempts=compl_task.attempts,
+                timed_out=compl_task.timed_out,
+                speculative=compl_task.speculative,
+                cpus=compl_task.cpus,
+                early_stopped=compl_task.early_stopped
+            )
+        )
 
-        # # TODO: Running should be done by actual scheduler, not by SolverProxy, this is not right.
-        # solver_results = self.solver.run_multiprocess(params_iter, process_limit)
+    def _observer(self, order: Iterable[int], param_configs: list[ExperimentConfig]) -> SchedulerObserver:
+        tracker = ProgressTracker(
+            groups={task_id: param_configs[task_id].output_dir.name for task_id in order},
+            expected_durations={task_id: self._estimate_in_seconds(param_configs[task_id]) for task_id in order},
+            status_file=status_file_for_batch(self.batch_dir) if self.batch_dir is not None else None,
+            stream=sys.stdout if self.progress else None
+        )
+        return tracker if self.progress else ObserverGroup(LoggingObserver(), tracker)
+
+    def _on_start_fn(self, params: list[SolverParams]) -> Optional[Callable[[Task], None]]:
+        if self.journal is None and self.result_store is None:
+            return None
+
+        def on_start(task: Task):
+            if self.result_store is not None:
+                # Output of the series might share files with the store (restored or published by previous run)
+                ResultStore.detach(params[task.id].output_dir)
+            if self.journal is not None:
+                self.journal.record(params[task.id].output_dir, RunJournal.STARTED)
+        return on_start
+
+    def iter_multiprocess(self,
+                          configs: Iterable[ExperimentConfig],
+                          process_limit: int = 1,
+                          skip: Optional[Callable[[SolverParams], bool]] = None) -> Generator[tuple[int, SolverResult], None, None]:
+        """ Runs all series of given experiments on pool of `process_limit` processes & yields result of every series
+        as soon as its solver process exits, so it can be processed while other series are still being computed.
+
+        :param configs: experiments to run
+        :param process_limit: upper bound for number of simultaneously running solver processes
+        :param skip: predicate telling which series should not be run
+        :returns: generator of (task id, result) pairs in order of completion. Task id is the index of given series
+            in the order defined by `solver_params_from_exp_config_collection`. """
+
+        configs = list(configs)
+        params: list[SolverParams] = list(solver_params_from_exp_config_collection(configs))
+        param_configs: list[ExperimentConfig] = list(it.chain.from_iterable(it.repeat(cfg, cfg.n_series) for cfg in configs))
+
+        order = range(len(params))
+        if self.cost_model is not None:
+            # Longest-processing-time-first, so no long series is left alone at the end of the batch
+            order = order_longest_first([self.cost_model.estimate(cfg) for cfg in param_configs])
+
+        if skip is not None:
+            order = [task_id for task_id in order if not skip(params[task_id])]
+
+        store_keys: Dict[int, str] = {}
+        if self.result_store is not None:
+            series_ids = list(it.chain.from_iterable(range(cfg.n_series) for cfg in configs))
+            store_keys = {
+                task_id: self.result_store.key_for(self.solver.binary, params[task_id], series_ids[task_id]) for task_id in order
+            }
+            restored = [task_id for task_id in order if self.result_store.restore(store_keys[task_id], params[task_id].output_dir)]
+            if len(restored) > 0:
+                print(f"Restored {len(restored)} series from result store {self.result_store.root}")
+            for task_id in restored:
+                if self.journal is not None:
+                    self.journal.record(params[task_id].output_dir, RunJournal.COMPLETED, 0)
+                yield task_id, SolverResult(series_output=load_series_output(params[task_id].output_dir, lazy=True),
+                                            run_metadata=SolverRunMetadata(duration=dt.timedelta(0), status=0, restored=True))
+            restored = set(restored)
+            order = [task_id for task_id in order if task_id not in restored]
 
         # Actual scheduling
         poll_interval: float = 0.1
-        tasks = list(map(lambda x: self._task_from_params(x[0], x[1]), enumerate(params_iter)))
+        tasks = (self._task_from_params(task_id, params[task_id], param_configs[task_id]) for task_id in order)
+        policy = self.policy or TaskExecutionPolicy()
+        if policy.captures_stdout() and self.batch_dir is not None:
+            tasks = self._with_solver_desc_capture(tasks)
 
-        # Delegate running to scheduler
-        completed_tasks, runinfo = MultiProcessTaskRunner().run(tasks, process_limit, poll_interval)
+        runner = MultiProcessTaskRunner(self._observer(order, param_configs))
+        history_records: list[TaskDurationRecord] = []
 
+        # Delegate running to scheduler
+        try:
+            for compl_task in runner.run_iter(tasks, process_limit, poll_interval,
+                                              retry_limit=policy.retry_limit,
+                                              speculate_after=policy.speculate_after,
+                                              controller=self.controller,
+                                              placement=self.placement,
+                                              deadline=policy.effective_deadline(),
+                                              on_start=self._on_start_fn(params),
+                                              monitor=ConvergenceMonitor(policy.stagnation) if policy.stagnation is not None else None):
+                if policy.speculate_after is not None:
+                    self._finalize_speculative_output(params[compl_task.id], compl_task)
+                if compl_task.early_stopped is not None:
+                    compl_task = self._finalize_early_stopped_output(params[compl_task.id], compl_task)
+                if self.journal is not None:
+                    state = RunJournal.COMPLETED if compl_task.is_ok() else RunJournal.FAILED
+                    self.journal.record(params[compl_task.id].output_dir, state, compl_task.return_code)
+                # Truncated result depends on the stopping criteria, so it must not be reused by other batches
+                if compl_task.is_ok() and compl_task.early_stopped is None and compl_task.id in store_keys:
+                    self.result_store.store(store_keys[compl_task.id], params[compl_task.id].output_dir)
+                if compl_task.is_ok() and compl_task.early_stopped is None and self.cost_model is not None:
+                    history_records.append(self.cost_model.record(param_configs[compl_task.id], compl_task.duration.total_seconds()))
+                yield compl_task.id, self._solver_result_from_completed_task(params[compl_task.id], compl_task)
+        finally:
+            if self.history_file is not None:
+                TaskDurationHistory.append(self.history_file, history_records)
+
+    def run_multiprocess(self,
+                         configs: Iterable[ExperimentConfig],
+                         process_limit: int = 1,
+                         skip: Optional[Callable[[SolverParams], bool]] = None) -> list[ExperimentResult]:
+        """ Runs all series of given experiments & waits for them to complete. See `iter_multiprocess`.
+        Series skipped due to `skip` predicate have their output loaded from disk, but no run metadata. Series not run due to the deadline have neither. """
         # Result collection
-        # Creating new iterator, to avoid using already consumed generator
-        params_iter = solver_params_from_exp_config_collection(configs)
-        solver_results = [SolverResult(
-            series_output=load_series_output(param.output_dir, lazy=True),
-            run_metadata=SolverRunMetadata(  # Propagate more information from completed taks here
-                duration=compl_task.duration,
-                status=compl_task.return_code
-            )
-        ) for param, compl_task in zip(params_iter, completed_tasks)]
+        solver_results: list[SolverResult] = [
+            SolverResult(series_output=load_series_output(params.output_dir, lazy=True), run_metadata=None)
+            if skip is not None and skip(params) else None
+            for params in solver_params_from_exp_config_collection(configs)
+        ]
+        for task_id, solver_result in self.iter_multiprocess(configs, process_limit, skip):
+            solver_results[task_id] = solver_result
+        # Series that were not run at all, because of the deadline
+        solver_results = [
+            res if res is not None else SolverResult(series_output=None, run_metadata=None) for res in solver_results
+        ]
 
         # lets assert that chunks are equal
         n_series = configs[0].n_series
@@ -101,22 +466,176 @@ class LocalExperimentRunner:
             ))
         return results
 
+    def run_adaptive(self,
+                     configs: list[ExperimentConfig],
+                     series_policy: SeriesCountPolicy,
+                     process_limit: int = 1,
+                     best_known: Optional[list[Optional[int]]] = None,
+                     skip: Optional[Callable[[SolverParams], bool]] = None) -> list[ExperimentResult]:
+        """ Runs series of given experiments in waves, until every experiment meets the stopping criteria of `series_policy`.
+        `ExperimentConfig.n_series` is ignored, number of series of every experiment is the number of series in its result.
+
+        :param best_known: best known solution of instance of every experiment, if known
+        :param skip: see `iter_multiprocess` """
+        best_known = best_known or [None] * len(configs)
+        solver_results: list[list[Optional[SolverResult]]] = [[] for _ in configs]
+        active: list[int] = list(range(len(configs)))
+
+        while len(active) > 0:
+            wave_configs = [
+                dataclasses.replace(configs[i], n_series=min(len(solver_results[i]) + series_policy.wave_size, series_policy.max_series))
+                for i in active
+            ]
+            # Series of previous waves are present in the wave configs as well, so task ids map to (experiment, series id)
+            task_series = [(i, sid) for i, cfg in zip(active, wave_configs) for sid in range(cfg.n_series)]
+            previous_dirs = {
+                output_dir_for_series(configs[i].output_dir, sid) for i in active for sid in range(len(solver_results[i]))
+            }
+
+            def wave_skip(params: SolverParams) -> bool:
+                return params.output_dir in previous_dirs or (skip is not None and skip(params))
+
+            for i, cfg in zip(active, wave_configs):
+                solver_results[i].extend([None] * (cfg.n_series - len(solver_results[i])))
+            for task_id, solver_result in self.iter_multiprocess(wave_configs, process_limit, wave_skip):
+                i, sid = task_series[task_id]
+                solver_results[i][sid] = solver_result
+            # Series completed by previous run of the batch
+            for i, sid in task_series:
+                series_dir = output_dir_for_series(configs[i].output_dir, sid)
+                if solver_results[i][sid] is None and series_dir not in previous_dirs and wave_skip(
+                        SolverParams(configs[i].input_file, series_dir, configs[i].config_file, None)):
+                    solver_results[i][sid] = SolverResult(series_output=load_series_output(series_dir, lazy=True), run_metadata=None)
+
+            if any(solver_results[i][sid] is None for i, sid in task_series):
+                # Series that were not run at all (e.g. the deadline is near) would not be run in the next wave either
+                for i in active:
+                    missing = [sid for sid, res in enumerate(solver_results[i]) if res is None]
+                    solver_results[i] = solver_results[i][:missing[0]] if len(missing) > 0 else solver_results[i]
+                print(f"[{dt.datetime.now()}][STOP] Some series have not been run, not starting next wave")
+                break
+
+            still_active = []
+            for i in active:
+                fitness = [
+                    fitness_of_series(res.series_output) for res in solver_results[i] if res is not None and res.series_output is not None
+                ]
+                reason = series_policy.stop_reason(len(solver_results[i]), fitness, best_known[i])
+                if reason is None:
+                    still_active.append(i)
+                else:
+                    print(f"[{dt.datetime.now()}][STOP] {configs[i].output_dir.name} after {len(solver_results[i])} series: {reason}")
+            active = still_active
+
+        return [
+            ExperimentResult(
+                series_outputs=[res.series_output for res in results],
+                metadata=[res.run_metadata for res in results]
+            )
+            for results in solver_results
+        ]
+
 
 class AresExpScheduler:
-    def __init__(self, solver: SolverProxy):
+    def __init__(self, solver: SolverProxy, metadata_store: Optional[Dict[str, InstanceMetadata]] = None):
+        """ :param metadata_store: instance metadata used to estimate cost of the series, instance files are read if missing """
         self.solver = solver
+        # Only the static estimate is used, as the history might change while the array tasks are being started,
+        # and all of them must compute exactly the same partition
+        self.cost_model = TaskCostModel(metadata_store)
 
-    def run(self, configs: list[ExperimentConfig]) -> None:
+    def run(self, configs: list[ExperimentConfig], process_limit: Optional[int] = None) -> None:
+        """ Runs the slice of series this array task is responsible for on pool of processes. Series are partitioned
+        between array tasks so that every one of them gets similar predicted amount of work, see `partition_longest_first`.
+
+        :param process_limit: number of solver processes run in parallel, defaults to number of cpus allocated
+            for the array task (`SLURM_CPUS_PER_TASK`), or cpus available to the process if it is not set """
         params = [param for param in solver_params_from_exp_config_collection(configs)]
+        param_configs = list(it.chain.from_iterable(it.repeat(cfg, cfg.n_series) for cfg in configs))
         jobspec = ArrayJobSpec()
-        indices = input_range_from_jobspec(jobspec, len(params))
+        assert jobspec.array_task_count is not None and jobspec.array_task_id is not None, "Task count & task id must not be None"
+
+        costs = [self.cost_model.estimate(cfg) for cfg in param_configs]
+        indices = partition_longest_first(costs, jobspec.array_task_count)[jobspec.array_task_id]
+        process_limit = process_limit or jobspec.cpus_per_task or available_cpus()
 
-        for i in indices:
-            self.solver.run(params[i])
+        # Scheduler expects task ids to be consecutive
+        tasks = [
+            Task(id=task_id, process_args=self.solver.exec_cmd_from_params(params[i]), stdout_file=params[i].stdout_file)
+            for task_id, i in enumerate(indices)
+        ]
+        MultiProcessTaskRunner().run(tasks, process_limit=process_limit)
 
         return None
 
 
+class FsQueueRunner:
+    """ Runs series from a queue directory on shared filesystem (see `FsTaskQueue`). Any number of workers, on any
+    number of nodes, can process the same queue - every one of them claims next series only when it has a free
+    process slot, so the load is balanced dynamically. Series of worker that died are run again by the others,
+    once their lease expires. """
+
+    def __init__(self, solver: SolverProxy, queue_dir: Path, lease_timeout: float = 300, idle_poll_interval: float = 5.0):
+        """ :param lease_timeout: time in seconds after which the series of unresponsive worker is put back to the queue
+        :param idle_poll_interval: how often idle worker checks for expired leases, while other workers finish the batch """
+        self.solver: SolverProxy = solver
+        self.queue: FsTaskQueue = FsTaskQueue(queue_dir, lease_timeout=lease_timeout)
+        self.idle_poll_interval: float = idle_poll_interval
+
+    def enqueue(self, configs: list[ExperimentConfig], cost_model: Optional[TaskCostModel] = None):
+        """ Puts all series of the experiments to the queue, longest-first if the cost model is present """
+        params: list[SolverParams] = list(solver_params_from_exp_config_collection(configs))
+        order = range(len(params))
+        if cost_model is not None:
+            param_configs = list(it.chain.from_iterable(it.repeat(cfg, cfg.n_series) for cfg in configs))
+            order = order_longest_first([cost_model.estimate(cfg) for cfg in param_configs])
+
+        for position, task_id in enumerate(order):
+            # Workers might be run from other working directory
+            task_params = SolverParams(*(path.absolute() if path is not None else None for path in (
+                params[task_id].input_file, params[task_id].output_dir, params[task_id].config_file, params[task_id].stdout_file)))
+            self.queue.put(f'{position:08d}-{task_id}.json', task_params.as_dict())
+
+    def _claimed_tasks(self, leases: dict[int, Lease], keeper: LeaseKeeper) -> Generator[Task, None, None]:
+        # Scheduler pulls next task only when it has a free slot, so the series is claimed right before it is started
+        while (lease := self.queue.claim()) is not None:
+            task_id = len(leases)
+            leases[task_id] = lease
+            keeper.hold(lease)
+            params = SolverParams.from_dict(lease.payload)
+            yield Task(id=task_id, process_args=self.solver.exec_cmd_from_params(params), stdout_file=params.stdout_file)
+
+    def work(self, process_limit: int = 1) -> RunInfo:
+        """ Processes the queue until there are no series left, neither pending nor being run by other workers.
+
+        :returns: summary of series run by this worker """
+        leases: dict[int, Lease] = {}
+        success_count, failed_count = 0, 0
+        start_time = dt.datetime.now()
+
+        with LeaseKeeper(self.queue) as keeper:
+            while True:
+                self.queue.requeue_expired()
+                stream = MultiProcessTaskRunner().run_iter(self._claimed_tasks(leases, keeper), process_limit)
+                for compl_task in stream:
+                    lease = leases[compl_task.id]
+                    keeper.release(lease)
+                    if not self.queue.complete(lease, compl_task.is_ok()):
+                        print(f'[WARN] Lease of {lease.name} has expired before the series completed, it is going to be run again')
+                    elif compl_task.is_ok():
+                        success_count += 1
+                    else:
+                        failed_count += 1
+
+                if self.queue.is_drained():
+                    break
+                if self.queue.pending_count() == 0:
+                    # Remaining series are run by other workers, they might need to be taken over if the worker dies
+                    time.sleep(self.idle_poll_interval)
+
+        return RunInfo(start_time, dt.datetime.now(), success_count, failed_count)
+
+
 class HyperQueueRunner:
     def __init__(self, solver: SolverProxy):
         import hyperqueue as hq
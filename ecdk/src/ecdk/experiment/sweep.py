@@ -0,0 +1,121 @@
+import re
+import json
+import itertools
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Optional
+
+# Separates instance name from configuration name in names of experiments of a sweep
+SWEEP_NAME_SEP = '__'
+
+
+def parse_grid_spec(spec: list[str]) -> dict[str, list]:
+    """ Parses parameter grid given as `key=value1,value2,...` items. Values are parsed as JSON when possible
+    (numbers, booleans, null), otherwise they are kept as strings. """
+    grid: dict[str, list] = {}
+    for item in spec:
+        key, sep, values = item.partition('=')
+        assert sep == '=' and len(key) > 0 and len(values) > 0, f"Grid parameter must be in form key=value1,value2,... received {item}"
+        assert key not in grid, f"Grid parameter {key} specified more than once"
+        grid[key] = [_parse_value(value) for value in values.split(',')]
+    return grid
+
+
+def _parse_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def _name_part(key: str, value: Any) -> str:
+    return re.sub(r'[^\w.-]', '-', f'{key}-{value}')
+
+
+@dataclass(frozen=True)
+class SweepConfig:
+    """ Single solver configuration of a sweep """
+
+    # Unique within the sweep, used in experiment names
+    name: str
+
+    # Configuration file passed to the solver
+    path: Path
+
+    # Contents of the configuration file
+    params: dict
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "path": str(self.path),
+            "params": self.params,
+        }
+
+
+class ConfigSweep:
+    """ Set of solver configurations the instances are run with: the given configuration files, each of them
+    combined with every point of the parameter grid. Configurations with identical contents are run only once. """
+
+    def __init__(self, base_files: list[Path], grid: Optional[dict[str, list]] = None):
+        self.base_files: list[Path] = base_files
+        self.grid: dict[str, list] = grid or {}
+        self.configs: list[SweepConfig] = []
+
+    def expand(self) -> list[tuple[str, dict]]:
+        """ :returns: name & contents of every distinct configuration, in order of base files & grid points """
+        bases: list[tuple[Optional[str], dict]] = [(None, {})]
+        if len(self.base_files) > 0:
+            bases = []
+            for file in self.base_files:
+                with open(file, 'r') as fd:
+                    bases.append((file.stem, json.load(fd)))
+
+        keys = list(self.grid.keys())
+        seen: set[str] = set()
+        expanded = []
+        for base_name, base in bases:
+            for values in itertools.product(*self.grid.values()):
+                params = base | dict(zip(keys, values))
+                fingerprint = json.dumps(params, sort_keys=True)
+                if fingerprint in seen:
+                    continue
+                seen.add(fingerprint)
+                parts = [base_name] if base_name is not None and (len(bases) > 1 or len(keys) == 0) else []
+                parts.extend(_name_part(key, value) for key, value in zip(keys, values))
+                expanded.append(('_'.join(parts) or 'default', params))
+
+        names = [name for name, _ in expanded]
+        assert len(set(names)) == len(names), f"Names of sweep configurations must be unique, received {names}"
+        return expanded
+
+    def is_trivial(self) -> bool:
+        """ Sweep of single configuration file without grid is just a regular batch """
+        return len(self.grid) == 0 and len(self.base_files) <= 1
+
+    def materialize(self, directory: Path) -> list[SweepConfig]:
+        """ Writes every configuration of the sweep to `directory`. Configuration files of trivial sweep are used directly. """
+        if self.is_trivial():
+            self.configs = [SweepConfig(file.stem, file, {}) for file in self.base_files]
+            return self.configs
+
+        directory.mkdir(parents=True, exist_ok=True)
+        self.configs = []
+        for name, params in self.expand():
+            path = directory.joinpath(f'{name}.json')
+            with open(path, 'w') as fd:
+                json.dump(params, fd, indent=4)
+            self.configs.append(SweepConfig(name, path, params))
+        return self.configs
+
+    def experiment_name(self, instance_name: str, config: Optional[SweepConfig]) -> str:
+        if config is None or self.is_trivial():
+            return instance_name
+        return f'{instance_name}{SWEEP_NAME_SEP}{config.name}'
+
+    def as_dict(self) -> dict:
+        return {
+            "base_files": [str(file) for file in self.base_files],
+            "grid": self.grid,
+            "configs": [config.as_dict() for config in self.configs],
+        }
@@ -0,0 +1,12 @@
+import datetime as dt
+from cli.cli import local_datetime_from_isoformat
+
+
+def test_deadline_with_utc_offset_is_converted_to_local_time():
+    utc_time = dt.datetime(2026, 10, 17, 10, 0, tzinfo=dt.timezone.utc)
+
+    deadline = local_datetime_from_isoformat('2026-10-17T12:00+02:00')
+
+    assert deadline.tzinfo is None
+    assert deadline == utc_time.astimezone().replace(tzinfo=None)
+    assert local_datetime_from_isoformat('2026-10-17T12:00') == dt.datetime(2026, 10, 17, 12, 0)
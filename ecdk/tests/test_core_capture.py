@@ -0,0 +1,67 @@
+import sys
+import gzip
+from core.capture import LogFileSink, CompressedLogSink, SolverDescCapture
+from core.scheduler import Task, MultiProcessTaskRunner
+
+
+def test_compressed_sink_writes_gzip(tmp_path):
+    file = tmp_path / 'stdout.log.gz'
+    sink = CompressedLogSink(file)
+    sink.write(b'line 1\n')
+    sink.write(b'line 2\n')
+    sink.close()
+
+    assert gzip.decompress(file.read_bytes()) == b'line 1\nline 2\n'
+
+
+def test_sink_drops_output_over_cap(tmp_path):
+    file = tmp_path / 'stdout.log'
+    sink = LogFileSink(file, max_bytes=10)
+    sink.write(b'0123456')
+    sink.write(b'789abcdef')
+    sink.write(b'ghi')
+    sink.close()
+
+    content = file.read_bytes()
+    assert content.startswith(b'0123456789\n')
+    assert b'9 bytes dropped' in content
+
+
+def test_solver_desc_is_captured_across_chunks(tmp_path):
+    captured = []
+    sink = SolverDescCapture(LogFileSink(tmp_path / 'stdout.log'), captured.append)
+    output = b'preamble\nBEGIN_SOLVER_DESC\n{"name": "x"}\nEND_SOLVER_DESC\nrest\n'
+    for i in range(0, len(output), 5):
+        sink.write(output[i:i + 5])
+    sink.close()
+
+    assert captured == ['{"name": "x"}\n']
+    assert (tmp_path / 'stdout.log').read_bytes() == output
+
+
+def test_solver_desc_is_not_searched_past_scan_limit(tmp_path):
+    captured = []
+    sink = SolverDescCapture(LogFileSink(tmp_path / 'stdout.log'), captured.append, scan_limit=8)
+    sink.write(b'0123456789\n')
+    sink.write(b'BEGIN_SOLVER_DESC\n{}\nEND_SOLVER_DESC\n')
+    sink.close()
+
+    assert captured == []
+
+
+def test_scheduler_feeds_task_output_to_sink(tmp_path):
+    files = [tmp_path / f'stdout-{i}.log.gz' for i in range(3)]
+    tasks = [
+        Task(
+            id=i,
+            process_args=[sys.executable, '-c', f'import sys; sys.stdout.write("x" * 100000 + "{i}")'],
+            stdout_file=None,
+            stdout_sink=lambda file=files[i]: CompressedLogSink(file)
+        )
+        for i in range(3)
+    ]
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=2)
+
+    assert runinfo.success_count == 3
+    for i, file in enumerate(files):
+        assert gzip.decompress(file.read_bytes()) == b'x' * 100000 + str(i).encode()
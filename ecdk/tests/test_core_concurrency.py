@@ -0,0 +1,87 @@
+import os
+import sys
+import signal
+import pytest
+import core.concurrency as concurrency
+from core.concurrency import ConcurrencyController
+from core.scheduler import Task, MultiProcessTaskRunner
+
+
+@pytest.fixture
+def idle_system(monkeypatch):
+    monkeypatch.setattr(os, 'getloadavg', lambda: (0.0, 0.0, 0.0), raising=False)
+    monkeypatch.setattr(concurrency, 'available_cpus', lambda: 8)
+    monkeypatch.setattr(concurrency, '_read_meminfo', lambda: {'MemAvailable': 64 * 1024 * 1024})
+    monkeypatch.setattr(concurrency, '_read_process_rss', lambda pid: None)
+
+
+def test_limit_is_bounded_by_max_limit(idle_system):
+    assert ConcurrencyController(max_limit=4).limit() == 4
+
+
+def test_limit_follows_foreign_load(idle_system, monkeypatch):
+    controller = ConcurrencyController(max_limit=8)
+    monkeypatch.setattr(os, 'getloadavg', lambda: (6.0, 0.0, 0.0), raising=False)
+    # Two of the processes contributing to the load are ours
+    assert controller.limit(running_pids=[1, 2]) == 4
+
+
+def test_limit_follows_available_memory(idle_system, monkeypatch):
+    controller = ConcurrencyController(max_limit=8, memory_reserve_mb=0)
+    controller.observe_peak_rss(1024 * 1024)
+    monkeypatch.setattr(concurrency, '_read_meminfo', lambda: {'MemAvailable': 3 * 1024 * 1024})
+    assert controller.limit() == 3
+
+
+def test_limit_grows_gradually(idle_system, monkeypatch):
+    controller = ConcurrencyController(max_limit=8, interval=3600)
+    monkeypatch.setattr(os, 'getloadavg', lambda: (7.0, 0.0, 0.0), raising=False)
+    assert controller.limit() == 1
+
+    monkeypatch.setattr(os, 'getloadavg', lambda: (0.0, 0.0, 0.0), raising=False)
+    assert controller.limit() == 2
+    assert controller.limit() == 2
+
+
+def test_operator_override(idle_system, tmp_path):
+    control_file = tmp_path / 'procs'
+    controller = ConcurrencyController(max_limit=8, control_file=control_file)
+    assert controller.limit() == 8
+
+    control_file.write_text('2\n')
+    assert controller.limit() == 2
+
+    control_file.write_text('garbage')
+    os.utime(control_file, (0, 0))
+    assert controller.limit() == 2
+
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGUSR2'), reason='Requires POSIX signals')
+def test_signals_adjust_operator_limit(idle_system):
+    controller = ConcurrencyController(max_limit=4)
+    previous_handlers = signal.getsignal(signal.SIGUSR1), signal.getsignal(signal.SIGUSR2)
+    try:
+        controller.install_signal_handlers()
+        os.kill(os.getpid(), signal.SIGUSR2)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert controller.operator_limit == 2
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert controller.operator_limit == 3
+    finally:
+        signal.signal(signal.SIGUSR1, previous_handlers[0])
+        signal.signal(signal.SIGUSR2, previous_handlers[1])
+
+
+def test_scheduler_respects_controller_limit(idle_system, tmp_path):
+    controller = ConcurrencyController(max_limit=2)
+    # Each task records number of task processes alive when it started
+    code = (
+        "import os, time, pathlib; d = pathlib.Path({dir!r}); f = d / str(os.getpid()); f.touch();"
+        "print(len(list(d.iterdir())), flush=True); time.sleep(0.2); f.unlink()"
+    ).format(dir=str(tmp_path / 'alive'))
+    (tmp_path / 'alive').mkdir()
+    tasks = [Task(i, [sys.executable, '-c', code], tmp_path / f'{i}.log') for i in range(6)]
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=6, controller=controller)
+
+    assert runinfo.success_count == 6
+    assert max(int((tmp_path / f'{i}.log').read_text()) for i in range(6)) <= 2
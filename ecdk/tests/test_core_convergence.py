@@ -0,0 +1,67 @@
+import sys
+from core.convergence import ConvergenceMonitor, StagnationRule
+from core.scheduler import Task, MultiProcessTaskRunner
+
+
+def test_improvements_are_read_incrementally(tmp_path):
+    file = tmp_path / 'event_newbest.csv'
+    monitor = ConvergenceMonitor(StagnationRule(patience=10))
+    assert monitor.improvements(0, file) == []
+
+    file.write_text('event_name,generation,total_duration,fitness\nnewbest,1,1000,100\nnewbest,2,20')
+    assert [imp.fitness for imp in monitor.improvements(0, file)] == [100]
+
+    with open(file, 'a') as fd:
+        fd.write('00,90\n')
+    improvements = monitor.improvements(0, file)
+    assert [imp.fitness for imp in improvements] == [100, 90]
+    assert improvements[-1].time == 2.0
+
+
+def test_stagnation_rule(tmp_path):
+    file = tmp_path / 'event_newbest.csv'
+    file.write_text('event_name,generation,total_duration,fitness\nnewbest,1,1000,100\nnewbest,50,20000,90\n')
+
+    assert ConvergenceMonitor(StagnationRule(patience=10)).check(0, file, elapsed=25) is None
+    assert ConvergenceMonitor(StagnationRule(patience=10)).check(0, file, elapsed=31) is not None
+    # Last improvement took 20s, so 11s without improvement is not enough
+    assert ConvergenceMonitor(StagnationRule(patience=10, patience_factor=1)).check(0, file, elapsed=31) is None
+    assert ConvergenceMonitor(StagnationRule(patience=10, min_runtime=60)).check(0, file, elapsed=31) is None
+
+
+def test_predicted_gain_rule(tmp_path):
+    file = tmp_path / 'event_newbest.csv'
+    file.write_text('event_name,generation,total_duration,fitness\nnewbest,1,0,100\nnewbest,10,10000,90\n')
+    rule = StagnationRule(min_predicted_gain=0.05)
+
+    # 10 fitness units per 10s, so another ~10 units are expected in the remaining 10s
+    assert ConvergenceMonitor(rule).check(0, file, elapsed=10, expected_duration=20) is None
+    assert ConvergenceMonitor(rule).check(0, file, elapsed=10, expected_duration=12) is not None
+    assert ConvergenceMonitor(rule).check(0, file, elapsed=10) is None
+
+
+def test_scheduler_stops_stagnating_tasks(tmp_path):
+    files = [tmp_path / f'event_newbest-{i}.csv' for i in range(2)]
+    code = ("import sys, time; f = open(sys.argv[1], 'w'); f.write('event_name,generation,total_duration,fitness\\nnewbest,0,0,100\\n'); "
+            "f.flush(); time.sleep(float(sys.argv[2]))")
+    tasks = [
+        Task(id=0, process_args=[sys.executable, '-c', code, str(files[0]), '30'], stdout_file=None, progress_file=files[0]),
+        Task(id=1, process_args=[sys.executable, '-c', code, str(files[1]), '0.1'], stdout_file=None, progress_file=files[1]),
+    ]
+    monitor = ConvergenceMonitor(StagnationRule(patience=0.5), interval=0.1)
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=2, retry_limit=1, monitor=monitor)
+
+    assert completed[0].early_stopped is not None
+    # Stopped on purpose, the result reported until then is kept
+    assert completed[0].is_ok() and not completed[0].timed_out
+    assert completed[0].attempts == 1
+    assert completed[0].duration.total_seconds() < 10
+    assert completed[1].is_ok() and completed[1].early_stopped is None
+    assert (runinfo.success_count, runinfo.failed_count) == (2, 0)
+
+
+def test_series_without_any_solution_are_not_stopped(tmp_path):
+    file = tmp_path / 'event_newbest.csv'
+    file.write_text('event_name,generation,total_duration,fitness\n')
+
+    assert ConvergenceMonitor(StagnationRule(patience=10)).check(0, file, elapsed=60) is None
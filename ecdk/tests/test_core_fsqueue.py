@@ -0,0 +1,74 @@
+import os
+import time
+import multiprocessing as mp
+from pathlib import Path
+from core.fsqueue import FsTaskQueue, LeaseKeeper
+
+
+def claim_all(queue_dir: Path, worker_id: str, result_queue):
+    queue = FsTaskQueue(queue_dir, worker_id=worker_id)
+    claimed = []
+    while (lease := queue.claim()) is not None:
+        claimed.append(lease.payload['i'])
+        queue.complete(lease, ok=True)
+    result_queue.put(claimed)
+
+
+def test_tasks_are_claimed_in_order(tmp_path):
+    queue = FsTaskQueue(tmp_path, worker_id='w0')
+    for i in (2, 0, 1):
+        queue.put(f'{i:04d}.json', {'i': i})
+
+    assert [queue.claim().payload['i'] for _ in range(3)] == [0, 1, 2]
+    assert queue.claim() is None
+    assert queue.pending_count() == 0 and queue.claimed_count() == 3
+
+
+def test_every_task_is_claimed_exactly_once(tmp_path):
+    queue = FsTaskQueue(tmp_path)
+    n_tasks = 200
+    for i in range(n_tasks):
+        queue.put(f'{i:04d}.json', {'i': i})
+
+    ctx = mp.get_context('fork')
+    result_queue = ctx.Queue()
+    workers = [ctx.Process(target=claim_all, args=(tmp_path, f'w{w}', result_queue)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    claimed = [i for _ in workers for i in result_queue.get(timeout=30)]
+    for worker in workers:
+        worker.join()
+
+    assert sorted(claimed) == list(range(n_tasks))
+    assert queue.is_drained()
+
+
+def test_expired_lease_is_requeued(tmp_path):
+    dead_worker = FsTaskQueue(tmp_path, worker_id='dead', lease_timeout=60)
+    dead_worker.put('0000.json', {'i': 0})
+    lease = dead_worker.claim()
+
+    # Last heartbeat long ago
+    os.utime(lease.path, (time.time() - 120, time.time() - 120))
+    other_worker = FsTaskQueue(tmp_path, worker_id='alive', lease_timeout=60)
+    assert other_worker.requeue_expired() == ['0000.json']
+    assert other_worker.claim().payload == {'i': 0}
+
+    # The dead worker can not complete the task it has lost
+    assert not dead_worker.renew(lease)
+    assert not dead_worker.complete(lease, ok=True)
+
+
+def test_lease_keeper_renews_leases(tmp_path):
+    queue = FsTaskQueue(tmp_path, lease_timeout=0.4)
+    queue.put('0000.json', {'i': 0})
+    lease = queue.claim()
+
+    with LeaseKeeper(queue, interval=0.05) as keeper:
+        keeper.hold(lease)
+        time.sleep(0.6)
+        assert queue.requeue_expired() == []
+        keeper.release(lease)
+
+    assert queue.complete(lease, ok=True)
+    assert queue.is_drained()
@@ -0,0 +1,53 @@
+from pathlib import Path
+from core.journal import RunJournal
+from experiment.model import SolverParams
+from experiment.runner import completed_series_filter
+
+
+def create_params(series_dir: Path) -> SolverParams:
+    return SolverParams(input_file=None, output_dir=series_dir, config_file=None, stdout_file=None)
+
+
+def test_last_state_wins(tmp_path):
+    series_dir = tmp_path / 'exp' / 'exp-series-0'
+    with RunJournal(tmp_path / 'journal.jsonl') as journal:
+        journal.record(series_dir, RunJournal.STARTED)
+        journal.record(series_dir, RunJournal.FAILED, 1)
+        journal.record(series_dir, RunJournal.STARTED)
+        journal.record(series_dir, RunJournal.COMPLETED, 0)
+
+    states = RunJournal(tmp_path / 'journal.jsonl').last_states()
+    assert states == {'exp/exp-series-0': states['exp/exp-series-0']}
+    assert states['exp/exp-series-0'].state == RunJournal.COMPLETED
+    assert states['exp/exp-series-0'].return_code == 0
+
+
+def test_truncated_entry_is_ignored(tmp_path):
+    journal_file = tmp_path / 'journal.jsonl'
+    with RunJournal(journal_file) as journal:
+        journal.record(tmp_path / 'a', RunJournal.COMPLETED, 0)
+
+    with open(journal_file, 'a') as file:
+        file.write('{"key": "b", "sta')
+
+    assert list(RunJournal(journal_file).last_states().keys()) == ['a']
+
+
+def test_completed_series_filter(tmp_path):
+    completed_dir = tmp_path / 'exp-series-0'
+    failed_dir = tmp_path / 'exp-series-1'
+    missing_dir = tmp_path / 'exp-series-2'
+    for directory in (completed_dir, failed_dir, missing_dir):
+        directory.mkdir()
+    completed_dir.joinpath('run_metadata.json').write_text('{}')
+    failed_dir.joinpath('run_metadata.json').write_text('{}')
+
+    with RunJournal(tmp_path / 'journal.jsonl') as journal:
+        journal.record(completed_dir, RunJournal.COMPLETED, 0)
+        journal.record(failed_dir, RunJournal.FAILED, 1)
+        journal.record(missing_dir, RunJournal.STARTED)
+
+    is_completed = completed_series_filter(RunJournal(tmp_path / 'journal.jsonl'))
+    assert is_completed(create_params(completed_dir))
+    assert not is_completed(create_params(failed_dir))
+    assert not is_completed(create_params(missing_dir))
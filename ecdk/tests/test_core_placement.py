@@ -0,0 +1,57 @@
+import os
+import sys
+import pytest
+from core.placement import CorePlacement, LogicalCpu, cpu_topology, is_pinning_supported, _parse_cpu_list
+from core.scheduler import Task, MultiProcessTaskRunner
+
+
+def create_topology(n_packages: int, cores_per_package: int, threads_per_core: int) -> list[LogicalCpu]:
+    ''' Linux-like numbering: sibling threads of a core are `n_cores` apart '''
+    n_cores = n_packages * cores_per_package
+    topology = []
+    for core in range(n_cores):
+        siblings = tuple(core + t * n_cores for t in range(threads_per_core))
+        for cpu in siblings:
+            topology.append(LogicalCpu(cpu, siblings, core // cores_per_package))
+    return sorted(topology, key=lambda c: (c.package, c.core, c.id))
+
+
+def test_parse_cpu_list():
+    assert _parse_cpu_list('0-3,8,10-11\n') == [0, 1, 2, 3, 8, 10, 11]
+
+
+def test_smt_siblings_are_avoided():
+    placement = CorePlacement(topology=create_topology(1, 4, 2))
+    assert placement.slots == [(0, ), (1, ), (2, ), (3, )]
+
+
+def test_smt_siblings_are_used_on_request():
+    placement = CorePlacement(avoid_smt=False, topology=create_topology(1, 2, 2))
+    assert placement.slots == [(0, 2), (1, 3)]
+
+
+def test_core_sets_do_not_cross_packages():
+    placement = CorePlacement(cores_per_task=2, topology=create_topology(2, 3, 1))
+    assert placement.slots == [(0, 1), (3, 4)]
+
+
+def test_acquired_sets_are_exclusive():
+    placement = CorePlacement(topology=create_topology(1, 2, 1))
+    first, second = placement.acquire(), placement.acquire()
+    assert first != second
+    assert placement.acquire() is None
+
+    placement.release(first)
+    assert placement.acquire() == first
+
+
+@pytest.mark.skipif(not is_pinning_supported(), reason='Requires sched_setaffinity')
+def test_processes_are_pinned(tmp_path):
+    placement = CorePlacement(topology=cpu_topology())
+    code = 'import os; print(sorted(os.sched_getaffinity(0)))'
+    tasks = [Task(i, [sys.executable, '-c', code], tmp_path / f'{i}.log') for i in range(3)]
+    completed, _ = MultiProcessTaskRunner().run(tasks, process_limit=8, placement=placement)
+
+    for task in completed:
+        assert task.cpus in placement.slots
+        assert (tmp_path / f'{task.id}.log').read_text().strip() == str(sorted(task.cpus))
@@ -0,0 +1,37 @@
+import io
+import json
+import datetime as dt
+from core.progress import ProgressTracker
+from core.scheduler import CompletedTask, MultiProcessTaskRunner
+from .test_core_scheduler import create_py_task
+
+
+def test_status_file_reflects_the_batch(tmp_path):
+    status_file = tmp_path / 'status.json'
+    stream = io.StringIO()
+    tracker = ProgressTracker(groups={0: 'a', 1: 'a', 2: 'b'}, status_file=status_file, refresh_interval=0, stream=stream)
+    tasks = [create_py_task(0, 'pass'), create_py_task(1, 'raise SystemExit(1)'), create_py_task(2, 'pass')]
+    MultiProcessTaskRunner(tracker).run(tasks, process_limit=2)
+
+    status = json.loads(status_file.read_text())
+    assert status['total'] == 3
+    assert status['completed'] == 2 and status['failed'] == 1 and status['running'] == 0
+    assert status['experiments'] == {'a': {'done': 2, 'total': 2}, 'b': {'done': 1, 'total': 1}}
+    assert status['eta_seconds'] == 0
+
+    # Only failures & status lines are printed
+    output = stream.getvalue()
+    assert '[ERROR]' in output and '[COMPL]' not in output and '[START]' not in output
+    assert 'Completed batch of 3' in output
+    assert not list(tmp_path.glob('.*.tmp'))
+
+
+def test_eta_uses_corrected_predictions():
+    tracker = ProgressTracker(groups={0: 'a', 1: 'a', 2: 'a'}, expected_durations={0: 1.0, 1: 10.0, 2: 20.0}, stream=None)
+    tracker.batch_started(process_limit=2)
+    assert tracker.eta() is None
+
+    # Task took twice as long as predicted, so remaining ones are expected to as well
+    start_time = dt.datetime.now()
+    tracker.task_completed(CompletedTask(create_py_task(0, 'pass'), 0, start_time, start_time + dt.timedelta(seconds=2)))
+    assert tracker.eta().total_seconds() == (10.0 + 20.0) * 2 / 2
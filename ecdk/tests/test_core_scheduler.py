@@ -0,0 +1,207 @@
+import os
+import sys
+import datetime as dt
+import pytest
+from pathlib import Path
+from core.scheduler import Task, MultiProcessTaskRunner
+
+
+def create_py_task(task_id: int, code: str, stdout_file: Path = None) -> Task:
+    return Task(
+        id=task_id,
+        process_args=[sys.executable, '-c', code],
+        stdout_file=stdout_file
+    )
+
+
+def test_completed_tasks_are_ordered_by_id():
+    tasks = [create_py_task(i, f'import time; time.sleep({0.05 * (5 - i)})') for i in range(5)]
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=3)
+
+    assert [task.id for task in completed] == list(range(5))
+    assert all(task.is_ok() for task in completed)
+    assert runinfo.success_count == 5 and runinfo.failed_count == 0
+
+
+def test_failed_tasks_are_reported():
+    tasks = [
+        create_py_task(0, 'pass'),
+        create_py_task(1, 'raise SystemExit(3)'),
+        create_py_task(2, 'pass'),
+    ]
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=2)
+
+    assert completed[1].return_code == 3
+    assert not completed[1].is_ok()
+    assert runinfo.success_count == 2 and runinfo.failed_count == 1
+
+
+def test_stdout_is_redirected_to_file(tmp_path):
+    stdout_file = tmp_path / 'stdout.log'
+    completed, _ = MultiProcessTaskRunner().run([create_py_task(0, 'print("hello")', stdout_file)])
+
+    assert completed[0].is_ok()
+    assert stdout_file.read_text().strip() == 'hello'
+
+
+@pytest.mark.skipif(not hasattr(os, 'pidfd_open'), reason='Event driven completion requires pidfd support')
+def test_next_task_starts_without_waiting_for_poll_interval():
+    n_tasks = 4
+    poll_interval = 2.0
+    tasks = [create_py_task(i, 'pass') for i in range(n_tasks)]
+
+    start = dt.datetime.now()
+    MultiProcessTaskRunner().run(tasks, process_limit=1, poll_interval=poll_interval)
+    elapsed = (dt.datetime.now() - start).total_seconds()
+
+    # With polling this would take at least n_tasks * poll_interval seconds
+    assert elapsed < poll_interval
+
+
+def test_polling_fallback(monkeypatch):
+    monkeypatch.delattr(os, 'pidfd_open', raising=False)
+    tasks = [create_py_task(i, 'pass') for i in range(3)]
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=2, poll_interval=0.01)
+
+    assert [task.id for task in completed] == [0, 1, 2]
+    assert runinfo.success_count == 3
+
+
+def test_run_iter_yields_tasks_in_completion_order():
+    tasks = [
+        create_py_task(0, 'import time; time.sleep(0.5)'),
+        create_py_task(1, 'pass'),
+    ]
+    completed_ids = [task.id for task in MultiProcessTaskRunner().run_iter(tasks, process_limit=2)]
+
+    assert completed_ids == [1, 0]
+
+
+def test_run_iter_consumes_tasks_lazily():
+    consumed = []
+
+    def task_source():
+        for i in range(4):
+            consumed.append(i)
+            yield create_py_task(i, 'pass')
+
+    stream = MultiProcessTaskRunner().run_iter(task_source(), process_limit=2)
+    next(stream)
+
+    # Two tasks started upfront & one in place of the completed one
+    assert consumed == [0, 1, 2]
+    stream.close()
+
+
+def test_closing_run_iter_terminates_running_processes():
+    tasks = [
+        create_py_task(0, 'pass'),
+        create_py_task(1, 'import time; time.sleep(30)'),
+    ]
+    start = dt.datetime.now()
+    stream = MultiProcessTaskRunner().run_iter(tasks, process_limit=2)
+    assert next(stream).id == 0
+    stream.close()
+
+    assert (dt.datetime.now() - start).total_seconds() < 10
+
+
+@pytest.mark.skipif(not hasattr(os, 'wait4'), reason='Resource accounting requires wait4')
+def test_resource_usage_is_collected():
+    tasks = [create_py_task(0, 'buf = bytearray(64 * 1024 * 1024); sum(range(10 ** 6))')]
+    completed, _ = MultiProcessTaskRunner().run(tasks)
+
+    rusage = completed[0].rusage
+    assert rusage is not None
+    assert rusage.max_rss >= 64 * 1024
+    assert rusage.cpu_time > 0
+
+
+def test_task_exceeding_timeout_is_terminated():
+    task = create_py_task(0, 'import time; time.sleep(30)')._replace(timeout=0.2)
+    start = dt.datetime.now()
+    completed, runinfo = MultiProcessTaskRunner().run([task, create_py_task(1, 'pass')], process_limit=2)
+
+    assert (dt.datetime.now() - start).total_seconds() < 5
+    assert completed[0].timed_out and not completed[0].is_ok()
+    assert not completed[1].timed_out and completed[1].is_ok()
+    assert runinfo.failed_count == 1
+
+
+def test_task_ignoring_termination_is_killed(monkeypatch):
+    monkeypatch.setattr(MultiProcessTaskRunner, 'KILL_GRACE_PERIOD', 0.2)
+    code = 'import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print("ready", flush=True); time.sleep(30)'
+    task = create_py_task(0, code)._replace(timeout=0.5)
+    completed, _ = MultiProcessTaskRunner().run([task])
+
+    assert completed[0].timed_out
+    assert completed[0].duration.total_seconds() < 5
+
+
+def test_failed_task_is_retried(tmp_path):
+    # Fails on the first attempt only
+    marker = tmp_path / 'marker'
+    code = f'import pathlib, sys; p = pathlib.Path({str(marker)!r}); sys.exit(0 if p.exists() else p.touch() or 1)'
+    completed, runinfo = MultiProcessTaskRunner().run([create_py_task(0, code)], retry_limit=2)
+
+    assert completed[0].is_ok()
+    assert completed[0].attempts == 2
+    assert runinfo.success_count == 1 and runinfo.failed_count == 0
+
+
+def test_retries_are_bounded():
+    completed, runinfo = MultiProcessTaskRunner().run([create_py_task(0, 'raise SystemExit(1)')], retry_limit=2)
+
+    assert completed[0].attempts == 3
+    assert not completed[0].is_ok()
+    assert runinfo.failed_count == 1
+
+
+def test_straggler_is_speculatively_replicated():
+    fast_replica = create_py_task(1, 'pass')
+    tasks = [
+        create_py_task(0, 'pass'),
+        create_py_task(1, 'import time; time.sleep(30)')._replace(expected_duration=0.1, clone=lambda: fast_replica),
+    ]
+    start = dt.datetime.now()
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=2, speculate_after=2.0)
+
+    assert (dt.datetime.now() - start).total_seconds() < 5
+    assert completed[1].is_ok() and completed[1].speculative
+    assert completed[1].origin is fast_replica
+    assert not completed[0].speculative
+    assert runinfo.success_count == 2
+
+
+def test_tasks_that_would_overrun_deadline_are_skipped():
+    deadline = dt.datetime.now() + dt.timedelta(seconds=5)
+    tasks = [
+        create_py_task(0, 'pass')._replace(expected_duration=60),
+        create_py_task(1, 'pass')._replace(expected_duration=0.1),
+        create_py_task(2, 'pass'),
+    ]
+    started = []
+    completed = list(MultiProcessTaskRunner().run_iter(tasks, process_limit=1, deadline=deadline, on_start=started.append))
+
+    assert sorted(task.id for task in completed) == [1, 2]
+    assert [task.id for task in started] == [1, 2]
+
+
+def test_tasks_pending_at_deadline_are_skipped():
+    deadline = dt.datetime.now() + dt.timedelta(seconds=0.3)
+    tasks = [create_py_task(i, 'import time; time.sleep(30)') for i in range(3)]
+
+    completed, runinfo = MultiProcessTaskRunner().run(tasks, process_limit=1, deadline=deadline)
+
+    assert completed[0].timed_out
+    assert completed[1:] == [None, None]
+    assert (runinfo.failed_count, runinfo.skipped_count) == (1, 2)
+
+
+def test_running_tasks_are_terminated_at_deadline():
+    deadline = dt.datetime.now() + dt.timedelta(seconds=0.3)
+    stream = MultiProcessTaskRunner().run_iter([create_py_task(0, 'import time; time.sleep(30)')], deadline=deadline)
+    completed = next(stream)
+
+    assert completed.timed_out and not completed.is_ok()
+    assert completed.end_time < deadline + dt.timedelta(seconds=2)
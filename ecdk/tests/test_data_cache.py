@@ -0,0 +1,59 @@
+import os
+from polars.testing import assert_frame_equal
+from data.cache import ExperimentEventCache, cache_dir_for_experiment
+
+
+def create_series_files(exp_dir, n_series: int = 3) -> list:
+    sources = []
+    for sid in range(n_series):
+        series_dir = exp_dir / f'{exp_dir.name}-series-{sid}'
+        series_dir.mkdir(parents=True)
+        file = series_dir / 'event_newbest.csv'
+        file.write_text('event_name,generation,time,fitness\n' + ''.join(f'newbest,{g},{g * 10},{100 - g - sid}\n' for g in range(5)))
+        sources.append((sid, file))
+    return sources
+
+
+def test_event_data_is_served_from_cache(tmp_path):
+    exp_dir = tmp_path / 'test01'
+    sources = create_series_files(exp_dir)
+
+    df = ExperimentEventCache(exp_dir).load('newbest', sources)
+    assert df.columns == ['generation', 'time', 'fitness', 'sid']
+    assert df.height == 15
+    assert df['sid'].to_list() == [0] * 5 + [1] * 5 + [2] * 5
+
+    cache = ExperimentEventCache(exp_dir)
+    assert cache.is_valid('newbest', sources)
+    # Source files are not read again: contents changed without changing size & mtime go unnoticed
+    file = sources[0][1]
+    stat = file.stat()
+    file.write_text(file.read_text().replace('9', '8'))
+    os.utime(file, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert_frame_equal(cache.load('newbest', sources), df)
+    assert cache.load('newbest', sources, columns=['sid', 'fitness']).columns == ['sid', 'fitness']
+
+
+def test_modified_series_invalidate_cache(tmp_path):
+    exp_dir = tmp_path / 'test01'
+    sources = create_series_files(exp_dir)
+    ExperimentEventCache(exp_dir).load('newbest', sources)
+
+    with open(sources[1][1], 'a') as file:
+        file.write('newbest,5,50,10\n')
+    assert not ExperimentEventCache(exp_dir).is_valid('newbest', sources)
+    assert ExperimentEventCache(exp_dir).load('newbest', sources).height == 16
+    assert ExperimentEventCache(exp_dir).is_valid('newbest', sources)
+
+    # Series added by e.g. resumed batch
+    assert not ExperimentEventCache(exp_dir).is_valid('newbest', sources[:2])
+
+
+def test_corrupted_manifest_is_rebuilt(tmp_path):
+    exp_dir = tmp_path / 'test01'
+    sources = create_series_files(exp_dir)
+    ExperimentEventCache(exp_dir).load('newbest', sources)
+    cache_dir_for_experiment(exp_dir).joinpath('manifest.json').write_text('{')
+
+    assert not ExperimentEventCache(exp_dir).is_valid('newbest', sources)
+    assert ExperimentEventCache(exp_dir).load('newbest', sources).height == 15
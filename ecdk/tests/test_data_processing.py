@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+from multiprocessing import get_context
+from polars.testing import assert_frame_equal
+from experiment.model import ExperimentBatch, Version
+from core.fs import initialize_file_hierarchy, output_dir_for_series, experiment_dir_in_batch
+from data.tools import extract_experiments_from_dir
+from core.series import write_truncated_series_metadata
+from data.stat import KEY_EXPNAME
+from data.processing import analyze_experiment_from_dir, process_experiment_window
+from .test_core_fs import create_mock_exp
+
+INSTANCE_FILE = Path('./data/instances-mock/test_instances/test01.txt').absolute()
+
+# Valid schedule of test01 instance & its makespan
+SOLUTION_STRING = '1_2_3_4'
+SOLUTION_FITNESS = 7
+
+
+def create_exp_batch_output(batch_dir, names: list[str], solution_string: str = SOLUTION_STRING):
+    experiments = [create_mock_exp(name, input_file=INSTANCE_FILE, output_dir=batch_dir / name, n_series=2) for name in names]
+    initialize_file_hierarchy(ExperimentBatch(batch_dir, experiments, None))
+    for exp in experiments:
+        for sid in range(exp.config.n_series):
+            series_dir = output_dir_for_series(exp.config.output_dir, sid)
+            series_dir.joinpath('run_metadata.json').write_text(json.dumps({
+                'solution_string': solution_string, 'hash': f'hash{sid}', 'fitness': SOLUTION_FITNESS,
+                'generation_count': 3, 'total_time': 30, 'chromosome': [0.5], 'age_avg': 1.0, 'age_max': 2,
+                'individual_count': 3, 'crossover_involvement_max': 2, 'crossover_involvement_min': 0,
+            }))
+            series_dir.joinpath('event_newbest.csv').write_text(
+                'event_name,generation,total_duration,fitness\n' + ''.join(f'newbest,{g},{g * 10},{9 - g}\n' for g in range(3)))
+            series_dir.joinpath('event_bestingen.csv').write_text(
+                'event_name,generation,total_duration,fitness\n' + ''.join(f'bestingen,{g},{g * 10},{9 - g}\n' for g in range(3)))
+            series_dir.joinpath('event_popmetrics.csv').write_text(
+                'event_name,generation,total_duration,population_size,diversity,distance_avg\n' + ''.join(f'popmetrics,{g},{g * 10},10,0.5,1.5\n' for g in range(3)))
+            series_dir.joinpath('event_popgentime.csv').write_text('event_name,time\npopgentime,5\n')
+            series_dir.joinpath('event_iterinfo.csv').write_text(
+                'event_name,generation,eval_time,sel_time,cross_time,mut_time,repl_time,iter_time\n' + ''.join(f'iterinfo,{g},1,2,3,4,5,15\n' for g in range(3)))
+
+
+def test_worker_reports_corrupted_experiment(tmp_path):
+    create_exp_batch_output(tmp_path, ['test01'], solution_string='1_3_2_4')
+    exp = extract_experiments_from_dir(tmp_path)[0]
+
+    result = analyze_experiment_from_dir(experiment_dir_in_batch(exp), None, Version(1, 0, 0), should_plot=False)
+
+    assert not result.ok
+    assert result.expname == 'test01'
+    assert result.stats is None
+
+
+def test_multiprocess_analysis_gives_same_stats_as_single_process(tmp_path):
+    create_exp_batch_output(tmp_path, [f'test{i:02}' for i in range(1, 5)])
+    batch = extract_experiments_from_dir(tmp_path)
+
+    expected = process_experiment_window(batch, None, Version(1, 0, 0), should_plot=False)
+    with get_context("spawn").Pool(2) as pool:
+        stats = process_experiment_window(batch, None, Version(1, 0, 0), pool, should_plot=False)
+
+    assert_frame_equal(stats.global_stats, expected.global_stats)
+    assert_frame_equal(stats.convergence, expected.convergence)
+    assert_frame_equal(stats.solver_summary[0], expected.solver_summary[0])
+    # Order of hashes within experiment is not specified
+    assert_frame_equal(stats.solver_summary[1].sort([KEY_EXPNAME, 'hash']), expected.solver_summary[1].sort([KEY_EXPNAME, 'hash']))
+
+
+def test_truncated_series_are_analyzed(tmp_path):
+    create_exp_batch_output(tmp_path, ['test01', 'test02'])
+    series_dir = output_dir_for_series(tmp_path / 'test01', 1)
+    series_dir.joinpath('run_metadata.json').unlink()
+    assert write_truncated_series_metadata(series_dir, 'no improvement for 60s', total_time=20)
+    batch = extract_experiments_from_dir(tmp_path)
+
+    stats = process_experiment_window(batch, None, Version(1, 0, 0), should_plot=False)
+    result = analyze_experiment_from_dir(series_dir.parent, None, Version(1, 0, 0), should_plot=False)
+
+    assert result.ok
+    assert stats.global_stats.height == 2
+    # Truncated series has no solution hash, the summary is computed from the complete ones
+    summary, hashes = stats.solver_summary
+    assert hashes.filter(hashes[KEY_EXPNAME] == 'test01').get_column('hash').to_list() == ['hash0']
@@ -0,0 +1,86 @@
+import random
+import polars as pl
+from polars.testing import assert_frame_equal
+from data.model import JoinedExperimentData, Col, Event, dtypes_for_event, DTYPE_FOR_COLUMN
+from data.tools import batch_dataset_from_experiments
+from data.stat import (
+    compute_global_exp_stats,
+    compute_convergence_iteration_per_exp,
+    compute_stats_from_solver_summary,
+    finalize_global_exp_stats,
+    finalize_convergence_iteration,
+    finalize_solver_summary_stats,
+    PartialStats,
+    KEY_EXPNAME,
+)
+from core.util import iter_batched
+from .test_core_fs import create_mock_exp
+
+BKS = 1000
+
+
+def create_mock_exp_data(rng: random.Random, n_series: int, n_gen: int) -> JoinedExperimentData:
+    """ Data in the shape produced by the loader: event name column is dropped & column types are narrowed """
+    newbest, bestingen, popmetrics, iterinfo, summary = [], [], [], [], []
+    for sid in range(n_series):
+        fitness = BKS + rng.randint(5, 50)
+        target = BKS if rng.random() < 0.5 else BKS + rng.randint(1, 5)
+        for gen in range(n_gen):
+            if fitness > target and rng.random() < 0.3:
+                fitness = max(target, fitness - rng.randint(1, 10))
+                newbest.append((gen, gen * 10, fitness, sid))
+            bestingen.append((gen, gen * 10, fitness, sid))
+            popmetrics.append((gen, gen * 10, 100, rng.random(), rng.random(), sid))
+            iterinfo.append((gen, 1, 2, 3, 4, 5, rng.randint(10, 20), sid))
+        summary.append((n_gen, 1000, fitness, f'hash{fitness}', rng.random(), rng.randint(1, 9), rng.randint(1, 9), rng.randint(5, 9), rng.randint(0, 4), sid))
+
+    def event_frame(event: str, rows: list[tuple]) -> pl.DataFrame:
+        schema = {col: dtype for col, dtype in dtypes_for_event(event).items() if col != Col.EVENT}
+        return pl.DataFrame(rows, schema=schema, orient='row')
+
+    return JoinedExperimentData(
+        newbest=event_frame(Event.NEW_BEST, newbest),
+        popmetrics=event_frame(Event.POP_METRICS, popmetrics),
+        bestingen=event_frame(Event.BEST_IN_GEN, bestingen),
+        popgentime=event_frame(Event.POP_GEN_TIME, [(5, sid) for sid in range(n_series)]),
+        iterinfo=event_frame(Event.ITER_INFO, iterinfo),
+        summarydf=(pl.DataFrame(summary, schema=['gen_count', 'total_time', 'fitness', 'hash', 'age_avg', 'age_max', 'indv_count', 'co_inv_max', 'co_inv_min', Col.SID], orient='row')
+                   .with_columns(pl.col(Col.SID).cast(DTYPE_FOR_COLUMN[Col.SID]))),
+    )
+
+
+def test_batch_dataset_gives_same_stats_as_per_experiment_queries():
+    rng = random.Random(7)
+    batch = [create_mock_exp(f'test{i:02}', n_series=4) for i in range(8)]
+    data = [create_mock_exp_data(rng, n_series=4, n_gen=rng.randint(20, 60)) for _ in batch]
+    dataset = batch_dataset_from_experiments(batch, data)
+
+    assert_frame_equal(compute_global_exp_stats(batch, data, None, dataset),
+                       compute_global_exp_stats(batch, data, None))
+    assert_frame_equal(compute_convergence_iteration_per_exp(batch, data, None, dataset),
+                       compute_convergence_iteration_per_exp(batch, data, None))
+
+    stats, hashes = compute_stats_from_solver_summary(batch, data, dataset)
+    expected_stats, expected_hashes = compute_stats_from_solver_summary(batch, data)
+    assert_frame_equal(stats, expected_stats)
+    # Order of hashes within experiment is not specified
+    assert_frame_equal(hashes.sort([KEY_EXPNAME, 'hash']), expected_hashes.sort([KEY_EXPNAME, 'hash']))
+
+
+def test_merged_window_stats_equal_stats_of_whole_batch():
+    rng = random.Random(11)
+    batch = [create_mock_exp(f'test{i:02}', n_series=3) for i in range(7)]
+    data = [create_mock_exp_data(rng, n_series=3, n_gen=rng.randint(20, 60)) for _ in batch]
+
+    parts = [PartialStats.of_experiments([exp for exp, _ in window], [expdata for _, expdata in window])
+             for window in iter_batched(zip(batch, data), 3)]
+    stats = PartialStats.merge(parts)
+
+    assert_frame_equal(finalize_global_exp_stats(stats.global_stats, None),
+                       compute_global_exp_stats(batch, data, None))
+    assert_frame_equal(finalize_convergence_iteration(stats.convergence),
+                       compute_convergence_iteration_per_exp(batch, data, None))
+    summary, hashes = finalize_solver_summary_stats(stats.solver_summary)
+    expected_summary, expected_hashes = compute_stats_from_solver_summary(batch, data)
+    assert_frame_equal(summary, expected_summary)
+    assert_frame_equal(hashes.sort([KEY_EXPNAME, 'hash']), expected_hashes.sort([KEY_EXPNAME, 'hash']))
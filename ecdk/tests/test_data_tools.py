@@ -0,0 +1,28 @@
+import json
+from experiment.model import ExperimentBatch
+from core.fs import initialize_file_hierarchy, output_dir_for_series
+from data.tools import extract_experiments_from_dir
+from .test_core_fs import create_mock_exp
+
+
+def test_experiments_are_loaded_in_listing_order(tmp_path):
+    names = [f'test{i:02}' for i in range(12)]
+    experiments = [create_mock_exp(name, output_dir=tmp_path / name, n_series=3) for name in names]
+    initialize_file_hierarchy(ExperimentBatch(tmp_path, experiments, None))
+    for exp in experiments:
+        for series_id in range(exp.config.n_series):
+            series_dir = output_dir_for_series(exp.config.output_dir, series_id)
+            series_dir.joinpath('run_metadata.json').write_text(json.dumps({'fitness': series_id}))
+            series_dir.joinpath('event_newbest.csv').write_text('event_name,generation,total_duration,fitness\n')
+    # Not an experiment, e.g. generated configs of a sweep
+    tmp_path.joinpath('sweep').mkdir()
+
+    sequential = extract_experiments_from_dir(tmp_path, workers=1)
+    parallel = extract_experiments_from_dir(tmp_path, workers=4)
+
+    assert sorted(exp.name for exp in parallel) == names
+    assert [exp.name for exp in parallel] == [exp.name for exp in sequential]
+    for exp in parallel:
+        assert exp.batch_dir == tmp_path
+        assert len(exp.result.series_outputs) == 3
+        assert all(set(output.files.event_files) == {'newbest'} for output in exp.result.series_outputs)
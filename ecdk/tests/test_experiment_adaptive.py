@@ -0,0 +1,57 @@
+import pytest
+from pathlib import Path
+from core.fs import output_dir_for_series
+from experiment.model import ExperimentConfig
+from experiment.runner import LocalExperimentRunner
+from experiment.adaptive import SeriesCountPolicy, mean_ci_half_width, wilson_half_width, _t_quantile
+from .test_experiment_runner import create_fake_solver
+
+# Fitness is constant for instance `test01` and alternates between series of other instances
+FAKE_SOLVER = """#!{python}
+import sys, json, pathlib
+out_dir = pathlib.Path(sys.argv[sys.argv.index('--output-dir') + 1])
+input_file = pathlib.Path(sys.argv[sys.argv.index('--input-file') + 1])
+out_dir.mkdir(parents=True, exist_ok=True)
+series_id = int(out_dir.name.rpartition('-')[2])
+fitness = 10 if input_file.stem == 'test01' else 10 + 50 * (series_id % 2)
+out_dir.joinpath('run_metadata.json').write_text(json.dumps({{'fitness': fitness}}))
+"""
+
+
+@pytest.mark.parametrize('df,expected', [(3, 3.182), (5, 2.571), (10, 2.228), (30, 2.042)])
+def test_t_quantile_is_close_to_tabulated_values(df, expected):
+    assert _t_quantile(0.975, df) == pytest.approx(expected, rel=0.01)
+
+
+def test_ci_half_widths():
+    assert mean_ci_half_width([5, 5, 5, 5]) == 0
+    assert mean_ci_half_width([1, 2, 3, 4]) == pytest.approx(2.054, rel=0.01)
+    assert wilson_half_width(10, 10) < wilson_half_width(5, 10)
+
+
+def test_stop_reason():
+    policy = SeriesCountPolicy(wave_size=2, max_series=8, fitness_ci_width=0.01, hit_ratio_ci_width=0.3)
+
+    # Too few samples to say anything
+    assert policy.stop_reason(2, [100, 100], best_known=100) is None
+    assert policy.stop_reason(4, [100, 100, 100, 100], best_known=100) is not None
+    assert policy.stop_reason(4, [100, 120, 140, 110], best_known=None) is None
+    assert policy.stop_reason(8, [100, 120, 140, 110], best_known=None) is not None
+    # Hit ratio is precise enough, even though fitness varies
+    assert policy.stop_reason(6, [100, 100, 100, 100, 100, 180], best_known=100) is not None
+
+
+def test_experiments_stop_independently(tmp_path):
+    configs = [
+        ExperimentConfig(Path(f'./data/instances-mock/test_instances/{name}.txt'), tmp_path / name, None, n_series=10)
+        for name in ('test01', 'test02')
+    ]
+    for config in configs:
+        for series_id in range(config.n_series):
+            output_dir_for_series(config.output_dir, series_id).mkdir(parents=True)
+
+    policy = SeriesCountPolicy(wave_size=2, max_series=10, fitness_ci_width=0.01)
+    results = LocalExperimentRunner(create_fake_solver(tmp_path, FAKE_SOLVER)).run_adaptive(configs, policy, process_limit=2)
+
+    assert [result.n_series() for result in results] == [4, 10]
+    assert all(output is not None for result in results for output in result.series_outputs)
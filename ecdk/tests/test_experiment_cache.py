@@ -0,0 +1,93 @@
+import json
+from pathlib import Path
+from core.fs import output_dir_for_series
+from experiment.solver import SolverParams
+from experiment.runner import LocalExperimentRunner
+from experiment.cache import ResultStore
+from .test_experiment_runner import create_fake_solver, create_config
+
+# Counts its invocations in file next to the binary & dumps run metadata like the real solver
+FAKE_SOLVER = """#!{python}
+import sys, pathlib
+out_dir = pathlib.Path(sys.argv[sys.argv.index('--output-dir') + 1])
+out_dir.mkdir(parents=True, exist_ok=True)
+counter = pathlib.Path(__file__).with_name('invocations')
+with open(counter, 'a') as file:
+    file.write('x')
+out_dir.joinpath('run_metadata.json').write_text('{{}}')
+out_dir.joinpath('event_newbest.csv').write_text('gen,fitness\\n0,1\\n')
+"""
+
+
+def invocations(tmp_path: Path) -> int:
+    counter = tmp_path / 'invocations'
+    return len(counter.read_text()) if counter.is_file() else 0
+
+
+def test_key_depends_on_config_contents_and_series(tmp_path):
+    store = ResultStore(tmp_path / 'store')
+    binary = create_fake_solver(tmp_path, FAKE_SOLVER).binary
+    instance = Path('./data/instances-mock/test_instances/test01.txt')
+    config_a = tmp_path / 'a.json'
+    config_a.write_text(json.dumps({'n_gen': 10, 'pop_size': 20, 'output_dir': 'a'}))
+    config_b = tmp_path / 'b.json'
+    config_b.write_text(json.dumps({'pop_size': 20, 'n_gen': 10, 'output_dir': 'b'}))
+    config_c = tmp_path / 'c.json'
+    config_c.write_text(json.dumps({'n_gen': 11, 'pop_size': 20}))
+
+    def key(config_file: Path, series_id: int) -> str:
+        return store.key_for(binary, SolverParams(instance, tmp_path / 'out', config_file, None), series_id)
+
+    assert key(config_a, 0) == key(config_b, 0)
+    assert key(config_a, 0) != key(config_c, 0)
+    assert key(config_a, 0) != key(config_a, 1)
+    assert key(config_a, 0) != key(None, 0)
+
+
+def test_computed_series_are_restored_instead_of_run(tmp_path):
+    solver = create_fake_solver(tmp_path, FAKE_SOLVER)
+    store = ResultStore(tmp_path / 'store')
+    runner = LocalExperimentRunner(solver, result_store=store)
+
+    first = create_config(tmp_path / 'first' / 'test01', n_series=2)
+    for series_id in range(2):
+        output_dir_for_series(first.output_dir, series_id).mkdir(parents=True)
+    results = runner.run_multiprocess([first], process_limit=2)
+    assert invocations(tmp_path) == 2
+    assert all(output is not None for output in results[0].series_outputs)
+
+    # One more series than before, only that one has to be computed
+    second = create_config(tmp_path / 'second' / 'test01', n_series=3)
+    for series_id in range(3):
+        output_dir_for_series(second.output_dir, series_id).mkdir(parents=True)
+    results = runner.run_multiprocess([second], process_limit=2)
+    assert invocations(tmp_path) == 3
+    assert all(output is not None for output in results[0].series_outputs)
+    for series_id in range(3):
+        assert (output_dir_for_series(second.output_dir, series_id) / 'event_newbest.csv').is_file()
+    # Restored series are accounted for as well
+    assert [md.restored for md in results[0].metadata] == [True, True, False]
+
+
+def test_rerun_of_restored_series_does_not_modify_store(tmp_path):
+    solver = create_fake_solver(tmp_path, FAKE_SOLVER)
+    store = ResultStore(tmp_path / 'store')
+    runner = LocalExperimentRunner(solver, result_store=store)
+    first = create_config(tmp_path / 'first' / 'test01', n_series=1)
+    output_dir_for_series(first.output_dir, 0).mkdir(parents=True)
+    runner.run_multiprocess([first], process_limit=1)
+
+    second = create_config(tmp_path / 'second' / 'test01', n_series=1)
+    series_dir = output_dir_for_series(second.output_dir, 0)
+    series_dir.mkdir(parents=True)
+    runner.run_multiprocess([second], process_limit=1)
+    assert invocations(tmp_path) == 1
+    assert series_dir.joinpath('event_newbest.csv').stat().st_nlink > 1
+    assert series_dir.joinpath('run_metadata.json').stat().st_nlink == 1
+
+    # Done by the runner before the solver is started again for the series
+    ResultStore.detach(series_dir)
+    series_dir.joinpath('event_newbest.csv').write_text('gen,fitness\n0,2\n')
+
+    key = store.key_for(solver.binary, SolverParams(first.input_file, series_dir, None, None), 0)
+    assert store.entry_dir(key).joinpath('event_newbest.csv').read_text() == 'gen,fitness\n0,1\n'
@@ -0,0 +1,79 @@
+import json
+from pathlib import Path
+from experiment.model import ExperimentConfig
+from experiment.cost import (
+    TaskCostModel,
+    TaskDurationHistory,
+    order_longest_first,
+    partition_longest_first,
+    DEFAULT_POP_SIZE,
+)
+
+
+def create_config(instance: str, tmp_path: Path, n_gen: int = None) -> ExperimentConfig:
+    config_file = None
+    if n_gen is not None:
+        config_file = tmp_path / f'cfg_{n_gen}.json'
+        config_file.write_text(json.dumps({'n_gen': n_gen}))
+    return ExperimentConfig(
+        input_file=Path(f'./data/instances-mock/test_instances/{instance}.txt'),
+        output_dir=tmp_path / instance,
+        config_file=config_file,
+        n_series=1
+    )
+
+
+def test_longest_first_order_is_stable():
+    assert order_longest_first([1.0, 3.0, 2.0, 3.0]) == [1, 3, 2, 0]
+
+
+def test_static_estimate_from_instance_file_header(tmp_path):
+    model = TaskCostModel()
+    config = create_config('test01', tmp_path, n_gen=10)
+    with open(config.input_file) as file:
+        jobs, machines = map(int, file.readline().split()[:2])
+
+    assert model.work_units(config) == jobs * machines * 10 * DEFAULT_POP_SIZE
+    assert model.estimate(config) == float(model.work_units(config))
+
+
+def test_more_generations_cost_more(tmp_path):
+    model = TaskCostModel()
+    assert model.estimate(create_config('test01', tmp_path, n_gen=100)) > model.estimate(create_config('test01', tmp_path, n_gen=10))
+
+
+def test_history_is_preferred_and_persisted(tmp_path):
+    history_file = tmp_path / 'history.csv'
+    model = TaskCostModel()
+    short_cfg = create_config('test01', tmp_path, n_gen=10)
+    long_cfg = create_config('test01', tmp_path, n_gen=100)
+
+    TaskDurationHistory.append(history_file, [model.record(short_cfg, 2.0), model.record(short_cfg, 4.0)])
+    TaskDurationHistory.append(history_file, [model.record(long_cfg, 30.0)])
+
+    model = TaskCostModel(history=TaskDurationHistory.load(history_file))
+    assert model.estimate(short_cfg) == 3.0
+    assert model.estimate(long_cfg) == 30.0
+
+    # Unseen configuration is translated into seconds using observed time per work unit
+    unseen_cfg = create_config('test01', tmp_path, n_gen=1000)
+    assert 0 < model.estimate(unseen_cfg) < model.work_units(unseen_cfg)
+
+
+def test_partition_balances_cost():
+    costs = [10.0, 1.0, 1.0, 1.0, 1.0, 5.0, 5.0, 1.0]
+    shards = partition_longest_first(costs, 2)
+
+    assert sorted(it for shard in shards for it in shard) == list(range(len(costs)))
+    assert [sum(costs[i] for i in shard) for shard in shards] == [13.0, 12.0]
+    # Every shard is ordered longest-first
+    assert all(shard == sorted(shard, key=lambda i: -costs[i]) for shard in shards)
+
+
+def test_partition_is_deterministic():
+    costs = [3.0, 1.0, 3.0, 2.0, 2.0, 1.0]
+    assert partition_longest_first(costs, 3) == partition_longest_first(list(costs), 3) == [[0, 1], [2, 5], [3, 4]]
+
+
+def test_partition_with_more_shards_than_tasks():
+    assert partition_longest_first([1.0, 2.0], 4) == [[1], [0], [], []]
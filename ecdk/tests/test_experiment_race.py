@@ -0,0 +1,63 @@
+import json
+import math
+import pytest
+from pathlib import Path
+from core.fs import output_dir_for_series
+from experiment.model import ExperimentConfig
+from experiment.runner import LocalExperimentRunner
+from experiment.race import ConfigRace, ranks_within_block, friedman_test, nemenyi_critical_difference
+from .test_experiment_runner import create_fake_solver
+
+# Fitness is taken from the config, the series with odd id of config `noisy` are much worse than the others
+FAKE_SOLVER = """#!{python}
+import sys, json, pathlib
+out_dir = pathlib.Path(sys.argv[sys.argv.index('--output-dir') + 1])
+config_file = pathlib.Path(sys.argv[sys.argv.index('--config') + 1])
+out_dir.mkdir(parents=True, exist_ok=True)
+series_id = int(out_dir.name.rpartition('-')[2])
+fitness = json.loads(config_file.read_text())['fitness']
+if config_file.stem == 'noisy' and series_id % 2 == 1:
+    fitness += 100
+out_dir.joinpath('run_metadata.json').write_text(json.dumps({{'fitness': fitness}}))
+"""
+
+
+def test_tied_values_share_average_rank():
+    assert ranks_within_block([30, 10, 20]) == [3, 1, 2]
+    assert ranks_within_block([10, 20, 10, 5]) == [2.5, 4, 2.5, 1]
+
+
+def test_friedman_test():
+    # Consistent ordering: statistic = 16 with 2 degrees of freedom, exact p-value exp(-8)
+    assert friedman_test([[1, 2, 3]] * 8) == pytest.approx(math.exp(-8), rel=0.3)
+    assert friedman_test([[1, 2, 3], [3, 2, 1], [2, 3, 1], [1, 3, 2], [3, 1, 2], [2, 1, 3]]) > 0.9
+
+
+def test_nemenyi_critical_difference():
+    assert nemenyi_critical_difference(3, 8) == pytest.approx(2.344 * math.sqrt(12 / 48))
+    with pytest.raises(AssertionError):
+        nemenyi_critical_difference(11, 8)
+
+
+def test_worse_configs_are_eliminated(tmp_path):
+    candidates = {}
+    for name, fitness in (('good', 10), ('bad', 50), ('noisy', 10)):
+        config_file = tmp_path / f'{name}.json'
+        config_file.write_text(json.dumps({'fitness': fitness}))
+        candidates[name] = []
+        for instance in ('test01', 'test02', 'test03', 'test04'):
+            config = ExperimentConfig(Path(f'./data/instances-mock/test_instances/{instance}.txt'),
+                                      tmp_path / name / instance, config_file, n_series=6)
+            for series_id in range(config.n_series):
+                output_dir_for_series(config.output_dir, series_id).mkdir(parents=True)
+            candidates[name].append(config)
+
+    config_race = ConfigRace(LocalExperimentRunner(create_fake_solver(tmp_path, FAKE_SOLVER)), candidates, min_rounds=2)
+    rounds = config_race.run(max_rounds=6, process_limit=2)
+
+    assert rounds[0].p_value is None
+    assert rounds[1].eliminated == ['bad']
+    assert config_race.alive[0] == 'good'
+    # Eliminated configuration does not take part in the following rounds
+    assert [result.n_series() for result in config_race.experiment_results('bad')] == [2] * 4
+    assert [result.n_series() for result in config_race.experiment_results('good')] == [len(rounds)] * 4
@@ -0,0 +1,134 @@
+import sys
+import stat
+import multiprocessing as mp
+import datetime as dt
+from pathlib import Path
+from core.fs import output_dir_for_series
+from experiment.model import ExperimentConfig
+from experiment.solver import SolverProxy
+from experiment.runner import AresExpScheduler, FsQueueRunner, LocalExperimentRunner, TaskExecutionPolicy, fitness_of_series
+from core.convergence import ConvergenceMonitor, StagnationRule
+from core.series import materialize_series_output
+import experiment.runner
+from core.fsqueue import FsTaskQueue
+
+# Records the time interval it has been running in, in its output directory
+FAKE_SOLVER = """#!{python}
+import sys, time, pathlib
+out_dir = pathlib.Path(sys.argv[sys.argv.index('--output-dir') + 1])
+out_dir.mkdir(parents=True, exist_ok=True)
+start = time.time()
+time.sleep(0.3)
+out_dir.joinpath('interval').write_text(f'{{start}} {{time.time()}}')
+out_dir.joinpath('run_metadata.json').write_text('{{"fitness": 10}}')
+"""
+
+
+def create_fake_solver(tmp_path: Path, script: str) -> SolverProxy:
+    """ Saves solver `script` as executable in `tmp_path`; `{python}` in the script is replaced with the interpreter path """
+    binary = tmp_path / 'solver.py'
+    binary.write_text(script.format(python=sys.executable))
+    binary.chmod(binary.stat().st_mode | stat.S_IXUSR)
+    return SolverProxy(binary)
+
+
+def create_config(output_dir: Path, n_series: int, config_file: Path = None) -> ExperimentConfig:
+    return ExperimentConfig(
+        input_file=Path('./data/instances-mock/test_instances/test01.txt'),
+        output_dir=output_dir,
+        config_file=config_file,
+        n_series=n_series
+    )
+
+
+def test_ares_array_task_runs_its_slice_in_parallel(tmp_path, monkeypatch):
+    monkeypatch.setenv('SLURM_ARRAY_TASK_COUNT', '2')
+    monkeypatch.setenv('SLURM_ARRAY_TASK_ID', '1')
+    monkeypatch.setenv('SLURM_CPUS_PER_TASK', '4')
+    config = create_config(tmp_path / 'test01', n_series=8)
+    for series_id in range(8):
+        output_dir_for_series(config.output_dir, series_id).mkdir(parents=True)
+
+    AresExpScheduler(create_fake_solver(tmp_path, FAKE_SOLVER)).run([config])
+
+    intervals = []
+    for series_id in range(8):
+        interval_file = output_dir_for_series(config.output_dir, series_id) / 'interval'
+        # Series of equal cost are dealt to the array tasks in turns
+        assert interval_file.is_file() == (series_id % 2 == 1)
+        if interval_file.is_file():
+            intervals.append(tuple(map(float, interval_file.read_text().split())))
+
+    # All of the series have been running at the same time
+    assert max(start for start, _ in intervals) < min(end for _, end in intervals)
+
+
+def work_on_queue(solver: SolverProxy, queue_dir: Path):
+    FsQueueRunner(solver, queue_dir, idle_poll_interval=0.1).work(process_limit=2)
+
+
+def test_fs_queue_workers_share_the_batch(tmp_path):
+    config = create_config(tmp_path / 'test01', n_series=8)
+    for series_id in range(8):
+        output_dir_for_series(config.output_dir, series_id).mkdir(parents=True)
+    solver = create_fake_solver(tmp_path, FAKE_SOLVER)
+    FsQueueRunner(solver, tmp_path / 'queue').enqueue([config])
+
+    ctx = mp.get_context('fork')
+    workers = [ctx.Process(target=work_on_queue, args=(solver, tmp_path / 'queue')) for _ in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+        assert worker.exitcode == 0
+
+    for series_id in range(8):
+        assert (output_dir_for_series(config.output_dir, series_id) / 'interval').is_file()
+    assert len(list((tmp_path / 'queue' / FsTaskQueue.DONE).iterdir())) == 8
+
+
+def test_series_not_run_before_deadline_have_no_result(tmp_path):
+    config = create_config(tmp_path / 'test01', n_series=4)
+    for series_id in range(4):
+        output_dir_for_series(config.output_dir, series_id).mkdir(parents=True)
+    policy = TaskExecutionPolicy(deadline=dt.datetime.now() + dt.timedelta(seconds=0.5), deadline_margin=0)
+
+    result = LocalExperimentRunner(create_fake_solver(tmp_path, FAKE_SOLVER), policy=policy).run_multiprocess([config], process_limit=1)[0]
+
+    assert len(result.series_outputs) == 4
+    # First series completes, second is terminated at the deadline & the rest are never started
+    assert result.series_outputs[0] is not None
+    assert result.series_outputs[2] is None and result.metadata[2] is None
+    assert result.series_outputs[3] is None and result.metadata[3] is None
+
+
+# Reports single solution & then does not improve it anymore
+STAGNATING_SOLVER = """#!{python}
+import sys, time, pathlib
+out_dir = pathlib.Path(sys.argv[sys.argv.index('--output-dir') + 1])
+out_dir.mkdir(parents=True, exist_ok=True)
+with open(out_dir / 'event_newbest.csv', 'w') as file:
+    file.write('event_name,generation,total_duration,fitness\\nnewbest,0,0,120\\nnewbest,3,30,110\\n')
+with open(out_dir / 'event_bestingen.csv', 'w') as file:
+    file.write('event_name,generation,total_duration,fitness\\n' + ''.join(f'bestingen,{{g}},{{g * 10}},110\\n' for g in range(8)))
+time.sleep(30)
+"""
+
+
+def test_early_stopped_series_keep_truncated_result(tmp_path, monkeypatch):
+    monkeypatch.setattr(experiment.runner, 'ConvergenceMonitor', lambda rule: ConvergenceMonitor(rule, interval=0.1))
+    solver = create_fake_solver(tmp_path, STAGNATING_SOLVER)
+    config = create_config(tmp_path / 'test01', n_series=1)
+    output_dir_for_series(config.output_dir, 0).mkdir(parents=True)
+    policy = TaskExecutionPolicy(stagnation=StagnationRule(patience=0.5))
+
+    result = LocalExperimentRunner(solver, policy=policy).run_multiprocess([config], process_limit=1)[0]
+
+    assert result.metadata[0].early_stopped is not None and result.metadata[0].is_ok()
+    assert result.metadata[0].duration.total_seconds() < 10
+    series_output = result.series_outputs[0]
+    assert series_output is not None
+    assert fitness_of_series(series_output) == 110
+    materialize_series_output(series_output)
+    assert series_output.data.metadata.is_truncated()
+    assert series_output.data.metadata.generation_count == 8
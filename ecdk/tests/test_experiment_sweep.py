@@ -0,0 +1,48 @@
+import json
+import pytest
+from experiment.sweep import ConfigSweep, parse_grid_spec
+
+
+def test_grid_values_are_parsed():
+    assert parse_grid_spec(['pop_size=100,200', 'solver_type=default,ls', 'ls=true']) == {
+        'pop_size': [100, 200],
+        'solver_type': ['default', 'ls'],
+        'ls': [True],
+    }
+    with pytest.raises(AssertionError):
+        parse_grid_spec(['pop_size'])
+
+
+def test_grid_is_combined_with_every_config_file(tmp_path):
+    for name, n_gen in (('short', 100), ('long', 1000)):
+        tmp_path.joinpath(f'{name}.json').write_text(json.dumps({'n_gen': n_gen, 'pop_size': 10}))
+    sweep = ConfigSweep([tmp_path / 'short.json', tmp_path / 'long.json'], {'pop_size': [10, 20]})
+
+    configs = sweep.materialize(tmp_path / 'sweep')
+
+    assert [cfg.name for cfg in configs] == ['short_pop_size-10', 'short_pop_size-20', 'long_pop_size-10', 'long_pop_size-20']
+    assert json.loads(configs[3].path.read_text()) == {'n_gen': 1000, 'pop_size': 20}
+    assert sweep.experiment_name('ta01', configs[0]) == 'ta01__short_pop_size-10'
+
+
+def test_identical_configs_are_run_once(tmp_path):
+    tmp_path.joinpath('base.json').write_text(json.dumps({'n_gen': 100}))
+    sweep = ConfigSweep([tmp_path / 'base.json'], {'n_gen': [100, 200], 'pop_size': [0.5, 0.5]})
+
+    configs = sweep.materialize(tmp_path / 'sweep')
+
+    assert [cfg.params for cfg in configs] == [{'n_gen': 100, 'pop_size': 0.5}, {'n_gen': 200, 'pop_size': 0.5}]
+    assert all(cfg.path.is_file() for cfg in configs)
+
+
+def test_single_config_is_not_a_sweep(tmp_path):
+    config_file = tmp_path / 'base.json'
+    config_file.write_text('{}')
+    sweep = ConfigSweep([config_file])
+
+    configs = sweep.materialize(tmp_path / 'sweep')
+
+    assert sweep.is_trivial()
+    assert [cfg.path for cfg in configs] == [config_file]
+    assert sweep.experiment_name('ta01', configs[0]) == 'ta01'
+    assert not tmp_path.joinpath('sweep').exists()